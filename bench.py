@@ -0,0 +1,521 @@
+"""
+RepoPrep Pro — benchmarks
+Usage:  python bench.py {walk,pwalk,sniff,rules,git,startup,gc,suite} [--src N] [--packages N] [--repeat N]
+
+Every benchmark builds its own throw-away tree in a temp folder and
+prints a before / after comparison.  Nothing outside the temp folder
+is touched.
+
+``suite`` runs everything against one reproducible synthetic tree and
+writes the timings as JSON; ``--compare old.json`` flags regressions:
+
+    python bench.py suite --files 100000 --out v2.2.json
+    python bench.py suite --files 100000 --compare v2.2.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import main
+
+
+# ══════════════════════════════════════════════════════════════════
+#  TREE BUILDERS
+# ══════════════════════════════════════════════════════════════════
+def _write(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+def make_node_tree(root: Path, src_files=2000, packages=400, files_per_pkg=40):
+    """A small project with a large node_modules next to it."""
+    for i in range(src_files):
+        _write(root / "src" / f"mod{i % 50}" / f"file{i}.js", b"export default 1;\n")
+    _write(root / "package.json", b"{}")
+    for p in range(packages):
+        pkg = root / "node_modules" / f"pkg{p}"
+        for f in range(files_per_pkg):
+            _write(pkg / ("lib" if f % 2 else "dist") / f"f{f}.js", b"module.exports = 1;\n")
+    return src_files, packages * files_per_pkg
+
+
+# ══════════════════════════════════════════════════════════════════
+#  BASELINES  (the pre-walker implementation, kept for comparison)
+# ══════════════════════════════════════════════════════════════════
+def _legacy_first_skip_dir(parts):
+    for p in parts[:-1]:
+        if p in main.SKIP_DIRS:
+            return p
+    return None
+
+
+def legacy_walk(source: Path):
+    """rglob every file, then drop the ones below a skip directory."""
+    kept = 0
+    for f in source.rglob("*"):
+        if f.is_file() and _legacy_first_skip_dir(f.relative_to(source).parts) is None:
+            f.stat()
+            kept += 1
+    return kept
+
+
+def pruned_walk(source: Path):
+    kept = 0
+    for e in main.walk_tree(source):
+        if not e.is_dir:
+            e.stat()
+            kept += 1
+    return kept
+
+
+def _best_of(fn, arg, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(arg)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+# ══════════════════════════════════════════════════════════════════
+#  BENCHMARKS
+# ══════════════════════════════════════════════════════════════════
+def bench_walk(args):
+    tmp = Path(tempfile.mkdtemp(prefix="repoprep_bench_"))
+    try:
+        n_src, n_nm = make_node_tree(tmp, args.src, args.packages)
+        print(f"tree: {n_src} source files, {n_nm} files in node_modules")
+
+        t_old, k_old = _best_of(legacy_walk, tmp, args.repeat)
+        t_new, k_new = _best_of(pruned_walk, tmp, args.repeat)
+        assert k_old == k_new, f"walkers disagree: {k_old} vs {k_new}"
+
+        print(f"rglob + filter : {t_old*1000:8.1f} ms  ({k_old} files kept)")
+        print(f"walk_tree      : {t_new*1000:8.1f} ms  ({k_new} files kept)")
+        print(f"speed-up       : {t_old / t_new:8.1f}x")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def bench_pwalk(args):
+    """Serial vs parallel walk_tree with a simulated network round-trip
+    added to every directory listing (--latency-ms)."""
+    tmp = Path(tempfile.mkdtemp(prefix="repoprep_bench_"))
+    delay = args.latency_ms / 1000
+
+    def remote(abs_dir, rel_dir):
+        time.sleep(delay)
+        return main._scandir(abs_dir, rel_dir)
+
+    def walk(threads):
+        return [(e.rel, e.is_dir) for e in main.walk_tree(tmp, listdir=remote, threads=threads)]
+
+    try:
+        make_synthetic_tree(tmp, args.src * 2, huge=0)
+        t_ser, ref = _best_of(lambda _: walk(0), None, args.repeat)
+        print(f"tree: {len(ref)} entries, {args.latency_ms} ms per readdir")
+        print(f"serial        : {t_ser*1000:8.1f} ms")
+        for n in (4, 16, 32):
+            t_par, got = _best_of(lambda _: walk(n), None, args.repeat)
+            assert got == ref, f"{n} threads: walk order differs"
+            print(f"{n:2d} threads    : {t_par*1000:8.1f} ms  ({t_ser / t_par:.1f}x)")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def make_source_tree(root: Path, files=20000, blobs=200):
+    """Many small text files — one in five with an unknown extension, so
+    it has to be sniffed — plus a few extension-less binaries."""
+    for i in range(files):
+        name = f"m{i}.py" if i % 5 else f"m{i}.in"
+        _write(root / f"pkg{i % 40}" / f"sub{i % 13}" / name,
+               b"def f(x):\n    return x + %d\n" % i)
+    for i in range(blobs):
+        _write(root / "assets" / f"blob{i}", os.urandom(4096))
+    return files, blobs
+
+
+def bench_sniff(args):
+    tmp = Path(tempfile.mkdtemp(prefix="repoprep_bench_"))
+    try:
+        n_txt, n_bin = make_source_tree(tmp, args.src * 10)
+        print(f"tree: {n_txt} text files, {n_bin} extension-less binaries")
+
+        t_off, s_off = _best_of(lambda p: main.scan_project(p), tmp, args.repeat)
+        t_on,  s_on  = _best_of(lambda p: main.scan_project(p, sniff_binary=True),
+                                tmp, args.repeat)
+        assert s_on["binary_files"] == n_bin, s_on["binary_files"]
+
+        print(f"scan            : {t_off*1000:8.1f} ms  ({s_off['clean_files']} clean)")
+        print(f"scan + sniffing : {t_on*1000:8.1f} ms  ({s_on['clean_files']} clean, "
+              f"{s_on['binary_files']} binaries rejected)")
+        print(f"slow-down       : {t_on / t_off:8.2f}x")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _sample_paths(n):
+    """Relative paths with the mix of a real repo: mostly source, some
+    assets, locks, logs, and files below skipped directories."""
+    dirs  = ["src", "src/app", "lib/core", "tests", "docs", "assets/img", "node_modules/x",
+             "build/out", "pkg/sub/deep"]
+    names = ["index.js", "main.py", "util.ts", "README.md", "logo.png", "yarn.lock",
+             "debug.log", "style.css", "data.json", "app.min.js", "test_x.py", "Thumbs.db"]
+    return [f"{dirs[i % len(dirs)]}/{i}_{names[i % len(names)]}" for i in range(n)]
+
+
+def bench_rules(args):
+    rels  = _sample_paths(args.src * 100)
+    paths = [Path(r) for r in rels]
+    skip_ext = main.SKIP_EXTENSIONS | main.IMAGE_EXT
+
+    def legacy(ps):
+        # the inline chain run_operation used per file before SkipRules
+        n = 0
+        for p in ps:
+            if (_legacy_first_skip_dir(p.parts) is not None
+                    or p.name in main.SKIP_DIRS or p.name in main.SKIP_FILES
+                    or p.suffix.lower() in skip_ext):
+                n += 1
+        return n
+
+    def compiled(rules):
+        items = [(r.rsplit("/", 1)[-1], r) for r in rels]
+        def run(_):
+            skip_file = rules.skip_file
+            n = 0
+            for name, rel in items:
+                # the walker asks skip_dir once per directory, not per file
+                if skip_file(name, rel):
+                    n += 1
+            return n
+        return run
+
+    user = main.SkipRules(exclude=["*.min.js", "docs/**/*.md", "tests/", "*.snap",
+                                   "fixtures/", "**/generated/**", "*.pb.go", "coverage*"])
+    t_old, _ = _best_of(legacy, paths, args.repeat)
+    t_new, _ = _best_of(compiled(main.SkipRules()), None, args.repeat)
+    t_usr, _ = _best_of(compiled(user), None, args.repeat)
+    n = len(rels)
+    print(f"{n} decisions")
+    print(f"inline chain          : {n / t_old / 1e6:6.2f} M decisions/s")
+    print(f"SkipRules (built-in)  : {n / t_new / 1e6:6.2f} M decisions/s")
+    print(f"SkipRules (+8 globs)  : {n / t_usr / 1e6:6.2f} M decisions/s")
+
+
+def bench_git(args):
+    if shutil.which("git") is None:
+        print("git not found — needed to build the test repository")
+        return
+    tmp = Path(tempfile.mkdtemp(prefix="repoprep_bench_"))
+    try:
+        n_txt, _ = make_source_tree(tmp, args.src * 10, blobs=0)
+        git = ["git", "-C", str(tmp), "-c", "user.email=bench@localhost", "-c", "user.name=bench"]
+        subprocess.run(git + ["init", "-q"], check=True)
+        subprocess.run(git + ["add", "-A"], check=True)
+        print(f"tree: git repository with {n_txt} tracked files")
+
+        t_walk, s_walk = _best_of(lambda p: main.scan_project(p), tmp, args.repeat)
+        t_git,  s_git  = _best_of(lambda p: main.scan_project(p, git_index=True), tmp, args.repeat)
+        t_read, _      = _best_of(main.read_git_index, tmp, args.repeat)
+        assert s_git["clean_files"] == s_walk["clean_files"], (s_git["clean_files"], s_walk["clean_files"])
+
+        print(f"scan (walk)      : {t_walk*1000:8.1f} ms  ({s_walk['clean_files']} clean)")
+        print(f"scan (git index) : {t_git*1000:8.1f} ms  ({s_git['clean_files']} clean)")
+        print(f"  index parse    : {t_read*1000:8.1f} ms")
+        print(f"speed-up         : {t_walk / t_git:8.1f}x")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _run_py(code_or_args, cwd):
+    cmd = [sys.executable] + (["-c", code_or_args] if isinstance(code_or_args, str) else code_or_args)
+    t0 = time.perf_counter()
+    subprocess.run(cmd, cwd=cwd, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - t0
+
+
+def bench_startup(args):
+    here = os.path.dirname(os.path.abspath(__file__))
+    tmp  = Path(tempfile.mkdtemp(prefix="repoprep_bench_"))
+    try:
+        make_source_tree(tmp, 50, blobs=0)
+        cli = ["main.py", "scan", str(tmp), "--json"]
+        # the CLI path must never pull in tkinter
+        subprocess.run([sys.executable, "-c",
+                        "import sys, main; main.cli(sys.argv[1:]); "
+                        "sys.exit('tkinter' in sys.modules)"] + cli[1:],
+                       cwd=here, check=True, stdout=subprocess.DEVNULL)
+
+        runs = max(5, args.repeat * 3)
+        rows = [
+            ("python -c pass",               "pass"),
+            ("import main (core)",           "import main"),
+            ("import gui (tkinter + GUI)",   "import gui"),
+            ("main.py scan --json (50 files)", cli),
+        ]
+        for label, what in rows:
+            best = min(_run_py(what, here) for _ in range(runs))
+            print(f"{label:32s}: {best*1000:7.1f} ms")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def bench_gc(args):
+    import gc
+    tmp = Path(tempfile.mkdtemp(prefix="repoprep_bench_"))
+    try:
+        src, out = tmp / "src", tmp / "out"
+        n, _ = make_source_tree(src, args.src * 10, blobs=0)
+        # a first full copy; the timed runs are incremental re-runs, where
+        # per-file work is small and the manifest is a large live heap
+        main.run_operation(src, out, "clean", incremental=True)
+        print(f"tree: {n} files, incremental re-run (all unchanged)")
+
+        def forced(msg, level="INFO"):
+            # the old behaviour: a full collection after every progress line
+            if "Progress" in msg:
+                gc.collect()
+
+        runs = [
+            ("gc.collect every 75 files", dict(gc_mode="default", log_cb=forced)),
+            ("default thresholds",        dict(gc_mode="default")),
+            ("relaxed (new default)",     dict(gc_mode="relaxed")),
+            ("collector off",             dict(gc_mode="off")),
+        ]
+        base = None
+        for label, kw in runs:
+            t, res = _best_of(lambda _: main.run_operation(src, out, "clean", incremental=True, **kw),
+                              None, args.repeat)
+            assert res["unchanged"] == n, res
+            base = base or t
+            print(f"{label:28s}: {n / t:9.0f} files/s  ({base / t:4.2f}x)")
+        print(f"peak RSS: {main.fmt_mb(main.peak_rss())}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+# ══════════════════════════════════════════════════════════════════
+#  SUITE  (reproducible synthetic tree → JSON results)
+# ══════════════════════════════════════════════════════════════════
+# names reused across folders on purpose: flatten has to rename them
+_COMMON_NAMES = ["index.js", "index.ts", "utils.py", "__init__.py", "README.md", "main.go",
+                 "config.json", "types.d.ts", "helpers.rs", "style.css", "test_utils.py",
+                 "Makefile", "setup.cfg", "api.py", "App.tsx", "mod.rs"]
+_EXTS  = [".py", ".js", ".ts", ".go", ".rs", ".md", ".json", ".css", ".java", ".c", ".h"]
+_NOISE = ["debug.log", "cache.pyc", "module.so", "build.tmp", "logo.png", "icon.svg"]
+
+
+def _text(rng, n):
+    # deterministic, compressible, source-like content of about n bytes
+    line = b"value_%d = compute(%d, %d)  # synthetic\n"
+    out, size = [], 0
+    while size < n:
+        s = line % (rng.randrange(1000), rng.randrange(1000), rng.randrange(1000))
+        out.append(s)
+        size += len(s)
+    return b"".join(out)
+
+
+def make_synthetic_tree(root: Path, files=20000, seed=0, huge_mb=16, huge=3):
+    """Build a reproducible tree of roughly *files* files under *root*.
+
+    * 65% small source files in nested folders, many sharing names
+      (flatten collisions);
+    * 30% in a deep ``node_modules`` with nested ``node_modules``;
+    * 5% noise the rules skip (logs, .pyc, images);
+    * *huge* files of *huge_mb* MB each.
+
+    The same *seed* and sizes always give the same tree, byte for byte.
+    """
+    import random
+    rng = random.Random(seed)
+    n_src  = files * 65 // 100
+    n_nm   = files * 30 // 100
+    n_junk = files - n_src - n_nm
+    for i in range(n_src):
+        depth = rng.randrange(1, 7)
+        parts = [f"d{rng.randrange(12)}" for _ in range(depth)]
+        if rng.random() < 0.4:
+            name = rng.choice(_COMMON_NAMES)
+        else:
+            name = f"f{i}{rng.choice(_EXTS)}"
+        _write(root / "src" / Path(*parts) / name, _text(rng, rng.randrange(200, 4000)))
+    for i in range(n_nm):
+        nest = [f"node_modules/pkg{rng.randrange(60)}" for _ in range(rng.randrange(1, 5))]
+        _write(root / Path(*"/".join(nest).split("/")) / "lib" / f"m{i}.js",
+               b"module.exports = %d;\n" % i)
+    for i in range(n_junk):
+        _write(root / "src" / f"d{rng.randrange(12)}" / f"{i}_{rng.choice(_NOISE)}",
+               b"\x00junk" * 8)
+    for i in range(huge):
+        with open(_mk(root / "data" / f"dump{i}.sql"), "wb") as fh:
+            block = _text(rng, 1 << 20)
+            for _ in range(huge_mb):
+                fh.write(block)
+    _write(root / "package.json", b"{}")
+    return {"files": files, "source": n_src, "node_modules": n_nm, "noise": n_junk,
+            "huge": huge, "huge_mb": huge_mb, "seed": seed}
+
+
+def _mk(path: Path) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _timed(fn, repeat, setup=None):
+    """Best wall time of *repeat* calls (setup runs untimed before each)."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def _env():
+    import platform
+    rev = None
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                             text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+                             timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        pass
+    return {"version": main.__version__, "commit": rev,
+            "python": platform.python_version(), "platform": platform.platform(),
+            "cpus": os.cpu_count(), "when": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def run_suite(tree: Path, work: Path, repeat=3):
+    """Time every public entry point on *tree*; returns {name: result}."""
+    res = {}
+
+    def entry(name, seconds, items, **extra):
+        res[name] = {"seconds": round(seconds, 4),
+                     "items_per_s": round(items / seconds) if seconds else None, **extra}
+        print(f"  {name:22s} {seconds*1000:9.1f} ms  {res[name]['items_per_s'] or 0:>9} items/s")
+
+    t, s = _timed(lambda: main.scan_project(tree), repeat)
+    total = s["total_files"]
+    entry("scan", t, total, clean_files=s["clean_files"])
+
+    db = work / "index.sqlite3"
+    idx = main.ScanIndex(tree, db_path=db)      # warm the index once, untimed
+    for _ in main.walk_tree(tree, listdir=idx.listdir):
+        pass
+    idx.save()
+
+    def indexed():
+        i = main.ScanIndex(tree, db_path=db)
+        n = sum(1 for _ in main.walk_tree(tree, listdir=i.listdir))
+        i.save()
+        return n
+    t, n = _timed(indexed, repeat)
+    entry("walk_indexed", t, n)
+
+    t, s = _timed(lambda: main.scan_project(tree, sniff_binary=True), repeat)
+    entry("scan_sniff", t, total, binary_files=s["binary_files"])
+
+    out = work / "out"
+    fresh = lambda: shutil.rmtree(out, ignore_errors=True)
+    for mode in ("flatten", "clean", "bundle"):
+        t, r = _timed(lambda: main.run_operation(tree, out, mode), repeat, fresh)
+        entry(f"run_{mode}", t, r["copied"] + r["skipped"], copied=r["copied"])
+    fresh()
+    main.run_operation(tree, out, "clean", incremental=True)
+    t, r = _timed(lambda: main.run_operation(tree, out, "clean", incremental=True), repeat)
+    entry("run_clean_incremental", t, r["copied"] + r["unchanged"] + r["skipped"],
+          unchanged=r["unchanged"])
+    fresh()
+
+    rels  = [e.rel for e in main.walk_tree(tree, main.SkipRules(exclude=["*.never"]))]
+    items = [(os.path.basename(r), r) for r in rels] * max(1, 200000 // max(1, len(rels)))
+    rules = main.SkipRules(exclude=["*.min.js", "docs/**/*.md", "*.snap", "**/generated/**"])
+
+    def match():
+        skip_file = rules.skip_file
+        return sum(1 for name, rel in items if skip_file(name, rel))
+    t, _ = _timed(match, repeat)
+    entry("skip_matcher", t, len(items))
+    return res
+
+
+def _compare(new: dict, old_path: str):
+    try:
+        with open(old_path, encoding="utf-8") as fh:
+            old = json.load(fh)["results"]
+    except (OSError, ValueError, KeyError) as e:
+        print(f"cannot read {old_path}: {e}")
+        return
+    print(f"\nvs {old_path}  (time ratio, <1 is faster)")
+    for name, r in new.items():
+        if name in old and old[name]["seconds"]:
+            ratio = r["seconds"] / old[name]["seconds"]
+            flag = "  REGRESSION" if ratio > 1.10 else ""
+            print(f"  {name:22s} {ratio:6.2f}x{flag}")
+
+
+def bench_suite(args):
+    tmp = Path(tempfile.mkdtemp(prefix="repoprep_bench_"))
+    try:
+        if args.tree:
+            tree, info = Path(args.tree), {"path": args.tree}
+        else:
+            tree = tmp / "tree"
+            t0 = time.perf_counter()
+            info = make_synthetic_tree(tree, args.files, args.seed, args.huge_mb)
+            print(f"tree: {args.files} files (seed {args.seed}) built in "
+                  f"{time.perf_counter() - t0:.1f} s")
+        results = run_suite(tree, tmp, args.repeat)
+        report = {"env": _env(), "tree": info, "repeat": args.repeat, "results": results}
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=1)
+        print(f"results written to {args.out}")
+        if args.compare:
+            _compare(results, args.compare)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+BENCHES = {
+    "walk":  bench_walk,
+    "pwalk": bench_pwalk,
+    "sniff": bench_sniff,
+    "rules": bench_rules,
+    "git":   bench_git,
+    "startup": bench_startup,
+    "gc":    bench_gc,
+    "suite": bench_suite,
+}
+
+
+def cli(argv=None):
+    ap = argparse.ArgumentParser(description="RepoPrep Pro benchmarks")
+    ap.add_argument("bench", choices=sorted(BENCHES))
+    ap.add_argument("--src",      type=int, default=2000, help="source files")
+    ap.add_argument("--packages", type=int, default=400,  help="node_modules packages")
+    ap.add_argument("--repeat",   type=int, default=3,    help="best-of-N timing")
+    ap.add_argument("--latency-ms", type=float, default=2, help="pwalk: delay per readdir")
+    ap.add_argument("--files",    type=int, default=20000, help="suite: synthetic tree size")
+    ap.add_argument("--seed",     type=int, default=0,    help="suite: tree seed")
+    ap.add_argument("--huge-mb",  type=int, default=16,   help="suite: size of each huge file")
+    ap.add_argument("--tree",     help="suite: use this folder instead of a synthetic tree")
+    ap.add_argument("--out",      default="bench-results.json", help="suite: JSON output")
+    ap.add_argument("--compare",  metavar="OLD.json", help="suite: compare with earlier results")
+    args = ap.parse_args(argv)
+    BENCHES[args.bench](args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -0,0 +1,1291 @@
+"""
+RepoPrep Pro v2.2.0 — Built by Lidprex Labs
+https://lidprex-labs.onrender.com/
+Supports: English / Arabic / Russian / Chinese
+
+The tkinter GUI.  Start it with ``python main.py`` (or ``python gui.py``);
+everything it runs comes from main.py.
+"""
+
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+import threading
+import os
+import sys
+import ctypes
+from pathlib import Path
+import webbrowser
+import math as _math
+from collections import deque
+
+from main import ARCHIVE_FORMATS, fmt_metrics, fmt_tokens, run_operation, scan_project
+
+# ══════════════════════════════════════════════════════════════════
+#  ICON HELPER
+# ══════════════════════════════════════════════════════════════════
+def get_icon_path():
+    if getattr(sys, 'frozen', False):
+        base_path = sys._MEIPASS
+    else:
+        base_path = os.path.dirname(os.path.abspath(__file__))
+    icon_path = os.path.join(base_path, "icon.ico")
+    return icon_path if os.path.exists(icon_path) else None
+
+# ══════════════════════════════════════════════════════════════════
+#  TRANSLATIONS
+# ══════════════════════════════════════════════════════════════════
+LANGS = {
+    "en": {
+        "app_title":         "RepoPrep Pro — Lidprex Labs",
+        "built_by":          "Built by",
+        "lang_label":        "Language",
+        "paths_title":       "Project Paths",
+        "source_label":      "Source — project folder",
+        "target_label":      "Output — where results will be saved",
+        "browse":            "Browse",
+        "modes_title":       "Operation Mode",
+        "mode_flatten":      "Flatten & Prepare for AI",
+        "mode_flatten_d":    "Copies all files into one flat folder with no subfolders. Ideal for sending your entire codebase to an AI tool.",
+        "mode_clean":        "Smart Clean",
+        "mode_clean_d":      "Removes node_modules, venv, .git, build artifacts and caches. Preserves the original folder structure.",
+        "mode_bundle":       "Single-File AI Bundle",
+        "mode_bundle_d":     "Streams every clean file into one Markdown document with path headers and code fences — paste it straight into an AI prompt.",
+        "mode_scan":         "Scan Only",
+        "mode_scan_d":       "Analyzes the project and shows what would be removed. Nothing is copied or deleted.",
+        "options_title":     "Options",
+        "opt_images":        "Include image files  (.png .jpg .gif .svg .webp ...)",
+        "opt_images_hint":   "Images are excluded by default to keep the output lightweight. Enable this if your project depends on image assets.",
+        "opt_workers":       "Copy threads  (0 = auto — picked from the storage type)",
+        "opt_incremental":   "Incremental sync — Smart Clean copies only new or changed files",
+        "opt_dedupe":        "De-duplicate — Flatten copies byte-identical files only once",
+        "opt_budget":        "Token budget — keep the most useful files up to this many tokens  (0 = no limit)",
+        "opt_sniff":         "Detect binaries by content — drop compiled blobs, model weights and databases with any extension",
+        "opt_reduce":        "Strip comments, docstrings and blank lines from source files (fewer tokens)",
+        "opt_max_size":      "Size limit per file in MB — bigger files keep only their first and last 32 KB  (0 = no limit)",
+        "opt_large_skip":    "…skip files over the limit instead of keeping excerpts",
+        "opt_gitignore":     "Honour .gitignore and .repoprepignore files in every folder",
+        "opt_git_index":     "List git repos from .git/index (tracked files only, no folder walk)",
+        "opt_untracked":     "…plus untracked files that are not ignored",
+        "opt_archive":       "Output archive — Clean / Flatten write one compressed file instead of a folder",
+        "actions_title":     "Actions",
+        "btn_run":           "Run",
+        "btn_scan":          "Scan",
+        "opt_rescan":        "Full rescan — ignore the scan cache (after editing files in place)",
+        "btn_clear":         "Clear Log",
+        "btn_open":          "Open Output Folder",
+        "log_title":         "Activity Log",
+        "stats_default":     "Select a source project to begin.",
+        "warn_no_src":       "Please select a source project folder.",
+        "warn_no_tgt":       "Please select an output folder.",
+        "err_no_src":        "Source folder not found:\n{}",
+        "confirm_overwrite": "'{}' already has files.\n\nContinue and merge / overwrite?",
+        "done_title":        "Complete!",
+        "done_msg":          "Operation finished.\n\n  Copied : {} files\n  Skipped: {} items\n\nOpen the output folder?",
+        "fail_title":        "Failed",
+        "fail_msg":          "Operation failed — check the log for details.",
+        "no_output":         "No output folder selected or it does not exist yet.",
+        "running":           "Running...",
+        "btn_cancel":        "Cancel",
+        "cancelled_title":   "Cancelled",
+        "cancelled_msg":     "Stopped after {} files. Run again to resume where it stopped.",
+        "scan_type":         "Project type",
+        "scan_total":        "Total",
+        "scan_after":        "After clean",
+        "scan_dirs":         "Dirs skipped",
+        "scan_files_s":      "Files skipped",
+        "scan_binary":       "Binary (by content)",
+        "scan_ignored":      "Ignored by .gitignore",
+        "scan_large":        "Over the size limit",
+        "stats_fmt":         "{type}  ·  {tf} files ({tm} MB)  →  {cf} clean files ({cm} MB, ~{tk} tokens)  ·  Removes: {sd} dirs, {sf} files  (saves ~{sv} MB)",
+        "footer_tagline":    "Building products with reputation, not noise",
+    },
+    "ar": {
+        "app_title":         "RepoPrep Pro — Lidprex Labs",
+        "built_by":          "من تطوير",
+        "lang_label":        "اللغة",
+        "paths_title":       "مسارات المشروع",
+        "source_label":      "المصدر — مجلد المشروع",
+        "target_label":      "الإخراج — مكان حفظ النتائج",
+        "browse":            "تصفح",
+        "modes_title":       "وضع التشغيل",
+        "mode_flatten":      "تسطيح المشروع للذكاء الاصطناعي",
+        "mode_flatten_d":    "ينسخ جميع الملفات في مجلد واحد بدون مجلدات فرعية. مثالي لإرسال المشروع كاملاً لأداة ذكاء اصطناعي.",
+        "mode_clean":        "تنظيف ذكي",
+        "mode_clean_d":      "يحذف node_modules وvenv و.git وملفات البناء والكاش. يحافظ على هيكل المجلدات الأصلي.",
+        "mode_bundle":       "حزمة ملف واحد للذكاء الاصطناعي",
+        "mode_bundle_d":     "يدمج كل الملفات النظيفة في مستند Markdown واحد مع عناوين المسارات وكتل الشيفرة — جاهز للصق في أداة ذكاء اصطناعي.",
+        "mode_scan":         "فحص فقط",
+        "mode_scan_d":       "يحلل المشروع ويُظهر ما سيُحذف. لا يتم نسخ أو حذف أي ملف.",
+        "options_title":     "الخيارات",
+        "opt_images":        "تضمين ملفات الصور  (.png .jpg .gif .svg .webp ...)",
+        "opt_images_hint":   "الصور مستبعدة افتراضياً لتخفيف حجم الإخراج. فعّل هذا الخيار إذا كان مشروعك يعتمد على ملفات الصور.",
+        "opt_workers":       "خيوط النسخ  (0 = تلقائي — حسب نوع وحدة التخزين)",
+        "opt_incremental":   "مزامنة تدريجية — التنظيف الذكي ينسخ الملفات الجديدة أو المعدّلة فقط",
+        "opt_dedupe":        "إزالة التكرار — التسطيح ينسخ الملفات المتطابقة مرة واحدة فقط",
+        "opt_budget":        "ميزانية الرموز — احتفظ بأهم الملفات حتى هذا العدد من الرموز  (0 = بلا حد)",
+        "opt_sniff":         "كشف الملفات الثنائية من محتواها — استبعاد الملفات المترجمة والأوزان وقواعد البيانات مهما كان امتدادها",
+        "opt_reduce":        "إزالة التعليقات وسلاسل التوثيق والأسطر الفارغة من ملفات المصدر (رموز أقل)",
+        "opt_max_size":      "حد الحجم لكل ملف بالميغابايت — الملفات الأكبر تحتفظ بأول وآخر 32 كيلوبايت فقط  (0 = بلا حد)",
+        "opt_large_skip":    "…تخطي الملفات التي تتجاوز الحد بدلاً من الاحتفاظ بمقتطفات",
+        "opt_gitignore":     "احترام ملفات ‎.gitignore‎ و ‎.repoprepignore‎ في كل مجلد",
+        "opt_git_index":     "قراءة مستودعات git من ‎.git/index‎ (الملفات المتتبعة فقط، بدون استعراض المجلدات)",
+        "opt_untracked":     "…مع الملفات غير المتتبعة وغير المستبعدة",
+        "opt_archive":       "أرشيف الإخراج — التنظيف / التسطيح يكتبان ملفًا مضغوطًا واحدًا بدل مجلد",
+        "actions_title":     "الإجراءات",
+        "btn_run":           "تشغيل",
+        "btn_scan":          "فحص",
+        "opt_rescan":        "فحص كامل — تجاهل ذاكرة الفحص المؤقتة (بعد تعديل الملفات في مكانها)",
+        "btn_clear":         "مسح السجل",
+        "btn_open":          "فتح مجلد الإخراج",
+        "log_title":         "سجل النشاط",
+        "stats_default":     "اختر مجلد المشروع للبدء.",
+        "warn_no_src":       "الرجاء تحديد مجلد المشروع المصدر.",
+        "warn_no_tgt":       "الرجاء تحديد مجلد الإخراج.",
+        "err_no_src":        "مجلد المصدر غير موجود:\n{}",
+        "confirm_overwrite": "'{}' يحتوي بالفعل على ملفات.\n\nهل تريد المتابعة والدمج/الكتابة فوقه؟",
+        "done_title":        "اكتمل!",
+        "done_msg":          "تمت العملية بنجاح.\n\n  منسوخ : {} ملف\n  متجاوَز: {} عنصر\n\nفتح مجلد الإخراج؟",
+        "fail_title":        "فشل",
+        "fail_msg":          "فشلت العملية — راجع السجل لمعرفة التفاصيل.",
+        "no_output":         "لم يتم تحديد مجلد إخراج أو أنه غير موجود بعد.",
+        "running":           "جارٍ التشغيل...",
+        "btn_cancel":        "إلغاء",
+        "cancelled_title":   "تم الإلغاء",
+        "cancelled_msg":     "توقف بعد {} ملف. شغّل مرة أخرى للاستئناف من حيث توقف.",
+        "scan_type":         "نوع المشروع",
+        "scan_total":        "الإجمالي",
+        "scan_after":        "بعد التنظيف",
+        "scan_dirs":         "مجلدات متجاوَزة",
+        "scan_files_s":      "ملفات متجاوَزة",
+        "scan_binary":       "ثنائية (حسب المحتوى)",
+        "scan_ignored":      "مستبعدة بواسطة ‎.gitignore‎",
+        "scan_large":        "تتجاوز حد الحجم",
+        "stats_fmt":         "{type}  ·  {tf} ملف ({tm} MB)  →  {cf} ملف نظيف ({cm} MB، ~{tk} رمز)  ·  يزيل: {sd} مجلد، {sf} ملف  (يوفر ~{sv} MB)",
+        "footer_tagline":    "نبني منتجات بسمعة راسخة، لا بضجيج",
+    },
+    "ru": {
+        "app_title":         "RepoPrep Pro — Lidprex Labs",
+        "built_by":          "Создано",
+        "lang_label":        "Язык",
+        "paths_title":       "Пути проекта",
+        "source_label":      "Источник — папка проекта",
+        "target_label":      "Вывод — куда сохранить результат",
+        "browse":            "Обзор",
+        "modes_title":       "Режим работы",
+        "mode_flatten":      "Сжать для ИИ",
+        "mode_flatten_d":    "Копирует все файлы в одну плоскую папку без вложенных. Идеально для отправки кодовой базы в ИИ-инструмент.",
+        "mode_clean":        "Умная очистка",
+        "mode_clean_d":      "Удаляет node_modules, venv, .git, артефакты сборки и кэш. Сохраняет исходную структуру папок.",
+        "mode_bundle":       "Один файл для ИИ",
+        "mode_bundle_d":     "Собирает все чистые файлы в один Markdown-документ с путями и блоками кода — можно сразу вставить в запрос к ИИ.",
+        "mode_scan":         "Только сканирование",
+        "mode_scan_d":       "Анализирует проект и показывает, что будет удалено. Файлы не копируются и не удаляются.",
+        "options_title":     "Параметры",
+        "opt_images":        "Включить файлы изображений  (.png .jpg .gif .svg .webp ...)",
+        "opt_images_hint":   "Изображения исключены по умолчанию. Включите, если проект зависит от графических ресурсов.",
+        "opt_workers":       "Потоки копирования  (0 = авто — по типу накопителя)",
+        "opt_incremental":   "Инкрементальная синхронизация — копировать только новые и изменённые файлы",
+        "opt_dedupe":        "Без дубликатов — при сжатии одинаковые файлы копируются один раз",
+        "opt_budget":        "Бюджет токенов — оставить самые полезные файлы в пределах лимита  (0 = без ограничения)",
+        "opt_sniff":         "Определять двоичные файлы по содержимому — отбрасывать бинарники, веса моделей и БД с любым расширением",
+        "opt_reduce":        "Удалять комментарии, docstring и пустые строки из исходников (меньше токенов)",
+        "opt_max_size":      "Лимит размера файла в МБ — от больших файлов остаются первые и последние 32 КБ  (0 = без ограничения)",
+        "opt_large_skip":    "…пропускать файлы сверх лимита вместо фрагментов",
+        "opt_gitignore":     "Учитывать .gitignore и .repoprepignore в каждой папке",
+        "opt_git_index":     "Брать список файлов git-репозитория из .git/index (только отслеживаемые, без обхода папок)",
+        "opt_untracked":     "…и неотслеживаемые файлы, которые не игнорируются",
+        "opt_archive":       "Архив на выходе — очистка и сжатие пишут один сжатый файл вместо папки",
+        "actions_title":     "Действия",
+        "btn_run":           "Запустить",
+        "btn_scan":          "Сканировать",
+        "opt_rescan":        "Полное сканирование — без кэша (после правки файлов на месте)",
+        "btn_clear":         "Очистить лог",
+        "btn_open":          "Открыть папку вывода",
+        "log_title":         "Журнал активности",
+        "stats_default":     "Выберите папку проекта для начала.",
+        "warn_no_src":       "Пожалуйста, выберите исходную папку проекта.",
+        "warn_no_tgt":       "Пожалуйста, выберите папку вывода.",
+        "err_no_src":        "Исходная папка не найдена:\n{}",
+        "confirm_overwrite": "'{}' уже содержит файлы.\n\nПродолжить и объединить/перезаписать?",
+        "done_title":        "Готово!",
+        "done_msg":          "Операция завершена.\n\n  Скопировано: {} файлов\n  Пропущено  : {} элементов\n\nОткрыть папку вывода?",
+        "fail_title":        "Ошибка",
+        "fail_msg":          "Операция не удалась — проверьте журнал.",
+        "no_output":         "Папка вывода не выбрана или ещё не существует.",
+        "running":           "Выполняется...",
+        "btn_cancel":        "Отмена",
+        "cancelled_title":   "Отменено",
+        "cancelled_msg":     "Остановлено после {} файлов. Запустите снова, чтобы продолжить с места остановки.",
+        "scan_type":         "Тип проекта",
+        "scan_total":        "Всего",
+        "scan_after":        "После очистки",
+        "scan_dirs":         "Папок пропущено",
+        "scan_files_s":      "Файлов пропущено",
+        "scan_binary":       "Двоичные (по содержимому)",
+        "scan_ignored":      "Исключены .gitignore",
+        "scan_large":        "Больше лимита",
+        "stats_fmt":         "{type}  ·  {tf} файлов ({tm} MB)  →  {cf} чистых ({cm} MB, ~{tk} токенов)  ·  Удалит: {sd} папок, {sf} файлов  (сэкономит ~{sv} MB)",
+        "footer_tagline":    "Создаём продукты с репутацией, без шума",
+    },
+    "zh": {
+        "app_title":         "RepoPrep Pro — Lidprex Labs",
+        "built_by":          "开发者",
+        "lang_label":        "语言",
+        "paths_title":       "项目路径",
+        "source_label":      "源目录 — 项目文件夹",
+        "target_label":      "输出目录 — 保存结果的位置",
+        "browse":            "浏览",
+        "modes_title":       "操作模式",
+        "mode_flatten":      "扁平化输出（为AI准备）",
+        "mode_flatten_d":    "将所有文件复制到一个扁平文件夹中，无子目录。非常适合将整个代码库发送到AI工具。",
+        "mode_clean":        "智能清理",
+        "mode_clean_d":      "删除node_modules、venv、.git、构建产物和缓存。保留原始文件夹结构。",
+        "mode_bundle":       "单文件 AI 合集",
+        "mode_bundle_d":     "将所有干净文件流式写入一个带路径标题和代码块的 Markdown 文档 — 可直接粘贴到 AI 提示中。",
+        "mode_scan":         "仅扫描",
+        "mode_scan_d":       "分析项目并显示将被删除的内容。不复制或删除任何文件。",
+        "options_title":     "选项",
+        "opt_images":        "包含图片文件  (.png .jpg .gif .svg .webp ...)",
+        "opt_images_hint":   "默认排除图片以减小输出体积。如果项目依赖图片资源，请启用此选项。",
+        "opt_workers":       "复制线程数（0 = 自动 — 根据存储类型选择）",
+        "opt_incremental":   "增量同步 — 智能清理仅复制新增或已修改的文件",
+        "opt_dedupe":        "去重 — 扁平化时内容相同的文件只复制一次",
+        "opt_budget":        "Token 预算 — 在此上限内保留最有用的文件（0 = 不限制）",
+        "opt_sniff":         "按内容识别二进制文件 — 排除任何扩展名的编译产物、模型权重和数据库",
+        "opt_reduce":        "删除源文件中的注释、文档字符串和空行（更少的 token）",
+        "opt_max_size":      "单个文件大小上限（MB）— 更大的文件只保留开头和结尾各 32 KB（0 = 不限制）",
+        "opt_large_skip":    "…跳过超过上限的文件，而不是保留片段",
+        "opt_gitignore":     "遵循每个文件夹中的 .gitignore 和 .repoprepignore",
+        "opt_git_index":     "从 .git/index 读取 git 仓库文件列表（仅已跟踪文件，不遍历文件夹）",
+        "opt_untracked":     "…以及未被忽略的未跟踪文件",
+        "opt_archive":       "输出归档 — 清理 / 扁平化写入一个压缩文件而不是文件夹",
+        "actions_title":     "操作",
+        "btn_run":           "运行",
+        "btn_scan":          "扫描",
+        "opt_rescan":        "完整重新扫描 — 忽略扫描缓存（就地编辑文件后）",
+        "btn_clear":         "清除日志",
+        "btn_open":          "打开输出文件夹",
+        "log_title":         "活动日志",
+        "stats_default":     "请选择源项目文件夹以开始。",
+        "warn_no_src":       "请选择源项目文件夹。",
+        "warn_no_tgt":       "请选择输出文件夹。",
+        "err_no_src":        "源文件夹未找到：\n{}",
+        "confirm_overwrite": "'{}' 已包含文件。\n\n是否继续合并/覆盖？",
+        "done_title":        "完成！",
+        "done_msg":          "操作已完成。\n\n  已复制：{} 个文件\n  已跳过：{} 个项目\n\n是否打开输出文件夹？",
+        "fail_title":        "失败",
+        "fail_msg":          "操作失败 — 请检查日志了解详情。",
+        "no_output":         "未选择输出文件夹或该文件夹尚不存在。",
+        "running":           "正在运行...",
+        "btn_cancel":        "取消",
+        "cancelled_title":   "已取消",
+        "cancelled_msg":     "已在 {} 个文件后停止。再次运行即可从中断处继续。",
+        "scan_type":         "项目类型",
+        "scan_total":        "总计",
+        "scan_after":        "清理后",
+        "scan_dirs":         "已跳过目录",
+        "scan_files_s":      "已跳过文件",
+        "scan_binary":       "二进制（按内容）",
+        "scan_ignored":      "被 .gitignore 忽略",
+        "scan_large":        "超过大小上限",
+        "stats_fmt":         "{type}  ·  共 {tf} 个文件 ({tm} MB)  →  {cf} 个干净文件 ({cm} MB，约 {tk} token)  ·  将删除: {sd} 目录, {sf} 文件  (节省约 {sv} MB)",
+        "footer_tagline":    "以口碑打造产品，而非喧嚣",
+    },
+}
+
+LANG_NAMES = {
+    "en": "English",
+    "ar": "العربية",
+    "ru": "Русский",
+    "zh": "中文",
+}
+
+# ══════════════════════════════════════════════════════════════════
+#  COLOUR PALETTE
+# ══════════════════════════════════════════════════════════════════
+C = {
+    "bg":        "#080812",
+    "surface":   "#0f0f1e",
+    "surface2":  "#171728",
+    "surface3":  "#1e1e36",
+    "border":    "#24244a",
+    "sel_bg":    "#1a1a40",
+    "sel_brd":   "#7c6dfa",
+    "accent":    "#7c6dfa",
+    "accent2":   "#fa6d8b",
+    "accent3":   "#38e5a0",
+    "text":      "#e4e4f4",
+    "muted":     "#50507a",
+    "warning":   "#f5a623",
+    "error":     "#fa6d6d",
+    "success":   "#38e5a0",
+    "copy_fg":   "#7ae89a",
+    "skip_fg":   "#2e2e56",
+    "warn_fg":   "#f5a623",
+    "done_fg":   "#38e5a0",
+    "info_fg":   "#7a9afa",
+    "scan_fg":   "#b090ff",
+    "footer_bg": "#05050e",
+    "title_bg":  "#06060e",
+}
+
+# ══════════════════════════════════════════════════════════════════
+#  ICON DRAWING
+# ══════════════════════════════════════════════════════════════════
+def _draw(canvas, name, s, col):
+    h = s // 2
+    if name == "folder":
+        canvas.create_polygon(2, h, 7, h, 9, h-3, s-2, h-3,
+                              s-2, s-3, 2, s-3, fill=col, outline="")
+    elif name == "scan":
+        canvas.create_oval(3, 3, s-6, s-6, outline=col, width=2)
+        canvas.create_line(s-6, s-6, s-2, s-2, fill=col, width=2.5)
+    elif name == "flatten":
+        for y in (3, 9, 15):
+            canvas.create_rectangle(2, y, s-2, y+4, fill=col, outline="")
+    elif name == "clean":
+        canvas.create_line(4, s-3, s-4, 4, fill=col, width=2)
+        canvas.create_polygon(3, s-2, 8, s-5, 6, s-8, fill=col, outline="")
+    elif name == "bundle":
+        canvas.create_rectangle(3, 2, s-3, s-2, fill="", outline=col, width=1.5)
+        for y in (6, 9, 12):
+            canvas.create_line(6, y, s-6, y, fill=col, width=1.5)
+    elif name == "play":
+        canvas.create_polygon(4, 2, 4, s-2, s-2, h, fill=col, outline="")
+    elif name == "clear":
+        canvas.create_line(3, 3, s-3, s-3, fill=col, width=2.5)
+        canvas.create_line(s-3, 3, 3, s-3, fill=col, width=2.5)
+    elif name == "info":
+        canvas.create_oval(2, 2, s-2, s-2, outline=col, width=1.5)
+        canvas.create_text(h, h+1, text="i", fill=col, font=("Georgia", 8, "bold"))
+    elif name == "image":
+        canvas.create_rectangle(2, 3, s-2, s-3, fill="", outline=col, width=1.5)
+        canvas.create_oval(4, 5, 8, 9, fill=col, outline="")
+        canvas.create_polygon(2, s-3, 7, s-9, 11, s-6,
+                              s-4, s-11, s-2, s-3, fill=col, outline="")
+    elif name == "gear":
+        canvas.create_oval(h-3, h-3, h+3, h+3, outline=col, width=1.5)
+        for deg in range(0, 360, 45):
+            a = _math.radians(deg)
+            canvas.create_line(h+4*_math.cos(a), h+4*_math.sin(a),
+                               h+7*_math.cos(a), h+7*_math.sin(a), fill=col, width=2)
+    elif name == "hex":
+        pts = []
+        for i in range(6):
+            a = _math.radians(60*i - 30)
+            pts += [h + (h-2)*_math.cos(a), h + (h-2)*_math.sin(a)]
+        canvas.create_polygon(*pts, fill="", outline=col, width=1.8)
+    elif name == "globe":
+        canvas.create_oval(2, 2, s-2, s-2, outline=col, width=1.5)
+        canvas.create_line(h, 2, h, s-2, fill=col, width=1)
+        canvas.create_line(2, h, s-2, h, fill=col, width=1)
+        canvas.create_oval(5, 6, s-5, s//2+2, fill="", outline=col, width=1)
+
+
+def mkic(parent, name, size=16, color=None, bg=None):
+    col  = color or C["muted"]
+    bg_c = bg    or C["surface"]
+    c = tk.Canvas(parent, width=size, height=size, bg=bg_c, highlightthickness=0)
+    _draw(c, name, size, col)
+    return c
+
+
+# ══════════════════════════════════════════════════════════════════
+#  UI UPDATE CHANNEL
+# ══════════════════════════════════════════════════════════════════
+UI_TICK_MS = 50          # how often the main loop drains worker updates
+
+
+class UiQueue:
+    """Worker threads → Tk main loop, without one after() per event.
+
+    Workers call log() / progress() / call() from any thread; the GUI
+    drains the queue on a fixed timer.  Progress is a single slot that
+    only keeps the latest value, so a million updates cost the UI one
+    redraw per tick.
+    """
+
+    def __init__(self):
+        self._lines = deque()        # (msg, level) — deque ops are atomic
+        self._calls = deque()
+        self._pct   = None
+
+    def log(self, msg, level="INFO"):
+        self._lines.append((msg, level))
+
+    def progress(self, pct):
+        self._pct = pct
+
+    def call(self, fn):
+        """Run *fn* on the main thread at the next tick."""
+        self._calls.append(fn)
+
+    def drain(self):
+        """Everything queued since the last drain: (lines, pct, calls)."""
+        pct, self._pct = self._pct, None
+        lines = [self._lines.popleft() for _ in range(len(self._lines))]
+        calls = [self._calls.popleft() for _ in range(len(self._calls))]
+        return lines, pct, calls
+
+
+# ══════════════════════════════════════════════════════════════════
+#  APPLICATION
+# ══════════════════════════════════════════════════════════════════
+class App(tk.Tk):
+    def __init__(self):
+        super().__init__()
+        self._lang     = tk.StringVar(value="en")
+        self._source   = tk.StringVar()
+        self._target   = tk.StringVar()
+        self._mode     = tk.StringVar(value="flatten")
+        self._inc_img  = tk.BooleanVar(value=False)
+        self._workers  = tk.IntVar(value=0)
+        self._incr     = tk.BooleanVar(value=False)
+        self._dedupe   = tk.BooleanVar(value=False)
+        self._budget   = tk.IntVar(value=0)
+        self._sniff    = tk.BooleanVar(value=False)
+        self._reduce   = tk.BooleanVar(value=False)
+        self._max_mb   = tk.IntVar(value=0)
+        self._lg_skip  = tk.BooleanVar(value=False)
+        self._gitign   = tk.BooleanVar(value=True)
+        self._gitidx   = tk.BooleanVar(value=False)
+        self._untrack  = tk.BooleanVar(value=False)
+        self._rescan   = tk.BooleanVar(value=False)
+        self._archive  = tk.StringVar(value="—")
+        self._scan_res = None
+        self._running  = False
+        self._ui       = UiQueue()
+        self._cancel   = threading.Event()
+
+        self.geometry("1060x790")
+        self.minsize(920, 660)
+        self.configure(bg=C["bg"])
+        self._apply_icon()
+
+        self._widgets:   dict = {}
+        self._mode_rows: dict = {}
+        self._mode_inds: dict = {}
+
+        self._build()
+        self._lang.trace_add("write", lambda *_: self._refresh_lang())
+        self._mode.trace_add("write", lambda *_: self._highlight_mode())
+        self._refresh_lang()
+        self.after(UI_TICK_MS, self._drain_ui)
+
+    def _apply_icon(self):
+        try:
+            icon_path = get_icon_path()
+            if icon_path and os.path.exists(icon_path):
+                self.iconbitmap(default=icon_path)
+                if sys.platform == "win32":
+                    ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(
+                        "lidprexlabs.repoprep.2.2")
+        except Exception:
+            pass
+
+    def t(self, key: str) -> str:
+        return LANGS.get(self._lang.get(), LANGS["en"]).get(key, key)
+
+    # ══════════════════════════════════════════════════════════════
+    #  LAYOUT
+    # ══════════════════════════════════════════════════════════════
+    def _build(self):
+        self._build_titlebar()
+
+        outer = tk.Frame(self, bg=C["bg"])
+        outer.pack(fill="both", expand=True, padx=18, pady=(10, 0))
+
+        left = tk.Frame(outer, bg=C["bg"])
+        left.pack(side="left", fill="both", expand=True)
+
+        right = tk.Frame(outer, bg=C["bg"], width=420)
+        right.pack(side="right", fill="both", expand=False, padx=(14, 0))
+        right.pack_propagate(False)
+
+        self._build_paths(left)
+        self._build_modes(left)
+        self._build_options(left)
+        self._build_actions(left)
+        self._build_log(right)
+
+        self._build_footer()
+
+    # ── Title bar ─────────────────────────────────────────────────
+    def _build_titlebar(self):
+        bar = tk.Frame(self, bg=C["title_bg"], height=56)
+        bar.pack(fill="x")
+        bar.pack_propagate(False)
+
+        # ── Left: logo + name + version
+        left_g = tk.Frame(bar, bg=C["title_bg"])
+        left_g.pack(side="left", padx=(16, 0))
+
+        hc = tk.Canvas(left_g, width=34, height=34, bg=C["title_bg"], highlightthickness=0)
+        hc.pack(side="left", padx=(0, 10), pady=11)
+        _draw(hc, "hex", 34, C["accent"])
+
+        tk.Label(left_g, text="RepoPrep Pro",
+                 font=("Helvetica", 15, "bold"),
+                 bg=C["title_bg"], fg=C["text"]).pack(side="left")
+        tk.Label(left_g, text=" v2.2.0",
+                 font=("Helvetica", 9), bg=C["title_bg"], fg=C["muted"]).pack(side="left", pady=18)
+
+        # ── Right group
+        right_g = tk.Frame(bar, bg=C["title_bg"])
+        right_g.pack(side="right", padx=14)
+
+        # Brand badge (clickable)
+        badge = tk.Frame(right_g, bg="#110c2a", padx=12, pady=6)
+        badge.pack(side="right", padx=(12, 0))
+        self._widgets["built_by_lbl"] = tk.Label(
+            badge, font=("Helvetica", 8), bg="#110c2a", fg=C["muted"])
+        self._widgets["built_by_lbl"].pack(side="left")
+        lx = tk.Label(badge, text=" Lidprex Labs",
+                      font=("Helvetica", 8, "bold"), bg="#110c2a", fg=C["accent"],
+                      cursor="hand2")
+        lx.pack(side="left")
+        lx.bind("<Button-1>", lambda e: webbrowser.open("https://lidprex-labs.onrender.com/"))
+        lx.bind("<Enter>",    lambda e: lx.configure(fg=C["accent2"]))
+        lx.bind("<Leave>",    lambda e: lx.configure(fg=C["accent"]))
+
+        # Language selector — clean OptionMenu, not a row of buttons
+        lang_g = tk.Frame(right_g, bg=C["title_bg"])
+        lang_g.pack(side="right")
+
+        mkic(lang_g, "globe", 15, C["muted"], C["title_bg"]).pack(side="left", padx=(0, 4))
+        self._widgets["lang_label"] = tk.Label(
+            lang_g, font=("Helvetica", 8), bg=C["title_bg"], fg=C["muted"])
+        self._widgets["lang_label"].pack(side="left", padx=(0, 5))
+
+        lang_codes = list(LANG_NAMES.keys())
+        self._lang_display = tk.StringVar(value=LANG_NAMES["en"])
+
+        om = tk.OptionMenu(lang_g, self._lang_display,
+                           *[LANG_NAMES[c] for c in lang_codes])
+        om.configure(
+            font=("Helvetica", 9), bg=C["surface2"], fg=C["text"],
+            activebackground=C["accent"], activeforeground="#fff",
+            relief="flat", bd=0, highlightthickness=0,
+            cursor="hand2", padx=10, pady=4,
+        )
+        om["menu"].configure(
+            bg=C["surface2"], fg=C["text"],
+            activebackground=C["accent"], activeforeground="#fff",
+            relief="flat", bd=0, font=("Helvetica", 9),
+        )
+        om.pack(side="left")
+        self._widgets["lang_om"] = om
+
+        def _on_lang_select(*_):
+            disp = self._lang_display.get()
+            for code, name in LANG_NAMES.items():
+                if name == disp:
+                    self._lang.set(code)
+                    break
+        self._lang_display.trace_add("write", _on_lang_select)
+
+    # ── Footer ────────────────────────────────────────────────────
+    def _build_footer(self):
+        foot = tk.Frame(self, bg=C["footer_bg"], height=36)
+        foot.pack(fill="x", side="bottom")
+        foot.pack_propagate(False)
+
+        # Tagline left
+        self._widgets["footer_tagline"] = tk.Label(
+            foot, font=("Helvetica", 8, "italic"),
+            bg=C["footer_bg"], fg=C["muted"])
+        self._widgets["footer_tagline"].pack(side="left", padx=16, pady=10)
+
+        # Links right
+        links = tk.Frame(foot, bg=C["footer_bg"])
+        links.pack(side="right", padx=16)
+
+        tk.Label(links, text="© 2026", font=("Helvetica", 8),
+                 bg=C["footer_bg"], fg=C["muted"]).pack(side="left", padx=(0, 8))
+
+        def _link(parent, text, url):
+            l = tk.Label(parent, text=text, font=("Helvetica", 8),
+                         bg=C["footer_bg"], fg=C["accent"], cursor="hand2")
+            l.pack(side="left", padx=(0, 10))
+            l.bind("<Button-1>", lambda e: webbrowser.open(url))
+            l.bind("<Enter>",    lambda e: l.configure(fg="#fff"))
+            l.bind("<Leave>",    lambda e: l.configure(fg=C["accent"]))
+
+        _link(links, "Lidprex Labs", "https://lidprex-labs.onrender.com/")
+        tk.Label(links, text="·", bg=C["footer_bg"], fg=C["muted"],
+                 font=("Helvetica", 8)).pack(side="left", padx=(0, 10))
+        _link(links, "Lidprex", "https://lidprex.onrender.com/")
+
+    # ── Card wrapper ─────────────────────────────────────────────
+    def _card(self, parent, key, icon_name, icon_color=None):
+        frame = tk.Frame(parent, bg=C["surface"],
+                         highlightbackground=C["border"], highlightthickness=1)
+        frame.pack(fill="x", pady=(0, 10))
+
+        hdr = tk.Frame(frame, bg=C["surface2"], height=34)
+        hdr.pack(fill="x")
+        hdr.pack_propagate(False)
+
+        mkic(hdr, icon_name, 16, icon_color or C["accent"], C["surface2"]) \
+            .pack(side="left", padx=(12, 6), pady=9)
+        lbl = tk.Label(hdr, font=("Helvetica", 9, "bold"),
+                       bg=C["surface2"], fg=C["text"])
+        lbl.pack(side="left")
+        self._widgets[key] = lbl
+
+        body = tk.Frame(frame, bg=C["surface"], padx=14, pady=12)
+        body.pack(fill="x")
+        return body
+
+    # ── Paths ─────────────────────────────────────────────────────
+    def _build_paths(self, parent):
+        c = self._card(parent, "paths_title", "folder")
+
+        for lbl_key, browse_key, var, cmd_name in [
+            ("source_label", "browse_src", self._source, "src"),
+            ("target_label", "browse_tgt", self._target, "tgt"),
+        ]:
+            self._widgets[lbl_key] = tk.Label(
+                c, font=("Helvetica", 8), bg=C["surface"], fg=C["muted"])
+            self._widgets[lbl_key].pack(anchor="w")
+
+            row = tk.Frame(c, bg=C["surface"])
+            row.pack(fill="x", pady=(2, 10))
+
+            ew = tk.Frame(row, bg=C["bg"],
+                          highlightbackground=C["border"], highlightthickness=1)
+            ew.pack(side="left", fill="x", expand=True)
+            tk.Entry(ew, textvariable=var, bg=C["bg"], fg=C["text"],
+                     relief="flat", insertbackground=C["accent"],
+                     font=("Courier", 9), bd=0) \
+                .pack(fill="x", ipady=8, ipadx=8)
+
+            cmd = self._pick_source if cmd_name == "src" else self._pick_target
+            self._widgets[browse_key] = tk.Button(
+                row, font=("Helvetica", 9), bg=C["surface2"], fg=C["text"],
+                relief="flat", cursor="hand2", padx=14, pady=5,
+                activebackground=C["accent"], activeforeground="#fff",
+                command=cmd)
+            self._widgets[browse_key].pack(side="right", padx=(8, 0))
+
+    # ── Modes ─────────────────────────────────────────────────────
+    def _build_modes(self, parent):
+        c = self._card(parent, "modes_title", "gear")
+
+        defs = [
+            ("flatten", "flatten", C["accent"],  "mode_flatten", "mode_flatten_d"),
+            ("clean",   "clean",   C["accent2"], "mode_clean",   "mode_clean_d"),
+            ("bundle",  "bundle",  C["warning"], "mode_bundle",  "mode_bundle_d"),
+            ("scan",    "scan",    C["accent3"], "mode_scan",    "mode_scan_d"),
+        ]
+
+        for val, ic_name, ic_col, lbl_key, desc_key in defs:
+            row = tk.Frame(c, bg=C["surface2"],
+                           highlightbackground=C["border"], highlightthickness=1,
+                           padx=12, pady=10, cursor="hand2")
+            row.pack(fill="x", pady=4)
+            self._mode_rows[val] = row
+
+            def _click(e, v=val): self._mode.set(v)
+            row.bind("<Button-1>", _click)
+
+            ic_c = mkic(row, ic_name, 18, ic_col, C["surface2"])
+            ic_c.pack(side="left", anchor="n", pady=2, padx=(0, 10))
+            ic_c.bind("<Button-1>", _click)
+
+            inner = tk.Frame(row, bg=C["surface2"])
+            inner.pack(side="left", fill="x", expand=True)
+            inner.bind("<Button-1>", _click)
+
+            top = tk.Frame(inner, bg=C["surface2"])
+            top.pack(fill="x")
+            top.bind("<Button-1>", _click)
+
+            ind = tk.Label(top, text="○", font=("Helvetica", 12),
+                           bg=C["surface2"], fg=C["muted"], cursor="hand2")
+            ind.pack(side="left", padx=(0, 6))
+            ind.bind("<Button-1>", _click)
+            self._mode_inds[val] = ind
+
+            title_lbl = tk.Label(top, font=("Helvetica", 10, "bold"),
+                                 bg=C["surface2"], fg=C["text"],
+                                 cursor="hand2", anchor="w")
+            title_lbl.pack(side="left", fill="x")
+            title_lbl.bind("<Button-1>", _click)
+            self._widgets[lbl_key] = title_lbl
+
+            desc_lbl = tk.Label(inner, font=("Helvetica", 8),
+                                bg=C["surface2"], fg=C["muted"],
+                                justify="left", wraplength=460, anchor="w")
+            desc_lbl.pack(anchor="w", pady=(3, 0))
+            desc_lbl.bind("<Button-1>", _click)
+            self._widgets[desc_key] = desc_lbl
+
+    def _highlight_mode(self):
+        cur = self._mode.get()
+        ic_colors = {"flatten": C["accent"], "clean": C["accent2"],
+                     "bundle": C["warning"], "scan": C["accent3"]}
+
+        for val, row in self._mode_rows.items():
+            sel = (val == cur)
+            bg  = C["sel_bg"]  if sel else C["surface2"]
+            brd = C["sel_brd"] if sel else C["border"]
+            row.configure(bg=bg, highlightbackground=brd)
+
+            def _repaint(w, b):
+                try:    w.configure(bg=b)
+                except: pass
+                for ch in w.winfo_children():
+                    _repaint(ch, b)
+
+            for ch in row.winfo_children():
+                _repaint(ch, bg)
+
+            ind = self._mode_inds.get(val)
+            if ind:
+                ind.configure(
+                    text="●" if sel else "○",
+                    fg=ic_colors[val] if sel else C["muted"], bg=bg)
+
+    # ── Options ───────────────────────────────────────────────────
+    def _build_options(self, parent):
+        c = self._card(parent, "options_title", "image", C["warning"])
+
+        row = tk.Frame(c, bg=C["surface"])
+        row.pack(fill="x")
+        mkic(row, "image", 16, C["warning"], C["surface"]).pack(side="left", padx=(0, 8))
+        self._widgets["opt_images_cb"] = tk.Checkbutton(
+            row, variable=self._inc_img, font=("Helvetica", 9),
+            bg=C["surface"], fg=C["text"], activebackground=C["surface"],
+            selectcolor=C["surface3"], cursor="hand2")
+        self._widgets["opt_images_cb"].pack(side="left")
+
+        self._widgets["opt_images_hint"] = tk.Label(
+            c, font=("Helvetica", 8), bg=C["surface"], fg=C["muted"],
+            justify="left", wraplength=500)
+        self._widgets["opt_images_hint"].pack(anchor="w", pady=(5, 0))
+
+        irow = tk.Frame(c, bg=C["surface"])
+        irow.pack(fill="x", pady=(10, 0))
+        mkic(irow, "clean", 16, C["warning"], C["surface"]).pack(side="left", padx=(0, 8))
+        self._widgets["opt_incremental_cb"] = tk.Checkbutton(
+            irow, variable=self._incr, font=("Helvetica", 9),
+            bg=C["surface"], fg=C["text"], activebackground=C["surface"],
+            selectcolor=C["surface3"], cursor="hand2")
+        self._widgets["opt_incremental_cb"].pack(side="left")
+
+        drow = tk.Frame(c, bg=C["surface"])
+        drow.pack(fill="x", pady=(6, 0))
+        mkic(drow, "flatten", 16, C["warning"], C["surface"]).pack(side="left", padx=(0, 8))
+        self._widgets["opt_dedupe_cb"] = tk.Checkbutton(
+            drow, variable=self._dedupe, font=("Helvetica", 9),
+            bg=C["surface"], fg=C["text"], activebackground=C["surface"],
+            selectcolor=C["surface3"], cursor="hand2")
+        self._widgets["opt_dedupe_cb"].pack(side="left")
+
+        srow = tk.Frame(c, bg=C["surface"])
+        srow.pack(fill="x", pady=(6, 0))
+        mkic(srow, "scan", 16, C["warning"], C["surface"]).pack(side="left", padx=(0, 8))
+        self._widgets["opt_sniff_cb"] = tk.Checkbutton(
+            srow, variable=self._sniff, font=("Helvetica", 9),
+            bg=C["surface"], fg=C["text"], activebackground=C["surface"],
+            selectcolor=C["surface3"], cursor="hand2")
+        self._widgets["opt_sniff_cb"].pack(side="left")
+
+        rrow = tk.Frame(c, bg=C["surface"])
+        rrow.pack(fill="x", pady=(6, 0))
+        mkic(rrow, "hex", 16, C["warning"], C["surface"]).pack(side="left", padx=(0, 8))
+        self._widgets["opt_reduce_cb"] = tk.Checkbutton(
+            rrow, variable=self._reduce, font=("Helvetica", 9),
+            bg=C["surface"], fg=C["text"], activebackground=C["surface"],
+            selectcolor=C["surface3"], cursor="hand2")
+        self._widgets["opt_reduce_cb"].pack(side="left")
+
+        grow = tk.Frame(c, bg=C["surface"])
+        grow.pack(fill="x", pady=(6, 0))
+        mkic(grow, "clean", 16, C["warning"], C["surface"]).pack(side="left", padx=(0, 8))
+        self._widgets["opt_gitignore_cb"] = tk.Checkbutton(
+            grow, variable=self._gitign, font=("Helvetica", 9),
+            bg=C["surface"], fg=C["text"], activebackground=C["surface"],
+            selectcolor=C["surface3"], cursor="hand2")
+        self._widgets["opt_gitignore_cb"].pack(side="left")
+
+        xrow = tk.Frame(c, bg=C["surface"])
+        xrow.pack(fill="x", pady=(6, 0))
+        mkic(xrow, "scan", 16, C["warning"], C["surface"]).pack(side="left", padx=(0, 8))
+        self._widgets["opt_git_index_cb"] = tk.Checkbutton(
+            xrow, variable=self._gitidx, font=("Helvetica", 9),
+            bg=C["surface"], fg=C["text"], activebackground=C["surface"],
+            selectcolor=C["surface3"], cursor="hand2")
+        self._widgets["opt_git_index_cb"].pack(side="left")
+        self._widgets["opt_untracked_cb"] = tk.Checkbutton(
+            c, variable=self._untrack, font=("Helvetica", 9),
+            bg=C["surface"], fg=C["muted"], activebackground=C["surface"],
+            selectcolor=C["surface3"], cursor="hand2")
+        self._widgets["opt_untracked_cb"].pack(anchor="w", padx=(24, 0))
+
+        brow = tk.Frame(c, bg=C["surface"])
+        brow.pack(fill="x", pady=(10, 0))
+        mkic(brow, "hex", 16, C["warning"], C["surface"]).pack(side="left", padx=(0, 8))
+        tk.Spinbox(
+            brow, from_=0, to=10_000_000, increment=8000, width=9,
+            textvariable=self._budget,
+            font=("Helvetica", 9), bg=C["bg"], fg=C["text"],
+            buttonbackground=C["surface2"], relief="flat",
+            insertbackground=C["accent"]).pack(side="left", padx=(0, 8))
+        self._widgets["opt_budget"] = tk.Label(
+            brow, font=("Helvetica", 9), bg=C["surface"], fg=C["text"])
+        self._widgets["opt_budget"].pack(side="left")
+
+        lrow = tk.Frame(c, bg=C["surface"])
+        lrow.pack(fill="x", pady=(6, 0))
+        mkic(lrow, "info", 16, C["warning"], C["surface"]).pack(side="left", padx=(0, 8))
+        tk.Spinbox(
+            lrow, from_=0, to=100_000, width=6, textvariable=self._max_mb,
+            font=("Helvetica", 9), bg=C["bg"], fg=C["text"],
+            buttonbackground=C["surface2"], relief="flat",
+            insertbackground=C["accent"]).pack(side="left", padx=(0, 8))
+        self._widgets["opt_max_size"] = tk.Label(
+            lrow, font=("Helvetica", 9), bg=C["surface"], fg=C["text"])
+        self._widgets["opt_max_size"].pack(side="left")
+        self._widgets["opt_large_skip_cb"] = tk.Checkbutton(
+            c, variable=self._lg_skip, font=("Helvetica", 9),
+            bg=C["surface"], fg=C["muted"], activebackground=C["surface"],
+            selectcolor=C["surface3"], cursor="hand2")
+        self._widgets["opt_large_skip_cb"].pack(anchor="w", padx=(24, 0))
+
+        wrow = tk.Frame(c, bg=C["surface"])
+        wrow.pack(fill="x", pady=(10, 0))
+        mkic(wrow, "gear", 16, C["warning"], C["surface"]).pack(side="left", padx=(0, 8))
+        tk.Spinbox(
+            wrow, from_=0, to=64, width=4, textvariable=self._workers,
+            font=("Helvetica", 9), bg=C["bg"], fg=C["text"],
+            buttonbackground=C["surface2"], relief="flat",
+            insertbackground=C["accent"]).pack(side="left", padx=(0, 8))
+        self._widgets["opt_workers"] = tk.Label(
+            wrow, font=("Helvetica", 9), bg=C["surface"], fg=C["text"])
+        self._widgets["opt_workers"].pack(side="left")
+
+        arow = tk.Frame(c, bg=C["surface"])
+        arow.pack(fill="x", pady=(6, 0))
+        mkic(arow, "bundle", 16, C["warning"], C["surface"]).pack(side="left", padx=(0, 8))
+        om = tk.OptionMenu(arow, self._archive, "—", *ARCHIVE_FORMATS)
+        om.configure(
+            font=("Helvetica", 9), bg=C["surface2"], fg=C["text"],
+            activebackground=C["accent"], activeforeground="#fff",
+            relief="flat", bd=0, highlightthickness=0, cursor="hand2", padx=6, pady=2)
+        om["menu"].configure(
+            bg=C["surface2"], fg=C["text"], activebackground=C["accent"],
+            activeforeground="#fff", relief="flat", bd=0, font=("Helvetica", 9))
+        om.pack(side="left", padx=(0, 8))
+        self._widgets["opt_archive"] = tk.Label(
+            arow, font=("Helvetica", 9), bg=C["surface"], fg=C["text"])
+        self._widgets["opt_archive"].pack(side="left")
+
+    # ── Actions ───────────────────────────────────────────────────
+    def _build_actions(self, parent):
+        c = self._card(parent, "actions_title", "play", C["success"])
+
+        btn_row = tk.Frame(c, bg=C["surface"])
+        btn_row.pack(fill="x")
+
+        self._widgets["btn_run"] = tk.Button(
+            btn_row, font=("Helvetica", 11, "bold"),
+            bg=C["accent"], fg="#fff", relief="flat", cursor="hand2",
+            activebackground="#9a8cff", activeforeground="#fff",
+            command=self._on_run)
+        self._widgets["btn_run"].pack(
+            side="left", fill="x", expand=True, ipady=9, padx=(0, 8))
+
+        self._widgets["btn_cancel"] = tk.Button(
+            btn_row, font=("Helvetica", 10, "bold"), state="disabled",
+            bg=C["surface2"], fg=C["error"], relief="flat", cursor="hand2",
+            activebackground=C["error"], activeforeground="#fff",
+            command=self._on_cancel)
+        self._widgets["btn_cancel"].pack(side="left", ipady=9, padx=(0, 8))
+
+        self._widgets["btn_scan"] = tk.Button(
+            btn_row, font=("Helvetica", 10, "bold"),
+            bg=C["surface2"], fg=C["text"], relief="flat", cursor="hand2",
+            activebackground=C["accent"], activeforeground="#fff",
+            command=self._on_scan)
+        self._widgets["btn_scan"].pack(
+            side="left", fill="x", expand=True, ipady=9, padx=(0, 8))
+
+        self._widgets["btn_clear"] = tk.Button(
+            btn_row, font=("Helvetica", 9),
+            bg=C["surface2"], fg=C["muted"], relief="flat", cursor="hand2",
+            activebackground=C["surface3"], activeforeground=C["text"],
+            command=self._clear_log, padx=16)
+        self._widgets["btn_clear"].pack(side="left", ipady=9)
+
+        # the scan index only notices folder changes; in-place edits need this
+        self._widgets["opt_rescan_cb"] = tk.Checkbutton(
+            c, variable=self._rescan, font=("Helvetica", 9),
+            bg=C["surface"], fg=C["muted"], activebackground=C["surface"],
+            selectcolor=C["surface3"], cursor="hand2")
+        self._widgets["opt_rescan_cb"].pack(anchor="w", pady=(6, 0))
+
+        self._stats_var = tk.StringVar()
+        self._widgets["stats_lbl"] = tk.Label(
+            c, textvariable=self._stats_var,
+            font=("Helvetica", 8), bg=C["surface"], fg=C["muted"],
+            anchor="w", wraplength=580, justify="left")
+        self._widgets["stats_lbl"].pack(anchor="w", pady=(10, 0))
+
+        sty = ttk.Style()
+        sty.theme_use("default")
+        sty.configure("LP.Horizontal.TProgressbar",
+                      troughcolor=C["surface2"], background=C["accent"], thickness=5)
+        self._progress = ttk.Progressbar(
+            c, style="LP.Horizontal.TProgressbar",
+            mode="determinate", maximum=100)
+        self._progress.pack(fill="x", pady=(8, 0))
+
+    # ── Log ───────────────────────────────────────────────────────
+    def _build_log(self, parent):
+        hdr = tk.Frame(parent, bg=C["surface2"],
+                       highlightbackground=C["border"], highlightthickness=1, height=36)
+        hdr.pack(fill="x")
+        hdr.pack_propagate(False)
+
+        mkic(hdr, "info", 16, C["accent2"], C["surface2"]).pack(side="left", padx=(12, 6), pady=10)
+        self._widgets["log_title"] = tk.Label(
+            hdr, font=("Helvetica", 9, "bold"), bg=C["surface2"], fg=C["text"])
+        self._widgets["log_title"].pack(side="left")
+
+        self._widgets["btn_open"] = tk.Button(
+            hdr, font=("Helvetica", 8), bg=C["surface2"], fg=C["muted"],
+            relief="flat", cursor="hand2",
+            activebackground=C["surface3"], activeforeground=C["accent"],
+            command=self._open_output)
+        self._widgets["btn_open"].pack(side="right", padx=10)
+
+        wrap = tk.Frame(parent, bg=C["surface"],
+                        highlightbackground=C["border"], highlightthickness=1)
+        wrap.pack(fill="both", expand=True)
+
+        self._log_txt = tk.Text(
+            wrap, bg="#040410", fg="#a0a0c8",
+            font=("Courier", 8), relief="flat", state="disabled",
+            wrap="word", insertbackground=C["accent"],
+            selectbackground=C["accent"], padx=10, pady=8)
+        self._log_txt.pack(side="left", fill="both", expand=True)
+
+        sb = tk.Scrollbar(wrap, command=self._log_txt.yview,
+                          bg=C["surface"], troughcolor=C["bg"],
+                          activebackground=C["accent"], relief="flat")
+        sb.pack(side="right", fill="y")
+        self._log_txt.configure(yscrollcommand=sb.set)
+
+        for tag, col in [
+            ("INFO",  C["info_fg"]), ("COPY",  C["copy_fg"]),
+            ("SKIP",  C["skip_fg"]), ("WARN",  C["warn_fg"]),
+            ("ERROR", C["error"]),   ("DONE",  C["done_fg"]),
+            ("SCAN",  C["scan_fg"]),
+        ]:
+            self._log_txt.tag_config(tag, foreground=col)
+
+    # ══════════════════════════════════════════════════════════════
+    #  LANGUAGE REFRESH
+    # ══════════════════════════════════════════════════════════════
+    def _refresh_lang(self):
+        self.title(self.t("app_title"))
+
+        map_ = {
+            "lang_label":      "lang_label",
+            "built_by_lbl":    "built_by",
+            "paths_title":     "paths_title",
+            "source_label":    "source_label",
+            "target_label":    "target_label",
+            "browse_src":      "browse",
+            "browse_tgt":      "browse",
+            "modes_title":     "modes_title",
+            "mode_flatten":    "mode_flatten",
+            "mode_flatten_d":  "mode_flatten_d",
+            "mode_clean":      "mode_clean",
+            "mode_clean_d":    "mode_clean_d",
+            "mode_bundle":     "mode_bundle",
+            "mode_bundle_d":   "mode_bundle_d",
+            "mode_scan":       "mode_scan",
+            "mode_scan_d":     "mode_scan_d",
+            "options_title":   "options_title",
+            "opt_images_cb":   "opt_images",
+            "opt_images_hint": "opt_images_hint",
+            "opt_workers":     "opt_workers",
+            "opt_incremental_cb": "opt_incremental",
+            "opt_dedupe_cb":   "opt_dedupe",
+            "opt_budget":      "opt_budget",
+            "opt_max_size":    "opt_max_size",
+            "opt_large_skip_cb": "opt_large_skip",
+            "opt_sniff_cb":    "opt_sniff",
+            "opt_reduce_cb":   "opt_reduce",
+            "opt_gitignore_cb": "opt_gitignore",
+            "opt_git_index_cb": "opt_git_index",
+            "opt_untracked_cb": "opt_untracked",
+            "opt_archive":     "opt_archive",
+            "actions_title":   "actions_title",
+            "btn_run":         "btn_run",
+            "btn_cancel":      "btn_cancel",
+            "btn_scan":        "btn_scan",
+            "opt_rescan_cb":   "opt_rescan",
+            "btn_clear":       "btn_clear",
+            "btn_open":        "btn_open",
+            "log_title":       "log_title",
+            "footer_tagline":  "footer_tagline",
+        }
+        for wkey, tkey in map_.items():
+            w = self._widgets.get(wkey)
+            if w:
+                try:    w.configure(text=self.t(tkey))
+                except: pass
+
+        if not self._scan_res:
+            self._stats_var.set(self.t("stats_default"))
+
+        self._highlight_mode()
+
+    # ══════════════════════════════════════════════════════════════
+    #  PICKING
+    # ══════════════════════════════════════════════════════════════
+    def _pick_source(self):
+        p = filedialog.askdirectory(title=self.t("source_label"))
+        if not p: return
+        self._source.set(p)
+        if not self._target.get():
+            self._target.set(
+                os.path.join(str(Path(p).parent), f"{Path(p).name}_prepared"))
+        self._do_scan_async(p)
+
+    def _pick_target(self):
+        p = filedialog.askdirectory(title=self.t("target_label"))
+        if p: self._target.set(p)
+
+    # ══════════════════════════════════════════════════════════════
+    #  SCAN
+    # ══════════════════════════════════════════════════════════════
+    def _on_scan(self):
+        src = self._source.get()
+        if not src:
+            messagebox.showwarning("", self.t("warn_no_src")); return
+        self._do_scan_async(src)
+
+    def _do_scan_async(self, path):
+        # read the Tk variables here — worker threads must not touch Tk
+        opts = dict(include_images=self._inc_img.get(), use_index=True,
+                    rescan=self._rescan.get(),
+                    sniff_binary=self._sniff.get(), gitignore=self._gitign.get(),
+                    git_index=self._gitidx.get(), untracked=self._untrack.get(),
+                    **self._large_opts())
+
+        def worker():
+            res = scan_project(path, **opts)
+            self._ui.call(lambda: self._show_scan(res))
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _show_scan(self, s):
+        self._scan_res = s
+        tm = round(s["total_size"]  / 1048576, 1)
+        cm = round(s["clean_size"]  / 1048576, 1)
+        sv = round(sum(s["skippable"].values()) / 1048576, 1)
+
+        self._stats_var.set(self.t("stats_fmt").format(
+            type=s["project_type"],
+            tf=s["total_files"], tm=tm,
+            cf=s["clean_files"], cm=cm, tk=fmt_tokens(s["clean_tokens"]),
+            sd=s["skipped_dirs"], sf=s["skipped_files"], sv=sv))
+        self._widgets["stats_lbl"].configure(fg=C["success"])
+
+        self._log("─" * 52, "INFO")
+        self._log(f"{self.t('scan_type')} : {s['project_type']}", "SCAN")
+        self._log(f"{self.t('scan_total')} : {s['total_files']} files  ({tm} MB)", "SCAN")
+        self._log(f"{self.t('scan_after')} : {s['clean_files']} files  ({cm} MB, "
+                  f"~{fmt_tokens(s['clean_tokens'])} tokens)", "SCAN")
+        self._log(f"{self.t('scan_dirs')} : {s['skipped_dirs']}   "
+                  f"{self.t('scan_files_s')}: {s['skipped_files']}", "SCAN")
+        if s.get("binary_files"):
+            self._log(f"{self.t('scan_binary')} : {s['binary_files']} files", "SCAN")
+        if s.get("ignored_files"):
+            self._log(f"{self.t('scan_ignored')} : {s['ignored_files']} files", "SCAN")
+        if s.get("large_files"):
+            self._log(f"{self.t('scan_large')} : {len(s['large_files'])} files", "SCAN")
+            for rel, sz in sorted(s["large_files"].items(), key=lambda x: -x[1])[:6]:
+                self._log(f"  large  {rel}  ({round(sz/1048576,1)} MB)", "SKIP")
+        self._log(f"Timing : {fmt_metrics(s['metrics'])}", "INFO")
+        for d, sz in sorted(s["skippable"].items(), key=lambda x: -x[1])[:6]:
+            self._log(f"  skip  {d}/  ({round(sz/1048576,1)} MB)", "SKIP")
+
+    def _large_opts(self):
+        try:
+            mb = max(0, int(self._max_mb.get()))
+        except (tk.TclError, ValueError):
+            mb = 0
+        return dict(max_file_size=mb * 1048576,
+                    large_files="skip" if self._lg_skip.get() else "truncate")
+
+    # ══════════════════════════════════════════════════════════════
+    #  RUN
+    # ══════════════════════════════════════════════════════════════
+    def _on_run(self):
+        mode = self._mode.get()
+        if mode == "scan":
+            self._on_scan(); return
+
+        src = self._source.get()
+        tgt = self._target.get()
+
+        if not src:
+            messagebox.showwarning("", self.t("warn_no_src")); return
+        if not Path(src).exists():
+            messagebox.showerror("", self.t("err_no_src").format(src)); return
+        if not tgt:
+            messagebox.showwarning("", self.t("warn_no_tgt")); return
+
+        t = Path(tgt)
+        if t.exists() and t != Path(src):
+            try:
+                if any(t.iterdir()):
+                    if not messagebox.askyesno("", self.t("confirm_overwrite").format(tgt)):
+                        return
+            except Exception:
+                pass
+
+        self._running = True
+        self._cancel.clear()
+        self._widgets["btn_run"].configure(state="disabled", text=self.t("running"))
+        self._widgets["btn_cancel"].configure(state="normal")
+        self._progress["value"] = 0
+        self._log("─" * 52, "INFO")
+        self._log(f"Mode   : {mode.upper()}", "INFO")
+        self._log(f"Source : {src}",          "INFO")
+        self._log(f"Output : {tgt}",          "INFO")
+
+        try:
+            workers = max(0, int(self._workers.get()))
+        except (tk.TclError, ValueError):
+            workers = 0
+        try:
+            budget = max(0, int(self._budget.get()))
+        except (tk.TclError, ValueError):
+            budget = 0
+
+        opts = dict(
+            include_images=self._inc_img.get(),
+            workers=workers,
+            incremental=self._incr.get(),
+            dedupe=self._dedupe.get(),
+            token_budget=budget,
+            sniff_binary=self._sniff.get(),
+            reduce=self._reduce.get(),
+            gitignore=self._gitign.get(),
+            git_index=self._gitidx.get(),
+            untracked=self._untrack.get(),
+            archive=self._archive.get() if self._archive.get() in ARCHIVE_FORMATS else None,
+            **self._large_opts(),
+        )
+
+        def worker():
+            result = run_operation(src, tgt, mode=mode,
+                                   log_cb=self._ui.log, progress_cb=self._ui.progress,
+                                   cancel_event=self._cancel, **opts)
+            self._ui.call(lambda: self._on_done(result, tgt))
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _set_progress(self, pct):
+        self._progress["value"] = pct
+
+    def _on_cancel(self):
+        # the worker finishes the copies in flight, then stops
+        self._cancel.set()
+        self._widgets["btn_cancel"].configure(state="disabled")
+
+    def _on_done(self, result, tgt):
+        self._running = False
+        self._widgets["btn_run"].configure(state="normal", text=self.t("btn_run"))
+        self._widgets["btn_cancel"].configure(state="disabled")
+        if result and isinstance(result, dict) and result.get("cancelled"):
+            messagebox.showinfo(self.t("cancelled_title"),
+                                self.t("cancelled_msg").format(result["copied"] + result["resumed"]))
+            return
+        self._progress["value"] = 100 if result else 0
+        if result and isinstance(result, dict):
+            if messagebox.askyesno(
+                    self.t("done_title"),
+                    self.t("done_msg").format(result["copied"], result["skipped"])):
+                self._open_folder(tgt)
+        else:
+            messagebox.showerror(self.t("fail_title"), self.t("fail_msg"))
+
+    # ══════════════════════════════════════════════════════════════
+    #  LOG HELPERS
+    # ══════════════════════════════════════════════════════════════
+    def _log(self, msg, level="INFO"):
+        self._log_lines([(msg, level)])
+
+    def _log_lines(self, lines):
+        # one insert for the whole batch: runs of the same level are
+        # joined into a single tagged chunk
+        chunks, run, level = [], [], None
+        for msg, lv in lines:
+            if lv != level and run:
+                chunks += ("".join(run), level)
+                run = []
+            level = lv
+            run.append(msg + "\n")
+        if run:
+            chunks += ("".join(run), level)
+        self._log_txt.configure(state="normal")
+        self._log_txt.insert("end", *chunks)
+        self._log_txt.see("end")
+        self._log_txt.configure(state="disabled")
+
+    def _drain_ui(self):
+        lines, pct, calls = self._ui.drain()
+        try:
+            if lines:
+                self._log_lines(lines)
+            if pct is not None:
+                self._set_progress(pct)
+            for fn in calls:
+                fn()
+        finally:
+            self.after(UI_TICK_MS, self._drain_ui)
+
+    def _clear_log(self):
+        self._log_txt.configure(state="normal")
+        self._log_txt.delete("1.0", "end")
+        self._log_txt.configure(state="disabled")
+        self._progress["value"] = 0
+
+    def _open_output(self):
+        tgt = self._target.get()
+        if tgt and Path(tgt).exists():
+            self._open_folder(tgt)
+        else:
+            messagebox.showinfo("", self.t("no_output"))
+
+    @staticmethod
+    def _open_folder(path):
+        if sys.platform == "win32":
+            os.startfile(path)
+        elif sys.platform == "darwin":
+            os.system(f'open "{path}"')
+        else:
+            os.system(f'xdg-open "{path}"')
+
+
+# ══════════════════════════════════════════════════════════════════
+#  ENTRY POINT
+# ══════════════════════════════════════════════════════════════════
+def run():
+    app = App()
+    app.update_idletasks()
+    w, h = 1060, 790
+    sw, sh = app.winfo_screenwidth(), app.winfo_screenheight()
+    app.geometry(f"{w}x{h}+{(sw-w)//2}+{(sh-h)//2}")
+    app.mainloop()
+
+
+if __name__ == "__main__":
+    run()
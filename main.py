@@ -2,216 +2,45 @@
 RepoPrep Pro v2.2.0 — Built by Lidprex Labs
 https://lidprex-labs.onrender.com/
 Supports: English / Arabic / Russian / Chinese
+
+Core logic and the command line.  The GUI lives in gui.py and is only
+imported when main.py runs without arguments:
+
+    python main.py                          # GUI
+    python main.py scan SRC [--json]
+    python main.py clean|flatten|bundle SRC DST [options]
+    python main.py watch SRC DST [--mode clean|flatten]
 """
 
-import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+__version__ = "2.2.0"
+
 import threading
+import io
+import queue
 import os
 import sys
 import shutil
+import errno
+import json
+import re
+import hashlib
+import mmap
+import heapq
+import struct
+import time
 import gc
-import ctypes
+try:
+    import fcntl               # POSIX only — used for reflink copies
+except ImportError:
+    fcntl = None
+try:
+    import sqlite3             # optional in some embedded builds
+except ImportError:
+    sqlite3 = None
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-import webbrowser
-import math as _math
-
-# ══════════════════════════════════════════════════════════════════
-#  ICON HELPER
-# ══════════════════════════════════════════════════════════════════
-def get_icon_path():
-    if getattr(sys, 'frozen', False):
-        base_path = sys._MEIPASS
-    else:
-        base_path = os.path.dirname(os.path.abspath(__file__))
-    icon_path = os.path.join(base_path, "icon.ico")
-    return icon_path if os.path.exists(icon_path) else None
-
-# ══════════════════════════════════════════════════════════════════
-#  TRANSLATIONS
-# ══════════════════════════════════════════════════════════════════
-LANGS = {
-    "en": {
-        "app_title":         "RepoPrep Pro — Lidprex Labs",
-        "built_by":          "Built by",
-        "lang_label":        "Language",
-        "paths_title":       "Project Paths",
-        "source_label":      "Source — project folder",
-        "target_label":      "Output — where results will be saved",
-        "browse":            "Browse",
-        "modes_title":       "Operation Mode",
-        "mode_flatten":      "Flatten & Prepare for AI",
-        "mode_flatten_d":    "Copies all files into one flat folder with no subfolders. Ideal for sending your entire codebase to an AI tool.",
-        "mode_clean":        "Smart Clean",
-        "mode_clean_d":      "Removes node_modules, venv, .git, build artifacts and caches. Preserves the original folder structure.",
-        "mode_scan":         "Scan Only",
-        "mode_scan_d":       "Analyzes the project and shows what would be removed. Nothing is copied or deleted.",
-        "options_title":     "Options",
-        "opt_images":        "Include image files  (.png .jpg .gif .svg .webp ...)",
-        "opt_images_hint":   "Images are excluded by default to keep the output lightweight. Enable this if your project depends on image assets.",
-        "actions_title":     "Actions",
-        "btn_run":           "Run",
-        "btn_scan":          "Scan",
-        "btn_clear":         "Clear Log",
-        "btn_open":          "Open Output Folder",
-        "log_title":         "Activity Log",
-        "stats_default":     "Select a source project to begin.",
-        "warn_no_src":       "Please select a source project folder.",
-        "warn_no_tgt":       "Please select an output folder.",
-        "err_no_src":        "Source folder not found:\n{}",
-        "confirm_overwrite": "'{}' already has files.\n\nContinue and merge / overwrite?",
-        "done_title":        "Complete!",
-        "done_msg":          "Operation finished.\n\n  Copied : {} files\n  Skipped: {} items\n\nOpen the output folder?",
-        "fail_title":        "Failed",
-        "fail_msg":          "Operation failed — check the log for details.",
-        "no_output":         "No output folder selected or it does not exist yet.",
-        "running":           "Running...",
-        "scan_type":         "Project type",
-        "scan_total":        "Total",
-        "scan_after":        "After clean",
-        "scan_dirs":         "Dirs skipped",
-        "scan_files_s":      "Files skipped",
-        "stats_fmt":         "{type}  ·  {tf} files ({tm} MB)  →  {cf} clean files ({cm} MB)  ·  Removes: {sd} dirs, {sf} files  (saves ~{sv} MB)",
-        "footer_tagline":    "Building products with reputation, not noise",
-    },
-    "ar": {
-        "app_title":         "RepoPrep Pro — Lidprex Labs",
-        "built_by":          "من تطوير",
-        "lang_label":        "اللغة",
-        "paths_title":       "مسارات المشروع",
-        "source_label":      "المصدر — مجلد المشروع",
-        "target_label":      "الإخراج — مكان حفظ النتائج",
-        "browse":            "تصفح",
-        "modes_title":       "وضع التشغيل",
-        "mode_flatten":      "تسطيح المشروع للذكاء الاصطناعي",
-        "mode_flatten_d":    "ينسخ جميع الملفات في مجلد واحد بدون مجلدات فرعية. مثالي لإرسال المشروع كاملاً لأداة ذكاء اصطناعي.",
-        "mode_clean":        "تنظيف ذكي",
-        "mode_clean_d":      "يحذف node_modules وvenv و.git وملفات البناء والكاش. يحافظ على هيكل المجلدات الأصلي.",
-        "mode_scan":         "فحص فقط",
-        "mode_scan_d":       "يحلل المشروع ويُظهر ما سيُحذف. لا يتم نسخ أو حذف أي ملف.",
-        "options_title":     "الخيارات",
-        "opt_images":        "تضمين ملفات الصور  (.png .jpg .gif .svg .webp ...)",
-        "opt_images_hint":   "الصور مستبعدة افتراضياً لتخفيف حجم الإخراج. فعّل هذا الخيار إذا كان مشروعك يعتمد على ملفات الصور.",
-        "actions_title":     "الإجراءات",
-        "btn_run":           "تشغيل",
-        "btn_scan":          "فحص",
-        "btn_clear":         "مسح السجل",
-        "btn_open":          "فتح مجلد الإخراج",
-        "log_title":         "سجل النشاط",
-        "stats_default":     "اختر مجلد المشروع للبدء.",
-        "warn_no_src":       "الرجاء تحديد مجلد المشروع المصدر.",
-        "warn_no_tgt":       "الرجاء تحديد مجلد الإخراج.",
-        "err_no_src":        "مجلد المصدر غير موجود:\n{}",
-        "confirm_overwrite": "'{}' يحتوي بالفعل على ملفات.\n\nهل تريد المتابعة والدمج/الكتابة فوقه؟",
-        "done_title":        "اكتمل!",
-        "done_msg":          "تمت العملية بنجاح.\n\n  منسوخ : {} ملف\n  متجاوَز: {} عنصر\n\nفتح مجلد الإخراج؟",
-        "fail_title":        "فشل",
-        "fail_msg":          "فشلت العملية — راجع السجل لمعرفة التفاصيل.",
-        "no_output":         "لم يتم تحديد مجلد إخراج أو أنه غير موجود بعد.",
-        "running":           "جارٍ التشغيل...",
-        "scan_type":         "نوع المشروع",
-        "scan_total":        "الإجمالي",
-        "scan_after":        "بعد التنظيف",
-        "scan_dirs":         "مجلدات متجاوَزة",
-        "scan_files_s":      "ملفات متجاوَزة",
-        "stats_fmt":         "{type}  ·  {tf} ملف ({tm} MB)  →  {cf} ملف نظيف ({cm} MB)  ·  يزيل: {sd} مجلد، {sf} ملف  (يوفر ~{sv} MB)",
-        "footer_tagline":    "نبني منتجات بسمعة راسخة، لا بضجيج",
-    },
-    "ru": {
-        "app_title":         "RepoPrep Pro — Lidprex Labs",
-        "built_by":          "Создано",
-        "lang_label":        "Язык",
-        "paths_title":       "Пути проекта",
-        "source_label":      "Источник — папка проекта",
-        "target_label":      "Вывод — куда сохранить результат",
-        "browse":            "Обзор",
-        "modes_title":       "Режим работы",
-        "mode_flatten":      "Сжать для ИИ",
-        "mode_flatten_d":    "Копирует все файлы в одну плоскую папку без вложенных. Идеально для отправки кодовой базы в ИИ-инструмент.",
-        "mode_clean":        "Умная очистка",
-        "mode_clean_d":      "Удаляет node_modules, venv, .git, артефакты сборки и кэш. Сохраняет исходную структуру папок.",
-        "mode_scan":         "Только сканирование",
-        "mode_scan_d":       "Анализирует проект и показывает, что будет удалено. Файлы не копируются и не удаляются.",
-        "options_title":     "Параметры",
-        "opt_images":        "Включить файлы изображений  (.png .jpg .gif .svg .webp ...)",
-        "opt_images_hint":   "Изображения исключены по умолчанию. Включите, если проект зависит от графических ресурсов.",
-        "actions_title":     "Действия",
-        "btn_run":           "Запустить",
-        "btn_scan":          "Сканировать",
-        "btn_clear":         "Очистить лог",
-        "btn_open":          "Открыть папку вывода",
-        "log_title":         "Журнал активности",
-        "stats_default":     "Выберите папку проекта для начала.",
-        "warn_no_src":       "Пожалуйста, выберите исходную папку проекта.",
-        "warn_no_tgt":       "Пожалуйста, выберите папку вывода.",
-        "err_no_src":        "Исходная папка не найдена:\n{}",
-        "confirm_overwrite": "'{}' уже содержит файлы.\n\nПродолжить и объединить/перезаписать?",
-        "done_title":        "Готово!",
-        "done_msg":          "Операция завершена.\n\n  Скопировано: {} файлов\n  Пропущено  : {} элементов\n\nОткрыть папку вывода?",
-        "fail_title":        "Ошибка",
-        "fail_msg":          "Операция не удалась — проверьте журнал.",
-        "no_output":         "Папка вывода не выбрана или ещё не существует.",
-        "running":           "Выполняется...",
-        "scan_type":         "Тип проекта",
-        "scan_total":        "Всего",
-        "scan_after":        "После очистки",
-        "scan_dirs":         "Папок пропущено",
-        "scan_files_s":      "Файлов пропущено",
-        "stats_fmt":         "{type}  ·  {tf} файлов ({tm} MB)  →  {cf} чистых ({cm} MB)  ·  Удалит: {sd} папок, {sf} файлов  (сэкономит ~{sv} MB)",
-        "footer_tagline":    "Создаём продукты с репутацией, без шума",
-    },
-    "zh": {
-        "app_title":         "RepoPrep Pro — Lidprex Labs",
-        "built_by":          "开发者",
-        "lang_label":        "语言",
-        "paths_title":       "项目路径",
-        "source_label":      "源目录 — 项目文件夹",
-        "target_label":      "输出目录 — 保存结果的位置",
-        "browse":            "浏览",
-        "modes_title":       "操作模式",
-        "mode_flatten":      "扁平化输出（为AI准备）",
-        "mode_flatten_d":    "将所有文件复制到一个扁平文件夹中，无子目录。非常适合将整个代码库发送到AI工具。",
-        "mode_clean":        "智能清理",
-        "mode_clean_d":      "删除node_modules、venv、.git、构建产物和缓存。保留原始文件夹结构。",
-        "mode_scan":         "仅扫描",
-        "mode_scan_d":       "分析项目并显示将被删除的内容。不复制或删除任何文件。",
-        "options_title":     "选项",
-        "opt_images":        "包含图片文件  (.png .jpg .gif .svg .webp ...)",
-        "opt_images_hint":   "默认排除图片以减小输出体积。如果项目依赖图片资源，请启用此选项。",
-        "actions_title":     "操作",
-        "btn_run":           "运行",
-        "btn_scan":          "扫描",
-        "btn_clear":         "清除日志",
-        "btn_open":          "打开输出文件夹",
-        "log_title":         "活动日志",
-        "stats_default":     "请选择源项目文件夹以开始。",
-        "warn_no_src":       "请选择源项目文件夹。",
-        "warn_no_tgt":       "请选择输出文件夹。",
-        "err_no_src":        "源文件夹未找到：\n{}",
-        "confirm_overwrite": "'{}' 已包含文件。\n\n是否继续合并/覆盖？",
-        "done_title":        "完成！",
-        "done_msg":          "操作已完成。\n\n  已复制：{} 个文件\n  已跳过：{} 个项目\n\n是否打开输出文件夹？",
-        "fail_title":        "失败",
-        "fail_msg":          "操作失败 — 请检查日志了解详情。",
-        "no_output":         "未选择输出文件夹或该文件夹尚不存在。",
-        "running":           "正在运行...",
-        "scan_type":         "项目类型",
-        "scan_total":        "总计",
-        "scan_after":        "清理后",
-        "scan_dirs":         "已跳过目录",
-        "scan_files_s":      "已跳过文件",
-        "stats_fmt":         "{type}  ·  共 {tf} 个文件 ({tm} MB)  →  {cf} 个干净文件 ({cm} MB)  ·  将删除: {sd} 目录, {sf} 文件  (节省约 {sv} MB)",
-        "footer_tagline":    "以口碑打造产品，而非喧嚣",
-    },
-}
-
-LANG_NAMES = {
-    "en": "English",
-    "ar": "العربية",
-    "ru": "Русский",
-    "zh": "中文",
-}
 
 # ══════════════════════════════════════════════════════════════════
 #  CORE LOGIC  (speed-optimised — batch logging, early skip)
@@ -247,6 +76,161 @@ SKIP_FILES = {
 IMAGE_EXT = {'.png', '.jpg', '.jpeg', '.gif', '.ico', '.svg', '.webp', '.bmp'}
 
 
+# ── Skip rules ────────────────────────────────────────────────────
+RULES_FILE = ".repoprep.json"
+
+
+def glob_to_regex(pat: str) -> str:
+    """Glob → regex source.  ``*`` and ``?`` stay inside one path
+    segment, ``**`` crosses segments, ``[...]`` classes pass through."""
+    out, i, n = [], 0, len(pat)
+    while i < n:
+        c = pat[i]
+        if c == "*":
+            if pat[i:i + 3] == "**/":
+                out.append("(?:.*/)?"); i += 3; continue
+            if pat[i:i + 2] == "**":
+                out.append(".*"); i += 2; continue
+            out.append("[^/]*")
+        elif c == "\\" and i + 1 < n:
+            out.append(re.escape(pat[i + 1])); i += 1
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            j = pat.find("]", i + 2 if pat[i + 1:i + 2] in ("!", "]") else i + 1)
+            if j < 0:
+                out.append(r"\[")
+            else:
+                body = pat[i + 1:j].replace("\\", "\\\\")
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = j
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+def _join(sources):
+    return re.compile("|".join(f"(?:{s})" for s in sources)).fullmatch if sources else None
+
+
+class _PatternSet:
+    """One compiled group of patterns (the excludes or the includes)."""
+
+    def __init__(self, patterns, file_names=(), dir_names=(), exts=()):
+        names, dir_only_names = set(), set()
+        self.exts = set(exts)
+        name, dir_name, path, dir_path = [], [], [], []
+        for raw in patterns:
+            pat = raw.strip().replace("\\", "/")
+            if not pat or pat.startswith("#"):
+                continue
+            dir_only = pat.endswith("/")
+            pat = pat.rstrip("/")
+            if "/" in pat:
+                (dir_path if dir_only else path).append(glob_to_regex(pat.lstrip("/")))
+            elif not any(ch in pat for ch in "*?["):
+                (dir_only_names if dir_only else names).add(pat)
+            elif (pat.startswith("*.") and not dir_only
+                  and not any(ch in pat[2:] for ch in "*?[.")):
+                self.exts.add(pat[1:].lower())
+            else:
+                (dir_name if dir_only else name).append(glob_to_regex(pat))
+
+        self.file_names = names | set(file_names)
+        self.dir_names  = names | dir_only_names | set(dir_names)
+        self.file_name  = _join(name)
+        self.file_path  = _join(path)
+        # directory checks also see the dir-only ("name/") patterns
+        self.dir_name   = _join(name + dir_name)
+        self.dir_path   = _join(path + dir_path)
+        self.has_file_re = bool(self.file_name or self.file_path)
+        self.empty = not (self.file_names or self.dir_names or self.exts
+                          or self.dir_name or self.dir_path or self.has_file_re)
+
+    def file(self, name, rel, ext) -> bool:
+        if name in self.file_names or ext in self.exts:
+            return True
+        if not self.has_file_re:
+            return False
+        if self.file_name and self.file_name(name):
+            return True
+        return bool(self.file_path and self.file_path(_posix(rel)))
+
+    def dir(self, name, rel) -> bool:
+        if name in self.dir_names:
+            return True
+        if self.dir_name and self.dir_name(name):
+            return True
+        return bool(self.dir_path and self.dir_path(_posix(rel)))
+
+
+def _posix(rel):
+    return rel if os.sep == "/" else rel.replace(os.sep, "/")
+
+
+class SkipRules:
+    """The skip decision for one run, compiled once.
+
+    Built-in names and extensions stay plain set lookups; user patterns
+    go into the cheapest bucket that can answer them:
+
+    * ``name``          exact file or directory name     → set
+    * ``*.ext``         plain extension                  → set
+    * ``*.min.js``      any other glob on the name       → one combined regex
+    * ``docs/**/*.md``  contains ``/``, matched from root → one combined regex
+
+    A trailing ``/`` limits a pattern to directories.  *include* patterns
+    win over everything, built-ins too — ``dist/`` in include keeps every
+    dist folder.  ``key`` is a JSON-friendly fingerprint of the rules.
+    """
+
+    def __init__(self, include_images=False, exclude=(), include=()):
+        exclude, include = list(exclude), list(include)
+        self.key   = [bool(include_images), exclude, include]
+        self._skip = _PatternSet(
+            exclude,
+            file_names=SKIP_DIRS | SKIP_FILES,
+            dir_names=SKIP_DIRS,
+            exts=SKIP_EXTENSIONS | (set() if include_images else IMAGE_EXT))
+        self._keep = _PatternSet(include)
+
+    def skip_dir(self, name, rel) -> bool:
+        """True if the walker should prune this directory."""
+        if not self._keep.empty and self._keep.dir(name, rel):
+            return False
+        return self._skip.dir(name, rel)
+
+    def included(self, name, rel, is_dir=False) -> bool:
+        """True if an *include* pattern forces this path in."""
+        if self._keep.empty:
+            return False
+        if is_dir:
+            return self._keep.dir(name, rel)
+        i = name.rfind(".")
+        return self._keep.file(name, rel, name[i:].lower() if 0 < i < len(name) - 1 else "")
+
+    def skip_file(self, name, rel) -> bool:
+        i   = name.rfind(".")
+        ext = name[i:].lower() if 0 < i < len(name) - 1 else ""
+        if not self._keep.empty and self._keep.file(name, rel, ext):
+            return False
+        return self._skip.file(name, rel, ext)
+
+    @classmethod
+    def load(cls, source, include_images=False, rules_file=None):
+        """Built-ins plus the ``exclude`` / ``include`` lists of
+        *rules_file* — or of <source>/.repoprep.json when there is one."""
+        path = Path(rules_file) if rules_file else Path(source) / RULES_FILE
+        cfg: dict = {}
+        if rules_file or path.is_file():
+            with open(path, encoding="utf-8") as fh:
+                cfg = json.load(fh)
+        return cls(include_images, cfg.get("exclude", ()), cfg.get("include", ()))
+
+
 def detect_type(path: Path) -> str:
     checks = [
         (["package.json"],                                  "Node.js / JavaScript"),
@@ -267,72 +251,2242 @@ def detect_type(path: Path) -> str:
     return "Generic"
 
 
-def _first_skip_dir(parts):
-    for p in parts[:-1]:
-        if p in SKIP_DIRS:
-            return p
-    return None
+# ── .gitignore / .repoprepignore ──────────────────────────────────
+IGNORE_FILES = (".gitignore", ".repoprepignore")   # later file wins at the same level
+_IGNORE_CACHE: dict = {}                           # (path, mtime_ns, size) → IgnoreFile
+
+
+def _gitignore_pattern(line: str):
+    """One .gitignore line → (regex source, negated, dir_only) or None."""
+    line = line.rstrip("\r\n")
+    if not line or line.startswith("#"):
+        return None
+    while line.endswith(" ") and not line.endswith("\\ "):
+        line = line[:-1]
+    negated = line.startswith("!")
+    if negated:
+        line = line[1:]
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+    # a slash anywhere but the end anchors the pattern to the file's folder
+    anchored = "/" in line
+    rx = glob_to_regex(line.lstrip("/"))
+    return (rx if anchored else "(?:.*/)?" + rx), negated, dir_only
+
+
+class IgnoreFile:
+    """The compiled patterns of one ignore file.
+
+    All patterns go into one regex, newest first, each in its own group:
+    the first alternative that matches is the *last* matching line, which
+    is the one git obeys, and ``lastindex`` says whether it was a negation.
+    *repoprep* marks a .repoprepignore, which also applies to tracked files.
+    """
+    __slots__ = ("base", "repoprep", "_file", "_file_neg", "_dir", "_dir_neg")
+
+    def __init__(self, base: str, lines, repoprep=False):
+        self.base = base
+        self.repoprep = repoprep
+        pats = [p for p in map(_gitignore_pattern, lines) if p]
+        pats.reverse()
+        self._file, self._file_neg = self._join([p for p in pats if not p[2]])
+        self._dir,  self._dir_neg  = self._join(pats)
+
+    @staticmethod
+    def _join(pats):
+        if not pats:
+            return None, ()
+        rx = re.compile("|".join(f"({src})" for src, _, _ in pats), re.DOTALL)
+        return rx.fullmatch, tuple(neg for _, neg, _ in pats)
+
+    def match(self, rel: str, is_dir: bool):
+        """True = ignored, False = re-included by ``!``, None = no line matched."""
+        fn, neg = (self._dir, self._dir_neg) if is_dir else (self._file, self._file_neg)
+        if fn is None:
+            return None
+        m = fn(rel[len(self.base) + 1:] if self.base else rel)
+        return None if m is None else not neg[m.lastindex - 1]
+
+
+def _load_ignore(path, base: str, st=None):
+    """IgnoreFile for *path*, cached until the file changes."""
+    try:
+        st  = st or os.stat(path)
+        key = (path, st.st_mtime_ns, st.st_size)
+        hit = _IGNORE_CACHE.get(key)
+        if hit is None:
+            with open(path, encoding="utf-8", errors="replace") as fh:
+                hit = _IGNORE_CACHE[key] = IgnoreFile(
+                    base, fh, os.path.basename(path) == IGNORE_FILES[1])
+        return hit
+    except OSError:
+        return None
+
+
+def is_ignored(ctx, rel: str, is_dir: bool, tracked: bool = False) -> bool:
+    """Walk the inherited ignore files deepest first; the first one with
+    an opinion decides — O(depth), one regex call per level.  For a
+    *tracked* path only .repoprepignore files count: git never ignores
+    tracked files, but RepoPrep's own ignore file still does."""
+    p = _posix(rel)
+    for ig in reversed(ctx):
+        if tracked and not ig.repoprep:
+            continue
+        r = ig.match(p, is_dir)
+        if r is not None:
+            return r
+    return False
+
+
+class WalkEntry:
+    """A file (or pruned directory) yielded by walk_tree().
+
+    Wraps the os.DirEntry so stat data is fetched at most once — on
+    Windows it is already cached from the directory listing itself.
+    """
+    __slots__ = ("path", "rel", "name", "is_dir", "ignored", "_entry", "_stat")
+
+    def __init__(self, entry, rel, is_dir):
+        self.path    = entry.path
+        self.rel     = rel
+        self.name    = entry.name
+        self.is_dir  = is_dir
+        self.ignored = False
+        self._entry  = entry
+        self._stat   = None
+
+    @property
+    def suffix(self):
+        # same rule as PurePath.suffix, without building a Path
+        name = self.name
+        i = name.rfind(".")
+        return name[i:] if 0 < i < len(name) - 1 else ""
+
+    def stat(self):
+        if self._stat is None:
+            self._stat = self._entry.stat()
+        return self._stat
 
+    @property
+    def size(self):
+        try:    return self.stat().st_size
+        except OSError: return 0
 
-def scan_project(source_dir: str, include_images: bool = False) -> dict:
-    path     = Path(source_dir)
-    skip_ext = SKIP_EXTENSIONS | (set() if include_images else IMAGE_EXT)
+
+_DEFAULT_RULES = None
+
+
+def _default_rules():
+    global _DEFAULT_RULES
+    if _DEFAULT_RULES is None:
+        _DEFAULT_RULES = SkipRules()
+    return _DEFAULT_RULES
+
+
+def _scandir(abs_dir, rel_dir):
+    with os.scandir(abs_dir) as it:
+        return list(it)
+
+
+def _walk_dir(rel_dir, abs_dir, ctx, rules, listdir, gitignore, keep):
+    """One directory of walk_tree(): returns (entries to yield, subdirs to
+    descend into as (rel, abs, ctx) jobs), both in walk order."""
+    try:
+        entries = sorted(listdir(abs_dir, rel_dir), key=lambda e: e.name)
+    except OSError:
+        return (), ()
+
+    if gitignore:
+        own = [e for e in entries if e.name in IGNORE_FILES]
+        if own:
+            own.sort(key=lambda e: IGNORE_FILES.index(e.name))
+            base = _posix(rel_dir)
+            ctx  = ctx + tuple(ig for ig in (
+                _load_ignore(e.path, base, e.stat()) for e in own) if ig)
+
+    prune   = rules.skip_dir
+    items   = []
+    subdirs = []
+    for entry in entries:
+        rel = f"{rel_dir}{os.sep}{entry.name}" if rel_dir else entry.name
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                if prune(entry.name, rel) or (
+                        ctx and is_ignored(ctx, rel, True, bool(keep) and _posix(rel) in keep)
+                        and not rules.included(entry.name, rel, True)):
+                    items.append(WalkEntry(entry, rel, True))
+                else:
+                    subdirs.append((rel, entry.path, ctx))
+            elif entry.is_file():
+                item = WalkEntry(entry, rel, False)
+                if ctx and is_ignored(ctx, rel, False, bool(keep) and _posix(rel) in keep):
+                    item.ignored = True
+                items.append(item)
+        except OSError:
+            continue
+    return items, subdirs
+
+
+WALK_AHEAD = 1024          # finished listings the parallel walk may hold unclaimed
+_RUNNING = object()
+_TAKEN   = object()
+
+
+class _DirCrawler:
+    """Lists directories ahead of a parallel walk_tree() on *threads*
+    threads.
+
+    Every finished listing queues its own subdirectories, so readdir and
+    stat calls stay in flight however the tree is shaped — that is what
+    hides SMB/NFS round-trips.  The queue is a heap keyed by path
+    components, which is exactly walk order, so workers always pick the
+    directory the consumer will need soonest; they pause once WALK_AHEAD
+    listings are waiting unclaimed.  A directory the consumer needs that
+    no worker has started yet is taken back and listed inline.
+    """
+
+    def __init__(self, threads, step):
+        self._step   = step
+        self._cv     = threading.Condition()
+        self._todo   = []              # heap of (path components, job)
+        self._state: dict = {}         # abs dir -> _RUNNING | _TAKEN | result
+        self._ready  = 0
+        self._closed = False
+        self._threads = [threading.Thread(target=self._work, name=f"walk-{i}", daemon=True)
+                         for i in range(threads)]
+        for t in self._threads:
+            t.start()
+
+    def _list(self, job):
+        items, subdirs = self._step(*job)
+        # the stat behind every file size is a round-trip too: warm the
+        # DirEntry cache here rather than one by one on the consumer
+        for item in items:
+            if not item.is_dir:
+                try:
+                    item._entry.stat()
+                except OSError:
+                    pass
+        return items, subdirs
+
+    def _queue(self, subdirs):
+        for job in subdirs:
+            heapq.heappush(self._todo, (job[0].split(os.sep), job))
+        self._cv.notify_all()
+
+    def _work(self):
+        cv = self._cv
+        while True:
+            with cv:
+                while not self._closed and (not self._todo or self._ready >= WALK_AHEAD):
+                    cv.wait()
+                if self._closed:
+                    return
+                job = heapq.heappop(self._todo)[1]
+                if self._state.pop(job[1], None) is _TAKEN:
+                    continue
+                self._state[job[1]] = _RUNNING
+            try:
+                res = self._list(job)
+            except BaseException as e:         # re-raised on the consumer
+                res = e
+            with cv:
+                if not isinstance(res, BaseException):
+                    self._queue(res[1])
+                self._state[job[1]] = res
+                self._ready += 1
+                cv.notify_all()
+
+    def take(self, job):
+        """The (entries, subdirs) of one directory, in walk order."""
+        cv = self._cv
+        with cv:
+            while True:
+                res = self._state.get(job[1])
+                if res is None:
+                    if job[0]:                 # still queued — take it back
+                        self._state[job[1]] = _TAKEN
+                    break
+                if res is not _RUNNING:
+                    del self._state[job[1]]
+                    self._ready -= 1
+                    cv.notify_all()
+                    if isinstance(res, BaseException):
+                        raise res
+                    return res
+                cv.wait()
+        res = self._list(job)
+        with cv:
+            self._queue(res[1])
+        return res
+
+    def close(self):
+        with self._cv:
+            self._closed = True
+            self._todo.clear()
+            self._cv.notify_all()
+        for t in self._threads:
+            t.join()
+
+
+def walk_tree(root, rules=None, listdir=_scandir, gitignore=False, keep=None,
+              threads=0):
+    """Yield a WalkEntry for every file under *root*, depth-first.
+
+    Directories that *rules* (a SkipRules, default: the built-in lists)
+    prune are yielded once (is_dir=True) and never descended into, so
+    node_modules & co. cost a single readdir entry instead of a stat per
+    file.  Entries are sorted by name so runs are reproducible (flatten's
+    ``__N`` suffixes stay stable).  Symlinked directories are not
+    followed, matching Path.rglob().  *listdir(abs_dir, rel_dir)* returns
+    the raw entries of one directory (see ScanIndex.listdir for the
+    cached variant).
+
+    With *gitignore*, .gitignore / .repoprepignore files are honoured at
+    every level: each folder inherits its parent's compiled ignore files
+    plus its own, ignored folders are pruned like skip dirs, and ignored
+    files come out with ``ignored`` set.  Include rules still win, and
+    paths in *keep* (a set of posix paths, e.g. git-tracked files and
+    their folders) answer to .repoprepignore files only.
+
+    *threads* > 1 lists (and stats) directories on that many threads (see
+    _DirCrawler) for network mounts and cold caches; the output is
+    identical, in the same order.  *listdir* must then be thread-safe.
+    """
+    rules = rules or _default_rules()
+    root  = os.fspath(root)
+    ctx0: tuple = ()
+    if gitignore:
+        info = _load_ignore(os.path.join(root, ".git", "info", "exclude"), "")
+        ctx0 = (info,) if info else ()
+
+    def step(rel_dir, abs_dir, ctx):
+        return _walk_dir(rel_dir, abs_dir, ctx, rules, listdir, gitignore, keep)
+
+    crawler = _DirCrawler(threads, step) if threads > 1 else None
+    take    = crawler.take if crawler else (lambda job: step(*job))
+    stack   = [("", root, ctx0)]
+    try:
+        while stack:
+            items, subdirs = take(stack.pop())
+            yield from items
+            stack.extend(reversed(subdirs))
+    finally:
+        if crawler:
+            crawler.close()
+
+
+# ── Git index fast path ───────────────────────────────────────────
+# .git/index already lists every tracked file with its size and mtime,
+# so a git checkout can be enumerated without a single readdir or stat.
+_INDEX_HDR   = struct.Struct(">4sII")
+_INDEX_STAT  = struct.Struct(">10I")      # ctime s/ns, mtime s/ns, dev, ino, mode, uid, gid, size
+_S_IFMT      = 0o170000
+_S_IFREG     = 0o100000
+_S_IFLNK     = 0o120000
+_SKIP_WORKTREE = 0x4000                   # extended flag: not checked out (sparse)
+
+
+def git_dir(root):
+    """The git directory of the work tree at *root*, or None.  Follows
+    the ``gitdir:`` file that linked worktrees and submodules use."""
+    dot = os.path.join(os.fspath(root), ".git")
+    if os.path.isdir(dot):
+        return dot
+    try:
+        with open(dot, encoding="utf-8") as fh:
+            line = fh.readline().strip()
+    except OSError:
+        return None
+    if not line.startswith("gitdir:"):
+        return None
+    gd = os.path.join(os.fspath(root), line[7:].strip())
+    return gd if os.path.isdir(gd) else None
+
+
+def _oid_size(gd) -> int:
+    # sha256 repositories say so in their config
+    try:
+        with open(os.path.join(gd, "config"), encoding="utf-8", errors="replace") as fh:
+            cfg = fh.read().lower()
+    except OSError:
+        return 20
+    return 32 if re.search(r"objectformat\s*=\s*sha256", cfg) else 20
+
+
+def read_git_index(root):
+    """Files tracked by the git work tree at *root*, read straight from
+    the index (versions 2–4, no git binary needed).
+
+    Returns a list of ``(rel posix path, size, mtime_ns, ino, dev)`` in
+    index order, or None when there is no index this parser can trust —
+    no repository, a split or sparse index, or an unknown format.
+    Submodules and files outside a sparse checkout are left out.
+    """
+    gd = git_dir(root)
+    if gd is None:
+        return None
+    try:
+        with open(os.path.join(gd, "index"), "rb") as fh:
+            data = fh.read()
+    except OSError:
+        return None
+    if len(data) < 12:
+        return None
+    sig, version, count = _INDEX_HDR.unpack_from(data)
+    if sig != b"DIRC" or version not in (2, 3, 4):
+        return None
+
+    oid   = _oid_size(gd)
+    fixed = _INDEX_STAT.size + oid + 2
+    end   = len(data) - oid
+    out   = []
+    prev  = b""
+    pos   = 12
+    try:
+        for _ in range(count):
+            (_, _, m_s, m_ns, dev, ino, mode, _, _, size) = _INDEX_STAT.unpack_from(data, pos)
+            flags = int.from_bytes(data[pos + fixed - 2:pos + fixed], "big")
+            p = pos + fixed
+            extended = 0
+            if flags & 0x4000 and version >= 3:
+                extended = int.from_bytes(data[p:p + 2], "big")
+                p += 2
+            if version == 4:
+                # prefix-compressed: strip N bytes of the previous name
+                c = data[p]; p += 1
+                strip = c & 127
+                while c & 128:
+                    c = data[p]; p += 1
+                    strip = ((strip + 1) << 7) | (c & 127)
+                nul  = data.index(b"\0", p)
+                name = prev[:len(prev) - strip] + data[p:nul]
+                pos  = nul + 1
+            else:
+                nul  = data.index(b"\0", p)
+                name = data[p:nul]
+                pos += (nul - pos + 8) & ~7          # 1–8 NULs pad to 8 bytes
+            if (mode & _S_IFMT) not in (_S_IFREG, _S_IFLNK):
+                if (mode & _S_IFMT) == 0o040000:
+                    return None                      # sparse index: directory entries
+                prev = name
+                continue                             # submodule (gitlink)
+            if name == prev or extended & _SKIP_WORKTREE:
+                prev = name
+                continue                             # merge-conflict stage / sparse
+            prev = name
+            out.append((name.decode("utf-8", "surrogateescape"), size,
+                        m_s * 1_000_000_000 + m_ns, ino, dev))
+        # a split index keeps most entries in a shared file
+        while pos + 8 <= end:
+            ext = data[pos:pos + 4]
+            if ext == b"link":
+                return None
+            pos += 8 + int.from_bytes(data[pos + 4:pos + 8], "big")
+    except (IndexError, ValueError, struct.error):
+        return None
+    return out
+
+
+class _GitEntry:
+    """Stands in for os.DirEntry when a file comes from the git index."""
+    __slots__ = ("name", "path", "_st")
+
+    def __init__(self, name, path, st=None):
+        self.name, self.path, self._st = name, path, st
+
+    def stat(self):
+        return self._st or os.stat(self.path)
+
+
+def git_tree(root, records, rules=None, trust_index=True, gitignore=False):
+    """walk_tree() over the tracked files in *records* (see read_git_index).
+
+    Same entries, same order and the same pruning as walk_tree, but no
+    directory listings.  With *trust_index* sizes come from the index
+    (stale only for edits not yet staged); otherwise every file is
+    stat'ed on demand, as a run that copies it must.  With *gitignore*
+    .repoprepignore files still apply (one stat per folder) — .gitignore
+    never hides a tracked file.
+    """
+    rules = rules or _default_rules()
+    prune = rules.skip_dir
+    root  = os.fspath(root)
+    sep   = os.sep
+    cut: dict = {"": None}       # dir rel → rel of its pruned ancestor, or None
+    ctxs: dict = {}              # dir rel → inherited .repoprepignore files
+    shown: set = set()
+
+    def ctx_of(d):
+        hit = ctxs.get(d)
+        if hit is None:
+            i  = d.rfind(sep)
+            up = ctx_of(d[:i] if i > 0 else "") if d else ()
+            ig = _load_ignore(os.path.join(root, d, IGNORE_FILES[1]), _posix(d))
+            hit = ctxs[d] = up + (ig,) if ig else up
+        return hit
+
+    def ignored(d, rel, is_dir):
+        return gitignore and bool(ctx_of(d)) and is_ignored(ctx_of(d), rel, is_dir, True)
+
+    def pruned_at(d):
+        hit = cut.get(d, False)
+        if hit is not False:
+            return hit
+        i = d.rfind(sep)
+        parent = d[:i] if i > 0 else ""
+        up = pruned_at(parent)
+        if up is None:
+            name = d[i + 1:]
+            if prune(name, d) or (ignored(parent, d, True)
+                                  and not rules.included(name, d, True)):
+                up = d
+        hit = cut[d] = up
+        return hit
+
+    # walk_tree order: at every level files (and pruned folders) first,
+    # by name, then each subfolder depth-first — as a plain string key:
+    # "\1" sorts a file before any "\2"-prefixed folder of its level
+    items = []
+    for path, size, mtime, ino, dev in records:
+        rel = path if sep == "/" else path.replace("/", sep)
+        i = rel.rfind(sep)
+        top = pruned_at(rel[:i]) if i > 0 else None
+        if top is not None:
+            if top in shown:
+                continue
+            shown.add(top)
+            rel, i, size = top, top.rfind(sep), None
+        key = ("\2" + rel[:i].replace(sep, "\1\2") + "\1\1" if i > 0 else "\1") + rel[i + 1:]
+        items.append((key, rel, i, size, mtime, ino, dev))
+    items.sort()
+
+    prefix = os.path.join(root, "")
+    for _, rel, i, size, mtime, ino, dev in items:
+        if size is None:
+            yield WalkEntry(_GitEntry(rel[i + 1:], prefix + rel), rel, True)
+        else:
+            st = _IndexedStat(size, mtime, 1, ino, dev) if trust_index else None
+            item = WalkEntry(_GitEntry(rel[i + 1:], prefix + rel, st), rel, False)
+            item.ignored = ignored(rel[:i] if i > 0 else "", rel, False)
+            yield item
+
+
+def list_tree(root, rules=None, listdir=_scandir, gitignore=False,
+              tracked=None, untracked=False, trust_index=False, threads=0):
+    """Pick the enumeration for one run: the git index when *tracked*
+    (from read_git_index) is given, plus a gitignore-aware walk for
+    untracked files if asked; otherwise a plain walk_tree().  *threads*
+    goes to walk_tree()."""
+    if tracked is None:
+        return walk_tree(root, rules, listdir, gitignore, threads=threads)
+    if not untracked:
+        return git_tree(root, tracked, rules, trust_index, gitignore)
+    # .gitignore never hides tracked files, even below an ignored folder
+    keep = set()
+    for path, *_ in tracked:
+        keep.add(path)
+        i = path.rfind("/")
+        while i > 0 and path[:i] not in keep:
+            keep.add(path[:i])
+            i = path.rfind("/", 0, i)
+    return walk_tree(root, rules, listdir, True, keep, threads)
+
+
+def _first_sight(st, inodes: set) -> bool:
+    """False if this inode was already counted (hard links, pnpm stores)."""
+    if st.st_nlink > 1 and st.st_ino:
+        key = (st.st_dev, st.st_ino)
+        if key in inodes:
+            return False
+        inodes.add(key)
+    return True
+
+
+def _tally_skipped(top, by_path: dict, by_name: dict, inodes: set,
+                   listdir=_scandir, rules=None):
+    """Size a pruned directory in one pass; returns (file count, bytes).
+
+    Every file's size goes to its *nearest* skipped ancestor, so
+    node_modules/pkg/dist is reported separately from node_modules and
+    nothing is counted twice.  Totals accumulate per relative path and
+    per directory name.
+    """
+    prune = (rules or _default_rules()).skip_dir
+    count = size = 0
+    stack = [(top.path, top.rel, top.rel, top.name)]
+    while stack:
+        abs_dir, rel_dir, owner, owner_name = stack.pop()
+        by_path.setdefault(owner, 0)
+        by_name.setdefault(owner_name, 0)
+        try:
+            entries = listdir(abs_dir, rel_dir)
+        except OSError:
+            continue
+
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    rel = f"{rel_dir}{os.sep}{entry.name}"
+                    if prune(entry.name, rel):
+                        stack.append((entry.path, rel, rel, entry.name))
+                    else:
+                        stack.append((entry.path, rel, owner, owner_name))
+                elif entry.is_file():
+                    st = entry.stat()
+                    count += 1
+                    if _first_sight(st, inodes):
+                        size                += st.st_size
+                        by_path[owner]      += st.st_size
+                        by_name[owner_name] += st.st_size
+            except OSError:
+                continue
+    return count, size
+
+
+def _classify(entries, rules, metrics=None):
+    """Filter stage: yields (entry, skip) for every walked entry; skip is
+    ``"ignored"`` for files a .gitignore excludes."""
+    skip_file = rules.skip_file
+    included  = rules.included
+    spent, n  = 0.0, 0
+    try:
+        for item in entries:
+            t = _perf()
+            if item.ignored and not included(item.name, item.rel):
+                skip = "ignored"
+            else:
+                skip = item.is_dir or skip_file(item.name, item.rel)
+            spent += _perf() - t
+            n += 1
+            yield item, skip
+    finally:
+        if metrics is not None:
+            metrics.add_wall("match", spent, n)
+
+
+# ── Binary sniffing ───────────────────────────────────────────────
+SNIFF_BYTES = 8192
+SNIFF_BATCH = 256
+BINARY_MAGIC = (
+    b"\x7fELF", b"MZ", b"\xca\xfe\xba\xbe", b"\xcf\xfa\xed\xfe", b"\xce\xfa\xed\xfe",
+    b"\x00asm", b"SQLite format 3\x00", b"PK\x03\x04", b"\x1f\x8b", b"BZh",
+    b"\xfd7zXZ\x00", b"7z\xbc\xaf\x27\x1c", b"Rar!", b"%PDF", b"\x89PNG", b"GIF8",
+    b"\xff\xd8\xff", b"PAR1", b"\x93NUMPY", b"GGUF", b"ORC", b"Obj\x01",
+    b"\x89HDF", b"\x28\xb5\x2f\xfd",
+)
+TEXT_EXT = {".txt", ".csv", ".tsv", ".cfg", ".conf", ".env", ".properties",
+            ".gitignore", ".gitattributes", ".editorconfig", ".rst", ".adoc"}
+_CONTROL = bytes(b for b in range(32) if b not in b"\t\n\r\f\b\x1b") + b"\x7f"
+# magics made only of printable ASCII ("MZ", "ORC", "%PDF") also start
+# plain text files, so alone they just lower the non-text threshold
+_PRINTABLE    = bytes(range(32, 127))
+_WEAK_MAGIC   = tuple(m for m in BINARY_MAGIC if not m.translate(None, _PRINTABLE))
+_STRONG_MAGIC = tuple(m for m in BINARY_MAGIC if m not in _WEAK_MAGIC)
+
+
+def looks_binary(head: bytes) -> bool:
+    """Decide from the first few KB of a file, the way `file` and git do:
+    magic numbers, any NUL byte, or more than 30 % non-text bytes (10 %
+    after an all-ASCII magic number)."""
+    if not head:
+        return False
+    if head.startswith((b"\xff\xfe", b"\xfe\xff", b"\xef\xbb\xbf")):
+        return False                        # BOM — UTF-16/UTF-8 text
+    if head.startswith(_STRONG_MAGIC) or b"\x00" in head:
+        return True
+    odd = len(head) - len(head.translate(None, _CONTROL))
+    try:
+        head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        if e.start < len(head) - 3:         # not just a character cut in half
+            odd += sum(1 for b in head if b > 0x7f)
+    return odd * 10 > len(head) * (1 if head.startswith(_WEAK_MAGIC) else 3)
+
+
+def is_binary_file(path) -> bool:
+    # raw os.open/os.read: no buffered-reader object per file
+    try:
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    except OSError:
+        return False
+    try:
+        return looks_binary(os.read(fd, SNIFF_BYTES))
+    except OSError:
+        return False
+    finally:
+        os.close(fd)
+
+
+def _sniff_many(paths):
+    return [is_binary_file(p) for p in paths]
+
+
+def _needs_sniff(item, skip) -> bool:
+    # known source / text extensions are trusted; images only get here
+    # when the user asked for them
+    if skip:
+        return False
+    ext = item.suffix.lower()
+    return ext not in FENCE_LANGS and ext not in TEXT_EXT and ext not in IMAGE_EXT
+
+
+def _sniff(pairs, workers=8, metrics=None):
+    """Filter stage: re-tags clean files whose content looks binary as
+    ``"binary"``.  Header reads go out in batches on a thread pool, so
+    the disk sees many requests at once; order is preserved."""
+    workers = max(1, workers)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        buf = []
+        for pair in pairs:
+            buf.append(pair)
+            if len(buf) >= SNIFF_BATCH:
+                yield from _sniff_batch(buf, pool, workers, metrics)
+                buf = []
+        yield from _sniff_batch(buf, pool, workers, metrics)
+
+
+def _sniff_batch(buf, pool, workers, metrics=None):
+    todo = [item.path for item, skip in buf if _needs_sniff(item, skip)]
+    # one task per worker-sized slice, not per file — a future costs
+    # more than reading a warm 8 KB header
+    n = max(1, -(-len(todo) // workers))
+    t = _perf()
+    flags = iter([f for chunk in pool.map(_sniff_many, [todo[i:i + n]
+                                          for i in range(0, len(todo), n)])
+                  for f in chunk])
+    if metrics is not None:
+        metrics.add_wall("sniff", _perf() - t)
+        metrics.count("open", len(todo))
+    for item, skip in buf:
+        if _needs_sniff(item, skip) and next(flags):
+            yield item, "binary"
+        else:
+            yield item, skip
+
+
+def _filter_stage(entries, rules, sniff_binary=False, workers=8, metrics=None):
+    pairs = _classify(entries, rules, metrics)
+    return _sniff(pairs, workers, metrics) if sniff_binary else pairs
+
+
+# ── Token estimates ───────────────────────────────────────────────
+# average bytes per LLM token (cl100k-style BPE), measured per family
+_TOKEN_FAMILIES = {
+    3.9: (".py", ".pyi", ".rb", ".go", ".rs", ".java", ".kt", ".scala", ".swift",
+          ".dart", ".php", ".lua", ".pl", ".r", ".jl", ".sh", ".bash", ".ps1"),
+    3.5: (".js", ".mjs", ".cjs", ".jsx", ".ts", ".tsx", ".vue", ".svelte",
+          ".c", ".h", ".cc", ".cpp", ".cxx", ".hpp", ".cs", ".m", ".mm", ".sql"),
+    3.1: (".json", ".yaml", ".yml", ".toml", ".ini", ".cfg", ".xml", ".html",
+          ".htm", ".css", ".scss", ".less", ".svg", ".csv", ".tsv", ".graphql"),
+    4.3: (".md", ".rst", ".txt", ".tex", ".adoc"),
+}
+TOKEN_BYTES = {ext: bpt for bpt, exts in _TOKEN_FAMILIES.items() for ext in exts}
+TOKEN_BYTES_DEFAULT = 3.7
+TOKEN_SAMPLE_BYTES  = 4096
+# GPT-style pre-tokenisation: words with their leading space, digit
+# groups of three, single punctuation marks, whitespace runs
+_PRETOKEN = re.compile(rb" ?[A-Za-z]+| ?\d{1,3}| ?[^\sA-Za-z\d]|\s+")
+
+
+def estimate_tokens(name: str, size: int, path=None, sample: bool = False) -> int:
+    """Rough LLM token count for a file of *size* bytes.
+
+    The default is a bytes-per-token ratio per language family.  With
+    *sample* the first 4 KB are pre-tokenised and that ratio is used
+    instead — slower (one read per file) but closer for unusual content
+    such as minified bundles or CJK text.
+    """
+    if size <= 0:
+        return 0
+    if sample and path is not None:
+        try:
+            with open(path, "rb") as fh:
+                head = fh.read(TOKEN_SAMPLE_BYTES)
+            if head:
+                return max(1, round(len(_PRETOKEN.findall(head)) * 1.1 * size / len(head)))
+        except OSError:
+            pass
+    i   = name.rfind(".")
+    bpt = TOKEN_BYTES.get(name[i:].lower(), TOKEN_BYTES_DEFAULT) if i > 0 else TOKEN_BYTES_DEFAULT
+    return max(1, round(size / bpt))
+
+
+_ENTRY_NAMES = {
+    "readme", "readme.md", "readme.rst", "readme.txt", "package.json",
+    "pyproject.toml", "setup.py", "setup.cfg", "cargo.toml", "go.mod", "pom.xml",
+    "build.gradle", "composer.json", "gemfile", "pubspec.yaml", "cmakelists.txt",
+    "makefile", "dockerfile", "main.py", "__main__.py", "index.js", "index.ts",
+    "main.go", "main.rs", "lib.rs", "app.py",
+}
+_TEST_PARTS = {"test", "tests", "__tests__", "spec", "specs", "testing", "e2e", "fixtures"}
+_DATA_EXT   = {".json", ".csv", ".tsv", ".sql", ".svg", ".xml", ".lock", ".map", ".txt"}
+
+
+def file_priority(rel: str) -> int:
+    """0 = most useful to an AI reader … 4 = least (used by fit_budget)."""
+    parts = rel.lower().split(os.sep)
+    name  = parts[-1]
+    if name in _ENTRY_NAMES and len(parts) <= 2:
+        return 0
+    stem, _, ext = name.rpartition(".")
+    ext = "." + ext if stem else ""
+    if (_TEST_PARTS.intersection(parts[:-1]) or name.startswith("test_")
+            or stem.endswith(("_test", ".test", ".spec"))):
+        return 3
+    if ext in FENCE_LANGS and ext not in _DATA_EXT and ext not in (".md", ".rst"):
+        return 1
+    if ext in (".md", ".rst", ".toml", ".ini", ".cfg", ".yaml", ".yml"):
+        return 2
+    return 4
+
+
+def fit_budget(files, budget: int):
+    """Pick files to fit *budget* tokens.  *files* is (rel, tokens) pairs.
+
+    Greedy first-fit: by priority tier, then shallow paths first, then
+    smallest first — a file too big for what is left is passed over so
+    smaller ones further down can still use the space.  Returns (set of
+    chosen rels, tokens used).
+    """
+    order  = sorted(files, key=lambda f: (file_priority(f[0]), f[0].count(os.sep), f[1], f[0]))
+    chosen = set()
+    used   = 0
+    for rel, tokens in order:
+        if used + tokens <= budget:
+            chosen.add(rel)
+            used += tokens
+    return chosen, used
+
+
+def fmt_tokens(n: int) -> str:
+    if n >= 1_000_000:
+        return f"{n / 1_000_000:.1f}M"
+    if n >= 10_000:
+        return f"{n // 1000}k"
+    return str(n)
+
+
+# ── Persistent scan index ─────────────────────────────────────────
+INDEX_MAX_SOURCES = 32                 # projects remembered (LRU)
+INDEX_MAX_BYTES   = 256 * 1048576      # listing payload cap across all projects
+INDEX_RACY_NS     = 2_000_000_000      # distrust dirs touched this close to a scan
+
+
+def user_cache_dir() -> Path:
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+        return Path(base) / "RepoPrep" / "Cache"
+    if sys.platform == "darwin":
+        return Path.home() / "Library" / "Caches" / "RepoPrep"
+    return Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "repoprep"
+
+
+class _IndexedStat:
+    __slots__ = ("st_size", "st_mtime_ns", "st_nlink", "st_ino", "st_dev")
+
+    def __init__(self, size, mtime_ns, nlink=1, ino=0, dev=0):
+        self.st_size, self.st_mtime_ns = size, mtime_ns
+        self.st_nlink, self.st_ino, self.st_dev = nlink, ino, dev
+
+
+class _IndexedEntry:
+    """Stands in for os.DirEntry when a listing comes from the index."""
+    __slots__ = ("name", "path", "_dir", "_st")
+
+    def __init__(self, prefix, rec):
+        self.name = rec[0]
+        self.path = prefix + rec[0]
+        self._dir = rec[1] == "d"
+        self._st  = None if self._dir else _IndexedStat(*rec[2:])
+
+    def is_dir(self, follow_symlinks=True):
+        return self._dir
+
+    def is_file(self):
+        return not self._dir
+
+    def stat(self):
+        return self._st
+
+
+class ScanIndex:
+    """SQLite cache of directory listings, one set of rows per source.
+
+    A directory whose mtime is unchanged since the last scan still has
+    the same entries, so its cached listing is used instead of calling
+    scandir and stat on every file.  File *contents* edited in place do
+    not bump the directory mtime, so sizes of such files can be stale
+    until that directory changes or a ``rescan`` is forced.
+    """
+
+    def __init__(self, root, rescan=False, db_path=None):
+        self.root    = os.path.abspath(os.fspath(root))
+        self.db_path = Path(db_path) if db_path else user_cache_dir() / "scan-index.sqlite3"
+        self.hits = self.misses = 0
+        self._cached: dict = {}
+        self._fresh:  dict = {}
+        self._seen:   set  = set()
+        self._lock = threading.Lock()       # counters, for a parallel walk
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.db_path), timeout=5)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS sources (
+                id INTEGER PRIMARY KEY, root TEXT UNIQUE,
+                scanned_ns INTEGER, last_used REAL);
+            CREATE TABLE IF NOT EXISTS dirs (
+                source_id INTEGER, rel TEXT, mtime_ns INTEGER, listing TEXT,
+                PRIMARY KEY (source_id, rel));
+        """)
+        row = self._db.execute(
+            "SELECT id, scanned_ns FROM sources WHERE root = ?", (self.root,)).fetchone()
+        if row:
+            self._sid, prev_scan = row
+        else:
+            self._sid = self._db.execute(
+                "INSERT INTO sources (root, scanned_ns, last_used) VALUES (?, 0, ?)",
+                (self.root, time.time())).lastrowid
+            prev_scan = 0
+        self._trust_before = prev_scan - INDEX_RACY_NS
+        self._started_ns   = time.time_ns()
+        if not rescan:
+            self._cached = {
+                rel: (mtime, listing) for rel, mtime, listing in self._db.execute(
+                    "SELECT rel, mtime_ns, listing FROM dirs WHERE source_id = ?",
+                    (self._sid,))
+            }
+
+    def listdir(self, abs_dir, rel_dir):
+        """Drop-in for _scandir(): cached entries if the dir is unchanged."""
+        mtime = os.stat(abs_dir).st_mtime_ns
+        self._seen.add(rel_dir)
+        hit = self._cached.get(rel_dir)
+        if hit and hit[0] == mtime and mtime < self._trust_before:
+            with self._lock:
+                self.hits += 1
+            prefix = abs_dir if abs_dir.endswith(os.sep) else abs_dir + os.sep
+            return [_IndexedEntry(prefix, rec) for rec in json.loads(hit[1])]
+
+        with self._lock:
+            self.misses += 1
+        entries = _scandir(abs_dir, rel_dir)
+        listing = []
+        for e in entries:
+            try:
+                if e.is_dir(follow_symlinks=False):
+                    listing.append([e.name, "d"])
+                elif e.is_file():
+                    st  = e.stat()
+                    rec = [e.name, "f", st.st_size, st.st_mtime_ns]
+                    if st.st_nlink > 1:
+                        rec += [st.st_nlink, st.st_ino, st.st_dev]
+                    listing.append(rec)
+            except OSError:
+                continue
+        self._fresh[rel_dir] = (mtime, json.dumps(listing, separators=(",", ":")))
+        return entries
+
+    def save(self):
+        gone = [(self._sid, rel) for rel in self._cached.keys() - self._seen]
+        with self._db:
+            self._db.executemany(
+                "DELETE FROM dirs WHERE source_id = ? AND rel = ?", gone)
+            self._db.executemany(
+                "INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?)",
+                [(self._sid, rel, m, l) for rel, (m, l) in self._fresh.items()])
+            self._db.execute(
+                "UPDATE sources SET scanned_ns = ?, last_used = ? WHERE id = ?",
+                (self._started_ns, time.time(), self._sid))
+        self._evict()
+        self._db.close()
+
+    def _evict(self):
+        """Forget least-recently scanned projects beyond the caps."""
+        with self._db:
+            while True:
+                n, size = self._db.execute(
+                    "SELECT (SELECT COUNT(*) FROM sources),"
+                    " (SELECT COALESCE(SUM(LENGTH(listing)), 0) FROM dirs)").fetchone()
+                if n <= 1 or (n <= INDEX_MAX_SOURCES and size <= INDEX_MAX_BYTES):
+                    break
+                oldest = self._db.execute(
+                    "SELECT id FROM sources ORDER BY last_used LIMIT 1").fetchone()[0]
+                self._db.execute("DELETE FROM dirs WHERE source_id = ?", (oldest,))
+                self._db.execute("DELETE FROM sources WHERE id = ?", (oldest,))
+
+
+def scan_project(source_dir: str, include_images: bool = False,
+                 use_index: bool = False, rescan: bool = False,
+                 sample_tokens: bool = False, sniff_binary: bool = False,
+                 rules_file=None, gitignore: bool = True,
+                 git_index: bool = False, untracked: bool = False,
+                 walk_threads: int = 0, max_file_size: int = 0,
+                 large_files: str = "truncate") -> dict:
+    """Count what a run would keep and skip.
+
+    With *use_index* directory listings are cached in a SQLite file under
+    the user cache folder, so re-scanning an unchanged tree skips the
+    walk; *rescan* ignores the cache (and refreshes it).  Clean files get
+    a token estimate (see estimate_tokens; *sample_tokens* reads a 4 KB
+    sample of each).  *sniff_binary* also drops files whose first bytes
+    look binary, whatever their extension.  User include / exclude
+    patterns come from *rules_file* or <source>/.repoprep.json.
+    *gitignore* honours .gitignore / .repoprepignore files on the way.
+    With *git_index* a git checkout is enumerated from .git/index alone
+    (sizes as last staged) — *untracked* adds files git does not ignore.
+    *walk_threads* > 1 lists and stats directories in parallel (same
+    results, same order) for network mounts and cold caches.
+    Files over *max_file_size* bytes are listed in ``stats["large_files"]``
+    and counted as skipped or, with *large_files* "truncate", as the
+    head + tail excerpt a run would write (see read_excerpt).
+    ``stats["metrics"]`` holds per-phase timings (see Metrics).
+    """
+    path = Path(source_dir)
+    metrics = Metrics()
+    try:
+        rules = SkipRules.load(path, include_images, rules_file)
+    except (OSError, ValueError):
+        rules = SkipRules(include_images)   # a broken rules file never blocks a scan
     stats = {
         "total_files": 0, "clean_files": 0,
         "skipped_dirs": 0, "skipped_files": 0,
-        "total_size": 0, "clean_size": 0,
-        "project_type": detect_type(path), "skippable": {},
+        "total_size": 0, "clean_size": 0, "clean_tokens": 0,
+        "binary_files": 0, "ignored_files": 0,
+        "project_type": detect_type(path),
+        "skippable": {},        # dir name      -> bytes
+        "skippable_paths": {},  # relative path -> bytes
+        "large_files": {},      # relative path -> bytes, over max_file_size
     }
-    seen: set = set()
+    inodes: set = set()
 
-    for item in path.rglob("*"):
+    index = None
+    if use_index and sqlite3 is not None:
         try:
-            rel   = item.relative_to(path)
-            parts = rel.parts
-
-            if item.is_dir():
-                if item.name in SKIP_DIRS and item.name not in seen:
-                    seen.add(item.name)
-                    stats["skipped_dirs"] += 1
-                    try:
-                        stats["skippable"][item.name] = sum(
-                            f.stat().st_size for f in item.rglob("*") if f.is_file())
-                    except Exception:
-                        stats["skippable"][item.name] = 0
-                continue
-
-            if not item.is_file():
+            index = ScanIndex(path, rescan=rescan)
+        except (sqlite3.Error, OSError):
+            index = None
+    listdir = index.listdir if index else _scandir
+
+    if git_index:
+        with metrics.phase("git_index"):
+            tracked = read_git_index(path)
+    else:
+        tracked = None
+    if tracked is not None:
+        stats["git_tracked"] = len(tracked)
+    # listings served from the index never reach the disk: count misses
+    walk    = list_tree(path, rules, metrics.timed("walk", listdir, None if index else "readdir"),
+                        gitignore, tracked, untracked, trust_index=True, threads=walk_threads)
+    entries = _filter_stage(walk, rules, sniff_binary,
+                            default_workers(path) if sniff_binary else 1, metrics)
+    stat_wall = tok_wall = 0.0
+    stat_n = disk_stats = tok_n = 0
+    for item, skip in entries:
+        try:
+            if item.is_dir:
+                with metrics.phase("tally"):
+                    count, size = _tally_skipped(
+                        item, stats["skippable_paths"], stats["skippable"], inodes,
+                        listdir, rules)
+                stats["skipped_dirs"]  += 1
+                stats["total_files"]   += count
+                stats["total_size"]    += size
+                stats["skipped_files"] += count
                 continue
 
             sz = 0
-            try: sz = item.stat().st_size
-            except Exception: pass
-
+            t  = _perf()
+            try:
+                if item._stat is None and isinstance(item._entry, os.DirEntry):
+                    disk_stats += 1         # the one that reaches the disk
+                st = item.stat()
+                if _first_sight(st, inodes):
+                    sz = st.st_size
+            except OSError as e:
+                metrics.error(e)
+            stat_wall += _perf() - t
+            stat_n    += 1
             stats["total_files"] += 1
             stats["total_size"]  += sz
 
-            skip_dir = _first_skip_dir(parts)
-            skip = (
-                skip_dir is not None
-                or item.name in SKIP_DIRS
-                or item.name in SKIP_FILES
-                or item.suffix.lower() in skip_ext
-            )
+            if max_file_size and not skip and sz > max_file_size:
+                stats["large_files"][item.rel] = sz
+                if large_files == "skip":
+                    skip = "large"
+                else:
+                    sz = min(sz, 2 * EXCERPT_BYTES)
             if skip:
                 stats["skipped_files"] += 1
+                if skip == "binary":
+                    stats["binary_files"] += 1
+                elif skip == "ignored":
+                    stats["ignored_files"] += 1
             else:
-                stats["clean_files"] += 1
-                stats["clean_size"]  += sz
-        except Exception:
+                stats["clean_files"]  += 1
+                stats["clean_size"]   += sz
+                t = _perf()
+                stats["clean_tokens"] += estimate_tokens(item.name, sz, item.path, sample_tokens)
+                tok_wall += _perf() - t
+                tok_n    += 1
+        except Exception as e:
+            metrics.error(e)
             continue
+
+    metrics.add_wall("stat", stat_wall, stat_n)
+    metrics.add_wall("tokens", tok_wall, tok_n)
+    metrics.count("stat", disk_stats)
+    if sample_tokens:
+        metrics.count("open", tok_n)
+    if index:
+        metrics.count("readdir", index.misses)
+        stats["index"] = {"hits": index.hits, "misses": index.misses}
+        try:
+            with metrics.phase("index_save"):
+                index.save()
+        except (sqlite3.Error, OSError) as e:
+            metrics.error(e)
+    stats["metrics"] = metrics.report(stats["total_files"], stats["total_size"])
     return stats
 
 
+def _is_rotational(path) -> bool:
+    """True if *path* lives on a spinning disk (Linux only, else False)."""
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        dev  = os.stat(path).st_dev
+        base = f"/sys/dev/block/{os.major(dev)}:{os.minor(dev)}"
+        # partitions keep the queue settings on their parent device
+        for p in (f"{base}/queue/rotational", f"{base}/../queue/rotational"):
+            if os.path.exists(p):
+                with open(p) as fh:
+                    return fh.read().strip() == "1"
+    except Exception:
+        pass
+    return False
+
+
+def default_workers(*paths) -> int:
+    """Copy threads to use for *paths*: 2 when any side is a spinning
+    disk (seeks dominate), otherwise scale with the CPU like the stdlib
+    thread pool does — SSD / NVMe and network shares want many requests
+    in flight."""
+    if any(_is_rotational(p) for p in paths):
+        return 2
+    return min(32, (os.cpu_count() or 4) + 4)
+
+
+# ── Copy strategies ───────────────────────────────────────────────
+FICLONE = 0x40049409     # linux/fs.h — _IOW(0x94, 9, int)
+
+# errors meaning "this strategy can't do this copy", not "the copy failed"
+_UNSUPPORTED = {
+    errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.ENOTTY, errno.EBADF,
+    errno.EOPNOTSUPP, getattr(errno, "ENOTSUP", errno.EOPNOTSUPP),
+}
+
+
+class _Unsupported(Exception):
+    pass
+
+
+def _unlink(path):
+    """Remove an old output before it is rewritten: after a "hardlink" run
+    it is the source's own inode, and opening it with "wb" would truncate
+    the source."""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _kernel_copy(src, dst, step):
+    """Open src/dst and run *step(fsrc, fdst, remaining)* until done."""
+    _unlink(dst)
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        remaining = os.fstat(fsrc.fileno()).st_size
+        size      = remaining
+        first     = True
+        while remaining > 0:
+            try:
+                n = step(fsrc.fileno(), fdst.fileno(), remaining)
+            except OSError as e:
+                if first and e.errno in _UNSUPPORTED:
+                    raise _Unsupported(e)
+                raise
+            if n == 0:
+                break
+            remaining -= n
+            first = False
+    if remaining > 0:
+        # some FUSE mounts and older cross-filesystem paths report 0 bytes
+        # instead of an error: never keep a short output, let the next
+        # strategy copy the file
+        raise _Unsupported(f"short copy: {size - remaining} of {size} bytes")
+    shutil.copystat(src, dst)
+    return size
+
+
+def _copy_reflink(src, dst):
+    if fcntl is None:
+        raise _Unsupported("no fcntl")
+    _unlink(dst)
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError as e:
+            if e.errno in _UNSUPPORTED:
+                raise _Unsupported(e)
+            raise
+        size = os.fstat(fsrc.fileno()).st_size
+    shutil.copystat(src, dst)
+    return size
+
+
+def _copy_file_range(src, dst):
+    if not hasattr(os, "copy_file_range"):
+        raise _Unsupported("no copy_file_range")
+    return _kernel_copy(src, dst, lambda i, o, n: os.copy_file_range(i, o, n))
+
+
+def _copy_sendfile(src, dst):
+    if not hasattr(os, "sendfile") or not sys.platform.startswith("linux"):
+        raise _Unsupported("no sendfile to files")
+    offset = [0]
+    def step(i, o, n):
+        sent = os.sendfile(o, i, offset[0], min(n, 1 << 30))
+        offset[0] += sent
+        return sent
+    return _kernel_copy(src, dst, step)
+
+
+def _copy_plain(src, dst):
+    _unlink(dst)
+    shutil.copy2(src, dst)
+    return os.stat(dst).st_size
+
+
+def _copy_hardlink(src, dst):
+    _unlink(dst)
+    try:
+        os.link(src, dst)
+    except OSError as e:
+        if e.errno in _UNSUPPORTED or e.errno in (errno.EPERM, errno.EMLINK):
+            raise _Unsupported(e)
+        raise
+    return os.stat(dst).st_size
+
+
+COPY_STRATEGIES = {
+    "reflink":         _copy_reflink,
+    "copy_file_range": _copy_file_range,
+    "sendfile":        _copy_sendfile,
+    "copy":            _copy_plain,
+    "hardlink":        _copy_hardlink,
+}
+COPY_MODES = ("auto",) + tuple(COPY_STRATEGIES)
+_AUTO_CHAIN = ("reflink", "copy_file_range", "sendfile", "copy")
+
+
+class Copier:
+    """Copies one file with the fastest strategy that works.
+
+    ``mode="auto"`` tries reflink (copy-on-write, btrfs / XFS) →
+    copy_file_range → sendfile → shutil.copy2.  Any other mode tries that
+    strategy first and falls back to a plain copy.  "hardlink" links the
+    output to the source — only for read-only snapshots.  A strategy that
+    reports "unsupported" once is dropped for the rest of the run.
+    Thread-safe; ``used`` maps strategy → [files, bytes].
+    """
+
+    def __init__(self, mode="auto"):
+        if mode not in COPY_MODES:
+            raise ValueError(f"unknown copy mode: {mode!r}")
+        self.chain = list(_AUTO_CHAIN if mode == "auto" else dict.fromkeys((mode, "copy")))
+        self.used: dict = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, src, dst):
+        for name in list(self.chain):
+            try:
+                size = COPY_STRATEGIES[name](src, dst)
+            except _Unsupported:
+                with self._lock:
+                    if name in self.chain and len(self.chain) > 1:
+                        self.chain.remove(name)
+                continue
+            with self._lock:
+                files_bytes = self.used.setdefault(name, [0, 0])
+                files_bytes[0] += 1
+                files_bytes[1] += size
+            return name
+        raise OSError(f"no copy strategy could copy {src}")
+
+    def summary(self) -> str:
+        return ",  ".join(
+            f"{name} {n} files / {round(b / 1048576, 1)} MB"
+            for name, (n, b) in sorted(self.used.items(), key=lambda x: -x[1][1])
+        ) or "nothing copied"
+
+
+# ── Incremental manifest ──────────────────────────────────────────
+MANIFEST_NAME = ".repoprep-manifest.json"
+
+
+def file_hash(path, chunk=1 << 20) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_manifest(target) -> dict:
+    """rel path -> [size, mtime_ns, hash-or-None]; {} if missing or unreadable."""
+    try:
+        with open(Path(target) / MANIFEST_NAME, encoding="utf-8") as fh:
+            data = json.load(fh)
+        if data.get("version") == 1:
+            return data["files"]
+    except Exception:
+        pass
+    return {}
+
+
+def save_manifest(target, files: dict):
+    """Write the manifest atomically so an interrupted run never leaves
+    a half-written file behind."""
+    path = Path(target) / MANIFEST_NAME
+    tmp  = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump({"version": 1, "files": files}, fh, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def _prune_removed(target: Path, stale):
+    """Delete output files whose source is gone, plus emptied folders.
+    Only paths listed in the previous manifest are ever touched."""
+    removed = 0
+    for rel in stale:
+        dest = target / rel
+        try:
+            dest.unlink()
+            removed += 1
+        except FileNotFoundError:
+            continue
+        except OSError:
+            continue
+        parent = dest.parent
+        while parent != target:
+            try:
+                parent.rmdir()
+            except OSError:
+                break
+            parent = parent.parent
+    return removed
+
+
+# ── Resume journal ────────────────────────────────────────────────
+JOURNAL_NAME = ".repoprep-journal.jsonl"
+
+
+class Journal:
+    """Append-only log of finished copies, kept in the target folder.
+
+    A line is written (and flushed) only after its copy completed, so
+    after a crash or a cancel every listed output is whole.  A re-run
+    with the same source and mode skips files whose source is unchanged
+    and whose output is still in place; a run that finishes deletes the
+    journal.  Line 1 identifies the run — source, mode and the *options*
+    that shape the output, so other settings start over — each further
+    line is
+    ``[output rel, source rel, size, mtime_ns, output size]`` — the output
+    size differs from the source's when --strip or an excerpt wrote it.
+    """
+
+    def __init__(self, target, source, mode, options=None):
+        self.path = Path(target) / JOURNAL_NAME
+        self.done: dict = {}     # output rel -> [source rel, size, mtime_ns, out size]
+        head = {"version": 2, "source": os.path.abspath(source), "mode": mode,
+                "options": json.loads(json.dumps(options or {}))}
+        self._load(head)
+        # rewrite the valid part: drops a line torn by a crash, so the
+        # appends below always start on a fresh line
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write(json.dumps(head) + "\n")
+            for out, rec in self.done.items():
+                fh.write(json.dumps([out] + rec, ensure_ascii=False) + "\n")
+        os.replace(tmp, self.path)
+        self._fh = open(self.path, "a", encoding="utf-8")
+
+    def _load(self, head):
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                if json.loads(fh.readline() or "null") != head:
+                    return                  # another source or mode: start over
+                for line in fh:
+                    rec = json.loads(line)
+                    self.done[rec[0]] = rec[1:]
+        except (OSError, ValueError, IndexError, TypeError):
+            pass                            # keep what parsed before the torn line
+
+    def __len__(self):
+        return len(self.done)
+
+    def finished(self, out, item, dest) -> bool:
+        """True if *out* was fully copied from the unchanged *item* before."""
+        rec = self.done.get(out)
+        if rec is None or rec[0] != item.rel:
+            return False
+        try:
+            st = item.stat()
+            return (rec[1] == st.st_size and rec[2] == st.st_mtime_ns
+                    and os.stat(dest).st_size == rec[3])
+        except OSError:
+            return False
+
+    def add(self, out, item):
+        st = item.stat()
+        written = os.stat(self.path.parent / out).st_size
+        self._fh.write(json.dumps([out, item.rel, st.st_size, st.st_mtime_ns, written],
+                                  ensure_ascii=False) + "\n")
+        self._fh.flush()
+
+    def close(self, complete: bool):
+        self._fh.close()
+        if complete:
+            try:
+                self.path.unlink()
+            except OSError:
+                pass
+
+
+def _until(items, cancel_event):
+    """Pass *items* through until *cancel_event* is set."""
+    if cancel_event is None:
+        yield from items
+        return
+    for x in items:
+        if cancel_event.is_set():
+            return
+        yield x
+
+
+# ── Flatten de-duplication ────────────────────────────────────────
+DEDUPE_MAP_NAME = "_repoprep_duplicates.json"
+
+
+def find_duplicates(files, workers=4) -> dict:
+    """Map rel path of each duplicate → rel path of its first identical file.
+
+    *files* is an ordered iterable of (rel, abs path, size).  Only files
+    sharing a size with another file are hashed, and those hashes run on
+    a thread pool (hashlib releases the GIL on large buffers).  Empty
+    files are identical by definition and never opened.
+    """
+    by_size: dict = {}
+    for rel, path, size in files:
+        by_size.setdefault(size, []).append((rel, path))
+
+    dupes: dict = {}
+    empty = by_size.pop(0, [])
+    for rel, _ in empty[1:]:
+        dupes[rel] = empty[0][0]
+
+    groups = [g for g in by_size.values() if len(g) > 1]
+    todo   = [item for g in groups for item in g]
+    if not todo:
+        return dupes
+
+    def digest(item):
+        try:    return file_hash(item[1])
+        except OSError: return None     # unreadable — never treated as equal
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        digests = dict(zip((rel for rel, _ in todo), pool.map(digest, todo)))
+
+    for group in groups:
+        first: dict = {}
+        for rel, _ in group:
+            h = digests[rel]
+            if h is None:
+                continue
+            if h in first:
+                dupes[rel] = first[h]
+            else:
+                first[h] = rel
+    return dupes
+
+
+# ── Single-file AI bundle ─────────────────────────────────────────
+FENCE_LANGS = {
+    ".py": "python", ".pyi": "python", ".js": "javascript", ".mjs": "javascript",
+    ".cjs": "javascript", ".jsx": "jsx", ".ts": "typescript", ".tsx": "tsx",
+    ".java": "java", ".kt": "kotlin", ".kts": "kotlin", ".scala": "scala",
+    ".go": "go", ".rs": "rust", ".c": "c", ".h": "c", ".cc": "cpp", ".cpp": "cpp",
+    ".cxx": "cpp", ".hpp": "cpp", ".hh": "cpp", ".cs": "csharp", ".swift": "swift",
+    ".m": "objectivec", ".mm": "objectivec", ".dart": "dart", ".php": "php",
+    ".rb": "ruby", ".pl": "perl", ".lua": "lua", ".r": "r", ".jl": "julia",
+    ".sh": "bash", ".bash": "bash", ".zsh": "bash", ".ps1": "powershell",
+    ".bat": "batch", ".cmd": "batch", ".sql": "sql", ".html": "html", ".htm": "html",
+    ".vue": "vue", ".svelte": "svelte", ".css": "css", ".scss": "scss", ".less": "less",
+    ".json": "json", ".yaml": "yaml", ".yml": "yaml", ".toml": "toml", ".ini": "ini",
+    ".cfg": "ini", ".xml": "xml", ".md": "markdown", ".rst": "rst", ".tex": "latex",
+    ".gradle": "groovy", ".groovy": "groovy", ".proto": "protobuf", ".graphql": "graphql",
+    ".tf": "hcl", ".cmake": "cmake",
+}
+FENCE_NAMES = {"Dockerfile": "dockerfile", "Makefile": "makefile", "CMakeLists.txt": "cmake"}
+BUNDLE_FORMATS = {"md": ".md", "txt": ".txt"}
+_BACKTICKS = re.compile(rb"`{3,}")
+
+
+def fence_lang(name: str) -> str:
+    if name in FENCE_NAMES:
+        return FENCE_NAMES[name]
+    i = name.rfind(".")
+    return FENCE_LANGS.get(name[i:].lower(), "") if i > 0 else ""
+
+
+class BundleWriter:
+    """Streams files into one Markdown / plain-text bundle.
+
+    Output goes through a 1 MB write buffer and each source file is read,
+    written and dropped before the next one, so memory stays at one file
+    no matter how large the project is.
+    """
+
+    def __init__(self, path, fmt="md", title=""):
+        if fmt not in BUNDLE_FORMATS:
+            raise ValueError(f"unknown bundle format: {fmt!r}")
+        self.path    = Path(path)
+        self.fmt     = fmt
+        self.files   = 0
+        self.written = 0
+        self._fh     = open(self.path, "wb", buffering=1 << 20)
+        if title and fmt == "md":
+            self._write(f"# {title}\n\n".encode("utf-8"))
+
+    def _write(self, data: bytes):
+        self._fh.write(data)
+        self.written += len(data)
+
+    def add(self, rel: str, path, lang=None, data=None):
+        """Append one file; *lang* (see reduce_lang) strips it first and
+        *data* replaces its content (e.g. a read_excerpt).  Returns (bytes
+        read, bytes of content written)."""
+        if data is None:
+            with open(path, "rb") as fh:
+                data = fh.read()
+        size = len(data)
+        if lang:
+            data = reduce_bytes(data, lang)
+        rel = rel.replace(os.sep, "/")
+        if self.fmt == "md":
+            # a fence longer than any backtick run inside the file
+            runs  = _BACKTICKS.findall(data)
+            fence = b"`" * max([3] + [len(r) + 1 for r in runs])
+            lang  = fence_lang(os.path.basename(rel)).encode()
+            head  = f"## {rel}\n\n".encode("utf-8") + fence + lang + b"\n"
+            tail  = fence + b"\n\n"
+        else:
+            head = f"===== {rel} =====\n".encode("utf-8")
+            tail = b"\n"
+        if data and not data.endswith(b"\n"):
+            data += b"\n"
+        self._write(head)
+        self._write(data)
+        self._write(tail)
+        self.files += 1
+        return size, len(data)
+
+    def add_alias(self, rel: str, same_as: str):
+        rel, same_as = rel.replace(os.sep, "/"), same_as.replace(os.sep, "/")
+        if self.fmt == "md":
+            line = f"## {rel}\n\n_Identical to `{same_as}`._\n\n"
+        else:
+            line = f"===== {rel} =====\n(identical to {same_as})\n\n"
+        self._write(line.encode("utf-8"))
+
+    def close(self):
+        self._fh.close()
+
+
+# ── Content reduction (comments / docstrings / blank lines) ──────
+# Extensions whose comments can be stripped safely.  "c" is the C
+# family (' is a char literal), "js" quotes with ' and ` as well and has
+# regex literals; "dart" quotes like JS without regex literals.  JSX /
+# TSX are left alone: their markup text may hold a literal "//".
+REDUCE_LANGS = {
+    ".py": "python", ".pyi": "python", ".pyw": "python",
+    ".c": "c", ".h": "c", ".cc": "c", ".cpp": "c", ".cxx": "c", ".hpp": "c",
+    ".hh": "c", ".cs": "cs", ".java": "c", ".go": "c", ".rs": "rust", ".swift": "swift",
+    ".kt": "c", ".kts": "c", ".scala": "c", ".m": "c", ".mm": "c", ".proto": "c",
+    ".js": "js", ".mjs": "js", ".cjs": "js", ".ts": "js", ".mts": "js", ".cts": "js",
+    ".dart": "dart", ".groovy": "dart", ".gradle": "dart",
+}
+_NL = "\x00"     # stands in for newlines inside strings while blank lines go
+
+_C_COMMON = (r'//[^\n]*'                                  # line comment
+             r'|/\*[\s\S]*?(?:\*/|\Z)'                    # block comment
+             r'|"""[\s\S]*?(?:"""|\Z)'                    # Kotlin / Swift / Scala raw
+             r'|"(?:\\[\s\S]|[^"\\\n])*"?')
+_C_CHAR   = r"|'(?:\\.[^'\n]{0,8}|[^'\\\n])'"                 # char, not 'a lifetime
+_REDUCE_LEX = {
+    "c":    re.compile(_C_COMMON + _C_CHAR
+                       + r'|\b(?:u8|[uUL])?R"([^()\\\s]{0,16})\([\s\S]*?\)\1"'  # C++ raw
+                       r"|`[^`]*`"),                                  # Go raw string
+    "cs":   re.compile(_C_COMMON + _C_CHAR
+                       + r'|\$?@\$?"(?:[^"]|"")*"?'),                    # verbatim @"C:\dir\"
+    "rust": re.compile(_C_COMMON + _C_CHAR
+                       + r'|\b[bc]?r(#*)"[\s\S]*?(?:"\1|\Z)'),           # raw r#"…"#
+    "swift": re.compile(_C_COMMON
+                        + r'|(#+)("""|")[\s\S]*?(?:\2\1|\Z)'),              # raw #"…"#
+    "dart": re.compile(_C_COMMON + r"|'''[\s\S]*?(?:'''|\Z)"
+                       r"|'(?:\\[\s\S]|[^'\\\n])*'?"),
+    "js":   re.compile(_C_COMMON + r"|'(?:\\[\s\S]|[^'\\\n])*'?"
+                       r"|`(?:\\[\s\S]|[^`\\])*`?"
+                       # a regex literal can only follow an operator or keyword
+                       r"|(?:(?<=[=(,:;!&|?{}\[\n])|(?<=^)|(?<=return)|(?<=typeof))"
+                       r"[ \t]*/(?![/*])(?:\\.|\[(?:\\.|[^\]\\\n])*\]|[^/\\\n\[])+/[a-z]*",
+                       re.M),
+}
+
+
+def _drop_blank_lines(text: str) -> str:
+    """Trailing spaces and empty lines go; newlines hidden as _NL come back."""
+    return "".join(line.rstrip() + "\n" for line in text.split("\n")
+                   if line.strip()).replace(_NL, "\n")
+
+
+def _reduce_c_like(text: str, lang: str) -> str:
+    def keep(m):
+        tok = m.group()
+        if tok.startswith("//"):
+            return ""
+        if tok.startswith("/*"):
+            if lang == "rust" and "/*" in tok[2:]:
+                raise ValueError("nested block comment")    # Rust allows them
+            # keep line breaks so JS semicolon insertion sees the same lines
+            return "\n" * tok.count("\n") or " "
+        return tok.replace("\n", _NL)
+    return _drop_blank_lines(_REDUCE_LEX[lang].sub(keep, text))
+
+
+def _reduce_python(text: str) -> str:
+    import tokenize
+    STRING, COMMENT = tokenize.STRING, tokenize.COMMENT
+    NEWLINE, INDENT, DEDENT, END = (tokenize.NEWLINE, tokenize.INDENT,
+                                    tokenize.DEDENT, tokenize.ENDMARKER)
+    F_START = getattr(tokenize, "FSTRING_START", -1)      # 3.12+
+    F_END   = getattr(tokenize, "FSTRING_END", -1)
+    toks  = list(tokenize.generate_tokens(io.StringIO(text).readline))
+    # rows as tokenize counts them — splitlines() would also break at \f
+    lines = text.split("\n")
+    cut   = []                  # (start, end, replacement) in (row, col)
+    open_rows = set()           # rows that end inside a string: no rstrip
+    keep_rows = set()           # rows inside a string: never dropped
+    skip  = {tokenize.NL, COMMENT}
+    fstart = []
+    prev  = None
+
+    def bare(i):
+        """Index of the NEWLINE ending a statement made only of plain
+        strings that starts at toks[i] (a docstring), else None.  An
+        f-string may run code (``f'{yield}'``), so it always stays."""
+        j = i
+        while toks[j].type == STRING and "f" not in _str_prefix(toks[j].string):
+            j += 1
+        return j if j > i and toks[j].type in (NEWLINE, END) else None
+
+    def next_stmt(j):
+        while j < len(toks) and toks[j].type in skip:
+            j += 1
+        return j
+
+    for i, t in enumerate(toks):
+        typ = t.type
+        if typ == COMMENT:
+            if t.start != (1, 0) or not t.string.startswith("#!"):
+                cut.append((t.start, t.end, ""))
+            continue
+        if typ == STRING:
+            if t.end[0] > t.start[0]:
+                open_rows.update(range(t.start[0], t.end[0]))
+                keep_rows.update(range(t.start[0] + 1, t.end[0] + 1))
+            # a bare string statement (docstring); a block left with
+            # nothing else keeps a `...` so it still parses
+            end = bare(i) if prev in (None, NEWLINE, INDENT, DEDENT) else None
+            if end is not None:
+                sole = False
+                if prev == INDENT:
+                    k = next_stmt(end + 1)
+                    while k < len(toks) and bare(k) is not None:
+                        k = next_stmt(bare(k) + 1)
+                    sole = k < len(toks) and toks[k].type in (DEDENT, END)
+                cut.append((t.start, toks[end - 1].end, "..." if sole else ""))
+        elif typ == F_START:
+            fstart.append(t.start[0])
+        elif typ == F_END and fstart:
+            first = fstart.pop()
+            open_rows.update(range(first, t.end[0]))
+            keep_rows.update(range(first + 1, t.end[0] + 1))
+        if typ not in skip:
+            prev = typ
+    if not cut:
+        return _drop_python_blanks(lines, open_rows, keep_rows)
+
+    # splice from the end so earlier positions stay valid; a cut string
+    # keeps its line breaks, so row numbers never move
+    for (sr, sc), (er, ec), rep in sorted(cut, reverse=True):
+        head = lines[sr - 1][:sc]
+        tail = lines[er - 1][ec:]
+        for r in range(sr + 1, er + 1):
+            open_rows.discard(r - 1)
+            keep_rows.discard(r)
+        lines[sr - 1:er] = [head + rep + tail] + [""] * (er - sr)
+    return _drop_python_blanks(lines, open_rows, keep_rows)
+
+
+def _str_prefix(tok: str) -> str:
+    i = 0
+    while tok[i] not in "'\"":
+        i += 1
+    return tok[:i].lower()
+
+
+def _drop_python_blanks(lines, open_rows, keep_rows) -> str:
+    out = []
+    for row, line in enumerate(lines, 1):
+        if row in open_rows:
+            out.append(line + "\n")
+            continue
+        body = line.rstrip()
+        if body or row in keep_rows:
+            out.append(body + "\n")
+    return "".join(out)
+
+
+def reduce_text(text: str, lang: str) -> str:
+    """*text* without comments, docstrings, license banners and blank
+    lines.  *lang* is a REDUCE_LANGS value.  Code that does not tokenize
+    (or holds NULs) comes back unchanged."""
+    if _NL in text:
+        return text
+    try:
+        if lang == "python":
+            return _reduce_python(text)
+        return _reduce_c_like(text, lang)
+    except (SyntaxError, ValueError, IndexError):
+        # tokenize.TokenError is a SyntaxError subclass from 3.12 on
+        return text
+    except Exception as e:
+        if type(e).__name__ == "TokenError":
+            return text
+        raise
+
+
+def reduce_lang(name: str):
+    i = name.rfind(".")
+    return REDUCE_LANGS.get(name[i:].lower()) if i > 0 else None
+
+
+def reduce_bytes(data: bytes, lang: str) -> bytes:
+    """reduce_text() on UTF-8 bytes; anything else is returned as is."""
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return data
+    # universal newlines, like tokenize — CRLF files come out as LF
+    return reduce_text(text.replace("\r\n", "\n"), lang).encode("utf-8")
+
+
+def reduce_file(src, dst, lang):
+    """Write a reduced copy of *src* to *dst*, keeping its times and mode.
+    Runs in a worker process; returns (bytes in, bytes out)."""
+    with open(src, "rb") as fh:
+        data = fh.read()
+    out = reduce_bytes(data, lang)
+    _unlink(dst)
+    with open(dst, "wb") as fh:
+        fh.write(out)
+    shutil.copystat(src, dst)
+    return len(data), len(out)
+
+
+# ── Large files ───────────────────────────────────────────────────
+LARGE_POLICIES = ("truncate", "skip")
+EXCERPT_BYTES  = 32 << 10      # kept from each end of a truncated file
+
+
+def parse_size(text) -> int:
+    """``"500k"``, ``"20M"``, ``"1.5G"`` or plain bytes -> bytes (KiB units)."""
+    s = str(text).strip().upper()
+    for unit in ("B", "I"):                 # "20MB", "20MiB"
+        if s.endswith(unit):
+            s = s[:-1]
+    mult = 1
+    if s and s[-1] in "KMG":
+        mult = 1024 ** ("KMG".index(s[-1]) + 1)
+        s = s[:-1]
+    try:
+        n = float(s)
+    except ValueError:
+        raise ValueError(f"not a size: {text!r}") from None
+    if n < 0:
+        raise ValueError(f"not a size: {text!r}")
+    return int(n * mult)
+
+
+def read_excerpt(path, head=EXCERPT_BYTES, tail=EXCERPT_BYTES) -> bytes:
+    """The first and last few KB of *path*, cut at line breaks, joined by
+    a marker line saying how much was left out.  Read through mmap, so
+    only the pages at the two ends are ever touched however big the
+    file is.  Files that fit are returned whole."""
+    with open(path, "rb") as fh:
+        size = os.fstat(fh.fileno()).st_size
+        if size <= head + tail:
+            return fh.read()
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            h = mm.rfind(b"\n", 0, head) + 1 or head
+            t = mm.find(b"\n", size - tail) + 1 or size - tail
+            first, last = mm[:h], mm[t:]
+    marker = (f"[… RepoPrep cut {t - h:,} of {size:,} bytes here — "
+              f"the first {h:,} and last {size - t:,} bytes are kept …]\n").encode("utf-8")
+    if not first.endswith(b"\n"):
+        marker = b"\n" + marker
+    return first + marker + last
+
+
+def write_excerpt(src, dst):
+    """read_excerpt() of *src* into *dst*, keeping its times and mode."""
+    data = read_excerpt(src)
+    _unlink(dst)
+    with open(dst, "wb") as fh:
+        fh.write(data)
+    shutil.copystat(src, dst)
+    return len(data)
+
+
+# ── Archive output ────────────────────────────────────────────────
+ARCHIVE_FORMATS = {"zip": ".zip", "tar.gz": ".tar.gz", "tar.xz": ".tar.xz"}
+ARCHIVE_CHUNK   = 1 << 20       # read buffer per file — memory stays flat
+# already compressed — deflating these again costs CPU and saves nothing
+STORED_EXT = {
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".txz", ".lz", ".lzma", ".zst", ".7z",
+    ".rar", ".br", ".lz4", ".jar", ".war", ".ear", ".aar", ".apk", ".whl", ".egg",
+    ".nupkg", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".heic", ".jxl",
+    ".mp3", ".m4a", ".aac", ".ogg", ".opus", ".flac", ".mp4", ".m4v", ".mkv",
+    ".webm", ".mov", ".avi", ".woff", ".woff2", ".pdf", ".docx", ".xlsx", ".pptx",
+    ".odt", ".ods", ".odp", ".epub", ".parquet",
+}
+
+
+def archive_name(source, mode, fmt) -> str:
+    return f"{Path(source).resolve().name or 'project'}_{mode}{ARCHIVE_FORMATS[fmt]}"
+
+
+class ArchiveWriter:
+    """Streams files straight into a zip / tar.gz / tar.xz archive.
+
+    Each file is read through a fixed ARCHIVE_CHUNK buffer into the
+    compressor, so nothing is staged on disk and memory does not grow
+    with file or tree size.  Zip members with an already-compressed
+    extension are stored as-is; a tar stream is compressed as a whole,
+    so there every member goes through the compressor.
+
+    The archive is written to ``<path>.part`` and only renamed into place
+    by ``close(complete=True)`` — an interrupted run never leaves a
+    truncated archive under the real name.
+    """
+
+    def __init__(self, path, fmt="zip", level=None):
+        if fmt not in ARCHIVE_FORMATS:
+            raise ValueError(f"unknown archive format: {fmt!r}")
+        if level is not None and not 0 <= level <= 9:
+            raise ValueError(f"compression level must be 0-9, got {level}")
+        self.path    = Path(path)
+        self.fmt     = fmt
+        self.level   = 6 if level is None else level
+        self.files   = 0
+        self.stored  = 0
+        self.written = 0            # uncompressed bytes added
+        self._part   = self.path.with_name(self.path.name + ".part")
+        if fmt == "zip":
+            import zipfile
+            self._zipfile = zipfile
+            self._zip = zipfile.ZipFile(self._part, "w", zipfile.ZIP_DEFLATED,
+                                        compresslevel=self.level)
+        else:
+            import tarfile
+            self._tarfile = tarfile
+            if fmt == "tar.gz":
+                self._tar = tarfile.open(self._part, "w:gz", compresslevel=self.level,
+                                         copybufsize=ARCHIVE_CHUNK)
+            else:
+                self._tar = tarfile.open(self._part, "w:xz", preset=self.level,
+                                         copybufsize=ARCHIVE_CHUNK)
+
+    def add(self, name: str, path, lang=None, data=None):
+        """Add one file; *lang* (see reduce_lang) strips it first, which
+        needs the whole file in memory, and *data* replaces its content
+        (e.g. a read_excerpt).  Returns (bytes read, bytes added)."""
+        name = name.replace(os.sep, "/")
+        with open(path, "rb") as fh:
+            st   = os.fstat(fh.fileno())
+            size = st.st_size
+            src  = fh
+            if lang or data is not None:
+                if data is None:
+                    data = reduce_bytes(fh.read(), lang)
+                size = len(data)
+                src  = io.BytesIO(data)
+            if self.fmt == "zip":
+                zf   = self._zipfile
+                info = zf.ZipInfo(name, time.localtime(max(st.st_mtime, 315619200))[:6])
+                info.external_attr = (st.st_mode & 0xFFFF) << 16
+                info.file_size     = size         # lets zipfile pick zip64 up front
+                if os.path.splitext(name)[1].lower() in STORED_EXT:
+                    info.compress_type = zf.ZIP_STORED
+                    self.stored += 1
+                else:
+                    info.compress_type = zf.ZIP_DEFLATED
+                    info._compresslevel = self.level   # open() ignores the archive default
+                with self._zip.open(info, "w") as dst:
+                    shutil.copyfileobj(src, dst, ARCHIVE_CHUNK)
+            else:
+                info = self._tarfile.TarInfo(name)
+                info.size  = size
+                info.mtime = st.st_mtime
+                info.mode  = st.st_mode & 0o7777
+                # tarfile copies exactly info.size bytes in copybufsize chunks
+                self._tar.addfile(info, src)
+        self.files   += 1
+        self.written += size
+        return st.st_size, size
+
+    def add_bytes(self, name: str, data: bytes):
+        if self.fmt == "zip":
+            self._zip.writestr(name, data)
+        else:
+            info = self._tarfile.TarInfo(name)
+            info.size  = len(data)
+            info.mtime = time.time()
+            self._tar.addfile(info, io.BytesIO(data))
+
+    @property
+    def size(self) -> int:
+        try:
+            return (self.path if self.path.exists() else self._part).stat().st_size
+        except OSError:
+            return 0
+
+    def close(self, complete=True):
+        (self._zip if self.fmt == "zip" else self._tar).close()
+        if complete:
+            os.replace(self._part, self.path)
+        else:
+            try:
+                os.remove(self._part)
+            except OSError:
+                pass
+
+
+# ── Run metrics ───────────────────────────────────────────────────
+REPORT_NAME = ".repoprep-report.json"
+_perf, _thread_cpu = time.perf_counter, time.thread_time
+
+
+class Metrics:
+    """Per-phase timers and counters for one scan or run.
+
+    ``phase(name)`` adds wall and CPU time (of the thread doing the
+    work, so pool threads add up) plus one call.  It is meant for
+    operations that cost far more than the timer itself: a directory
+    listing, a copy, a sniff batch.  ``add_wall`` is the per-file
+    variant.  It uses no CPU clock, because reading the thread CPU clock
+    is a syscall.  ``count`` tallies the filesystem calls we issue —
+    readdir, stat, open, mkdir, copy.  That is our own count, not
+    strace's.  Thread-safe.
+    """
+
+    def __init__(self):
+        self._t0, self._c0 = _perf(), time.process_time()
+        self.phases: dict = {}       # name -> [wall, cpu, calls]
+        self.counts: dict = {}       # name -> n
+        self.errors: dict = {}       # exception type -> n
+        self._lock = threading.Lock()
+
+    def _add(self, name, wall, cpu, calls=1):
+        with self._lock:
+            p = self.phases.get(name)
+            if p is None:
+                p = self.phases[name] = [0.0, None, 0]
+            p[0] += wall
+            p[2] += calls
+            if cpu is not None:
+                p[1] = (p[1] or 0.0) + cpu
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def timed(self, name, fn, counter=None):
+        """*fn* wrapped in phase(*name*), optionally also counted."""
+        def run(*args, **kw):
+            if counter:
+                self.count(counter)
+            with _Phase(self, name):
+                return fn(*args, **kw)
+        return run
+
+    def add_wall(self, name, wall, calls=1):
+        self._add(name, wall, None, calls)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def error(self, exc):
+        name = type(exc).__name__
+        with self._lock:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def report(self, files=0, nbytes=0) -> dict:
+        wall = _perf() - self._t0
+        return {
+            "wall": round(wall, 4),
+            "cpu": round(time.process_time() - self._c0, 4),
+            "files": files, "bytes": nbytes,
+            "files_per_s": round(files / wall, 1) if wall else 0.0,
+            "bytes_per_s": round(nbytes / wall) if wall else 0,
+            "phases": {k: {"wall": round(w, 4), "cpu": None if c is None else round(c, 4),
+                           "calls": n}
+                       for k, (w, c, n) in self.phases.items()},
+            "syscalls": dict(self.counts),
+            "errors": dict(self.errors),
+        }
+
+
+class _Phase:
+    __slots__ = ("m", "name", "w", "c")
+
+    def __init__(self, m, name):
+        self.m, self.name = m, name
+
+    def __enter__(self):
+        self.w, self.c = _perf(), _thread_cpu()
+        return self
+
+    def __exit__(self, *exc):
+        self.m._add(self.name, _perf() - self.w, _thread_cpu() - self.c)
+        return False
+
+
+def fmt_metrics(rep: dict, top=4) -> str:
+    """One-line summary of a Metrics.report(): total time, the slowest
+    phases, throughput, filesystem calls and errors."""
+    phases = sorted(rep["phases"].items(), key=lambda kv: -kv[1]["wall"])[:top]
+    parts  = [f"{rep['wall']:.2f} s (cpu {rep['cpu']:.2f} s)"]
+    parts += [f"{k} {v['wall']:.2f} s" for k, v in phases]
+    parts.append(f"{rep['files_per_s']:,.0f} files/s")
+    if rep["bytes"]:
+        parts.append(f"{fmt_mb(rep['bytes_per_s'])}/s")
+    parts.append(f"{sum(rep['syscalls'].values()):,} fs calls")
+    if rep["errors"]:
+        parts.append("errors: " + ", ".join(f"{k} {n}" for k, n in rep["errors"].items()))
+    return "  ·  ".join(parts)
+
+
+def save_report(target, report: dict):
+    """Write *report* as JSON into *target* (atomically)."""
+    path = Path(target) / REPORT_NAME
+    tmp  = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=1)
+    os.replace(tmp, path)
+    return path
+
+
+# ── Memory ────────────────────────────────────────────────────────
+try:
+    import resource            # POSIX only — peak RSS
+except ImportError:
+    resource = None
+
+GC_RUN_THRESHOLD = 50_000       # gen-0 allocations between collections during a run
+
+
+def peak_rss() -> int:
+    """Peak resident set size of this process in bytes (0 if unknown)."""
+    if resource is not None:
+        kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return kb if sys.platform == "darwin" else kb * 1024     # macOS reports bytes
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class _Counters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t),
+                        ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t),
+                        ("PeakPagefileUsage", ctypes.c_size_t)]
+        c = _Counters(); c.cb = ctypes.sizeof(c)
+        try:
+            ok = ctypes.windll.psapi.GetProcessMemoryInfo(
+                ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(c), c.cb)
+        except (AttributeError, OSError):
+            return 0
+        return c.PeakWorkingSetSize if ok else 0
+    return 0
+
+
+def fmt_mb(n: int) -> str:
+    return f"{n / 1048576:.1f} MB"
+
+
+class GcPolicy:
+    """Cyclic-GC settings for the length of one run.
+
+    A run allocates a few objects per file, none of them in cycles, so
+    forced or frequent collections only re-traverse the same live heap
+    (manifest, dedupe map, GUI) over and over.  ``"relaxed"`` raises the
+    gen-0 threshold — collections still happen, just rarely; ``"off"``
+    disables the collector; ``"default"`` leaves the interpreter alone.
+    The previous settings come back afterwards.
+    """
+    MODES = ("relaxed", "off", "default")
+
+    def __init__(self, mode="relaxed"):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown GC mode {mode!r} — expected one of {', '.join(self.MODES)}")
+        self.mode  = mode
+        self._prev = None
+        self._was_enabled = True
+
+    def __enter__(self):
+        self._prev = gc.get_threshold()
+        self._was_enabled = gc.isenabled()
+        if self.mode == "relaxed":
+            gc.set_threshold(max(self._prev[0], GC_RUN_THRESHOLD), *self._prev[1:])
+        elif self.mode == "off":
+            gc.disable()
+        return self
+
+    def __exit__(self, *exc):
+        gc.set_threshold(*self._prev)
+        if self._was_enabled:
+            gc.enable()
+        return False
+
+
+class MemTrace:
+    """Optional tracemalloc diagnostics: peak traced memory and the
+    biggest allocation sites at the end of a run.  Off by default —
+    tracing slows allocation-heavy code by roughly 2x."""
+
+    def __init__(self, enabled=False, top=5):
+        self.enabled = enabled
+        self.top     = top
+        self.peak    = 0
+        self.sites: list = []
+        self._owner  = False
+
+    def __enter__(self):
+        if self.enabled:
+            import tracemalloc
+            self._owner = not tracemalloc.is_tracing()
+            if self._owner:
+                tracemalloc.start()
+            elif hasattr(tracemalloc, "reset_peak"):    # 3.9+; 3.8 keeps the old peak
+                tracemalloc.reset_peak()
+        return self
+
+    def __exit__(self, *exc):
+        if self.enabled:
+            import tracemalloc
+            self.peak = tracemalloc.get_traced_memory()[1]
+            snap = tracemalloc.take_snapshot()
+            self.sites = [(str(s.traceback[0]), s.size)
+                          for s in snap.statistics("lineno")[:self.top]]
+            if self._owner:
+                tracemalloc.stop()
+        return False
+
+
+_END = object()
+
+
+class Prefetch:
+    """Runs *iterable* on a background thread, handing items over through
+    a bounded queue so the consumer starts work immediately while memory
+    stays capped at *maxsize* items.
+
+    ``produced`` is a running count and ``done`` flips once the source is
+    exhausted — together they give callers a total that firms up as the
+    walk finishes.
+    """
+
+    def __init__(self, iterable, maxsize=4096):
+        self.produced = 0
+        self.done     = False
+        self._q       = queue.Queue(maxsize)
+        self._exc     = None
+        self._stop    = False
+        threading.Thread(target=self._fill, args=(iterable,), daemon=True).start()
+
+    def _fill(self, iterable):
+        try:
+            for item in iterable:
+                if self._stop:
+                    break
+                self._q.put(item)
+                self.produced += 1
+        except BaseException as e:
+            self._exc = e
+        finally:
+            self.done = True
+            if not self._stop:
+                self._q.put(_END)
+
+    def __iter__(self):
+        while True:
+            item = self._q.get()
+            if item is _END:
+                if self._exc:
+                    raise self._exc
+                return
+            yield item
+
+    def close(self):
+        """Stop the producer early; unblocks it if the queue is full."""
+        self._stop = True
+        try:
+            while True:
+                self._q.get_nowait()
+        except queue.Empty:
+            pass
+
+
 def run_operation(source_dir, target_dir, mode, include_images=False,
-                  log_cb=None, progress_cb=None):
+                  log_cb=None, progress_cb=None, workers=0, copy_mode="auto",
+                  incremental=False, prune=False, hash_files=False, dedupe=False,
+                  bundle_format="md", token_budget=0, sample_tokens=False,
+                  sniff_binary=False, rules_file=None, gitignore=True,
+                  git_index=False, untracked=False, gc_mode="relaxed",
+                  trace_memory=False, cancel_event=None, report=False,
+                  archive=None, compress_level=None, walk_threads=0, reduce=False,
+                  max_file_size=0, large_files="truncate"):
     source   = Path(source_dir)
     target   = Path(target_dir)
-    skip_ext = SKIP_EXTENSIONS | (set() if include_images else IMAGE_EXT)
+    metrics  = Metrics()
+    rss_start = peak_rss()      # the OS peak covers the whole process, not this run
 
     def log(msg, level="INFO"):
         if log_cb:
@@ -340,6 +2494,10 @@ def run_operation(source_dir, target_dir, mode, include_images=False,
 
     if not source.exists():
         log("Source folder not found.", "ERROR"); return False
+    try:
+        rules = SkipRules.load(source, include_images, rules_file)
+    except (OSError, ValueError) as e:
+        log(f"Cannot read rules: {e}", "ERROR"); return False
     try:
         target.mkdir(parents=True, exist_ok=True)
     except Exception as e:
@@ -354,753 +2512,960 @@ def run_operation(source_dir, target_dir, mode, include_images=False,
         stem, ext = Path(fname).stem, Path(fname).suffix
         return f"{stem}__{name_cnt[fname]}{ext}"
 
-    all_files = [f for f in source.rglob("*") if f.is_file()]
-    total     = len(all_files)
-    log(f"Found {total} files — processing...", "INFO")
-
-    skipped_dirs_logged: set = set()
-    BATCH    = 75
-    last_log = 0
+    if workers <= 0:
+        workers = default_workers(source, target)
+    log(f"Copy threads: {workers}", "INFO")
+    try:
+        copier    = Copier(copy_mode)
+        gc_policy = GcPolicy(gc_mode)
+        if large_files not in LARGE_POLICIES:
+            raise ValueError(f"unknown large-file policy: {large_files!r}")
+    except ValueError as e:
+        log(str(e), "ERROR"); return False
+
+    # incremental sync (Smart Clean only — flatten names depend on order)
+    if incremental and mode != "clean":
+        log("Incremental sync only applies to Smart Clean — copying everything.", "WARN")
+        incremental = False
+    old_manifest = load_manifest(target) if incremental else {}
+    manifest: dict = {}
+    wanted: set    = set()
+    unchanged = 0
+    if incremental:
+        log(f"Incremental sync — {len(old_manifest)} files in previous manifest", "INFO")
+
+    def up_to_date(item, dest, st):
+        prev = old_manifest.get(item.rel)
+        if not prev or prev[0] != st.st_size or not dest.exists():
+            return None
+        if prev[1] == st.st_mtime_ns:
+            return prev
+        # same size, new mtime (e.g. a fresh checkout) — compare content
+        if hash_files and prev[2] and file_hash(item.path) == prev[2]:
+            os.utime(dest, ns=(st.st_atime_ns, st.st_mtime_ns))
+            return [prev[0], st.st_mtime_ns, prev[2]]
+        return None
+
+    # reduce: comment / blank-line stripping is CPU-bound, so it runs on a
+    # process pool; the copy threads just wait for their file's result
+    reducer = None
+    reduced = [0, 0, 0]            # files, bytes in, bytes out
+    reduced_lock = threading.Lock()
+    if reduce and (os.cpu_count() or 1) > 1 and mode != "bundle" and not archive:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        # spawn, not fork: workers start on the first submit, when the walker
+        # and copy threads (and Tk) already run — a forked child can deadlock
+        reducer = ProcessPoolExecutor(max_workers=min(os.cpu_count(), max(workers, 2)),
+                                      mp_context=multiprocessing.get_context("spawn"))
+
+    def note_reduced(sizes):
+        with reduced_lock:
+            reduced[0] += 1
+            reduced[1] += sizes[0]
+            reduced[2] += sizes[1]
+
+    def do_copy(item, dest, cut=False):
+        if cut:
+            metrics.count("open")
+            with metrics.phase("excerpt"):
+                write_excerpt(item.path, dest)
+            return file_hash(item.path) if hash_files else None
+        lang = reduce and reduce_lang(item.name)
+        if lang:
+            with metrics.phase("reduce"):
+                if reducer is not None:
+                    sizes = reducer.submit(reduce_file, item.path, str(dest), lang).result()
+                else:
+                    sizes = reduce_file(item.path, dest, lang)
+            note_reduced(sizes)
+            return file_hash(item.path) if hash_files else None
+        metrics.count("copy")
+        with metrics.phase("copy"):
+            copier(item.path, dest)
+        if hash_files:
+            with metrics.phase("hash"):
+                return file_hash(item.path)
+        return None
+
+    # bundle: every clean file is streamed into one document, in walk order
+    bundle = None
+    if mode == "bundle":
+        try:
+            ext    = BUNDLE_FORMATS.get(bundle_format, "")
+            bundle = BundleWriter(target / f"{source.resolve().name or 'project'}_bundle{ext}",
+                                  bundle_format, f"{source.resolve().name} — RepoPrep bundle")
+        except (ValueError, OSError) as e:
+            log(f"Cannot create bundle: {e}", "ERROR"); return False
+
+    # archive: clean / flatten output streamed into one zip or tar file
+    if archive and mode == "bundle":
+        log("A bundle is already a single file — archive output ignored.", "WARN")
+        archive = None
+    if archive:
+        if incremental:
+            log("Incremental sync does not apply to archive output — copying everything.", "WARN")
+            incremental = False
+        try:
+            archive = ArchiveWriter(target / archive_name(source, mode, archive),
+                                    archive, compress_level)
+        except (ValueError, OSError) as e:
+            log(f"Cannot create archive: {e}", "ERROR"); return False
+    else:
+        archive = None
 
-    for idx, item in enumerate(all_files):
+    # resume journal: a bundle or archive is one stream and is simply rewritten
+    journal = None
+    if bundle is None and archive is None:
         try:
-            rel      = item.relative_to(source)
-            parts    = rel.parts
-            skip_dir = _first_skip_dir(parts)
-
-            # log each skipped directory only ONCE
-            if skip_dir and skip_dir not in skipped_dirs_logged:
-                skipped_dirs_logged.add(skip_dir)
-                log(f"Skip  {skip_dir}/  (directory skipped)", "SKIP")
-
-            skip = (
-                skip_dir is not None
-                or item.name in SKIP_DIRS
-                or item.name in SKIP_FILES
-                or item.suffix.lower() in skip_ext
-            )
+            journal = Journal(target, source, mode, {
+                "rules": rules.key, "copy_mode": copy_mode, "reduce": bool(reduce),
+                "max_file_size": max_file_size, "large_files": large_files,
+                "gitignore": gitignore, "git_index": git_index, "untracked": untracked,
+                "sniff_binary": sniff_binary, "token_budget": token_budget,
+                "dedupe": dedupe})
+        except OSError as e:
+            log(f"Cannot write resume journal: {e}", "WARN")
+        if journal is not None and len(journal):
+            log(f"Resuming — {len(journal)} files finished by an interrupted run", "INFO")
+    resumed = 0
+
+    # the GC policy and the optional tracemalloc session cover the whole
+    # pipeline: pre-pass, walk and copies
+    with gc_policy, MemTrace(trace_memory) as mem:
+        if git_index:
+            with metrics.phase("git_index"):
+                tracked = read_git_index(source)
+        else:
+            tracked = None
+        if tracked is not None:
+            log(f"Git index — {len(tracked)} tracked files"
+                + (", plus untracked files not ignored" if untracked else ""), "INFO")
+        elif git_index:
+            log("No readable git index — walking the folder instead.", "INFO")
+
+        # de-duplication and the token budget both need every clean file up
+        # front, so they share one pre-pass over the (pruned) tree
+        dupes: dict = {}
+        kept_dest: dict = {}
+        dupe_map: dict = {}
+        deduped = 0
+        over_budget = 0
+        large  = 0
+        binary = 0
+        ignored = 0
+        selected = None
+        if dedupe and mode not in ("flatten", "bundle"):
+            log("De-duplication only applies to Flatten and Bundle — ignored.", "WARN")
+            dedupe = False
+        if dedupe or token_budget > 0:
+            with metrics.phase("prepass"):
+                ls    = metrics.timed("prepass_walk", _scandir, "readdir")
+                walk  = _until(list_tree(source, rules, ls, gitignore, tracked, untracked,
+                                         threads=walk_threads), cancel_event)
+                clean = [(e.rel, e.path, e.size, e.name)
+                         for e, skip in _filter_stage(walk, rules, sniff_binary, workers) if not skip]
+                if max_file_size and large_files == "skip":
+                    clean = [c for c in clean if c[2] <= max_file_size]
+                if dedupe:
+                    # hash only same-size groups; identical files are copied once
+                    dupes = find_duplicates(((r, p, s) for r, p, s, _ in clean), workers)
+                    log(f"De-duplication — {len(dupes)} identical files will be merged", "INFO")
+                if token_budget > 0:
+                    # a truncated file only costs its excerpt
+                    cap    = 2 * EXCERPT_BYTES if max_file_size else 0
+                    tokens = [(r, estimate_tokens(n, min(s, cap) if cap and s > max_file_size else s,
+                                                  p, sample_tokens))
+                              for r, p, s, n in clean if r not in dupes]
+                    selected, used = fit_budget(tokens, token_budget)
+                    total_tk = sum(t for _, t in tokens)
+                    log(f"Token budget {fmt_tokens(token_budget)} — keeping {len(selected)} of "
+                        f"{len(tokens)} files (~{fmt_tokens(used)} of ~{fmt_tokens(total_tk)} tokens)", "INFO")
+                del clean
+
+        # walk → filter → copy: the walker fills a bounded queue on its own
+        # thread, so the first copy starts right away and memory stays flat
+        walk = Prefetch(list_tree(source, rules, metrics.timed("walk", _scandir, "readdir"),
+                                  gitignore, tracked, untracked, threads=walk_threads))
+        log("Walking source — copying as files are found...", "INFO")
+
+        skipped_dirs_logged: set = set()
+        made_dirs: set = {str(target)}
+        BATCH     = 75
+        last_log  = 0
+        last_pct  = -1
+        processed = 0
+
+        # copies run on the pool; only this thread touches counters, logs
+        # and mkdir, so no locking is needed and workers never race on
+        # creating the same directory
+        pool         = (ThreadPoolExecutor(max_workers=workers)
+                        if workers > 1 and bundle is None and archive is None else None)
+        inflight     = deque()
+        max_inflight = workers * 4
+
+        def tick():
+            nonlocal processed, last_log, last_pct
+            processed += 1
+            # running total until the walk finishes, exact afterwards
+            total = max(walk.produced, processed)
+            if progress_cb:
+                # report changes only — at most ~100 calls however many files
+                pct = int(processed / total * 100)
+                pct = pct if walk.done else min(pct, 99)
+                if pct != last_pct:
+                    last_pct = pct
+                    progress_cb(pct)
 
-            if skip:
-                skipped += 1
-            else:
-                if mode == "flatten":
-                    dest = target / unique(item.name)
-                else:
-                    dest = target / rel
-                    dest.parent.mkdir(parents=True, exist_ok=True)
-                shutil.copy2(item, dest)
+            # batch summary log (much faster than per-file)
+            if (processed - last_log) > BATCH:
+                more = "" if walk.done else "+"
+                log(f"Progress  {processed}/{total}{more}  —  copied {copied}, skipped {skipped}", "INFO")
+                last_log = processed
+
+        def record(item, digest, out):
+            if incremental:
+                st = item.stat()
+                manifest[item.rel] = [st.st_size, st.st_mtime_ns, digest]
+            if journal is not None:
+                with metrics.phase("journal"):
+                    journal.add(out, item)
+
+        def settle(fut, item, out):
+            nonlocal copied, skipped
+            try:
+                record(item, fut.result(), out)
                 copied += 1
+            except Exception as e:
+                metrics.error(e)
+                log(f"Error {item.name}: {e}", "WARN")
+                skipped += 1
+            tick()
 
-            if progress_cb and total > 0:
-                progress_cb(int((idx + 1) / total * 100))
+        try:
+            for item, skip in _filter_stage(_until(walk, cancel_event), rules,
+                                            sniff_binary, workers, metrics):
+                try:
+                    if item.is_dir:
+                        # a pruned directory counts as a single skipped item;
+                        # log each skipped directory name only ONCE
+                        if item.name not in skipped_dirs_logged:
+                            skipped_dirs_logged.add(item.name)
+                            log(f"Skip  {item.name}/  (directory skipped)", "SKIP")
+                        skipped += 1
+                    elif skip:
+                        skipped += 1
+                        if skip == "binary":
+                            binary += 1
+                        elif skip == "ignored":
+                            ignored += 1
+                    elif selected is not None and dupes.get(item.rel, item.rel) not in selected:
+                        skipped += 1
+                        over_budget += 1
+                    elif max_file_size and large_files == "skip" and item.size > max_file_size:
+                        skipped += 1
+                        large   += 1
+                        log(f"Skip  {item.rel}  ({fmt_mb(item.size)}, over the size limit)", "SKIP")
+                    else:
+                        # only stat on this thread when a size limit asks for it
+                        cut = bool(max_file_size) and item.size > max_file_size
+                        if cut:
+                            large += 1
+                        if bundle is not None:
+                            kept = dupes.get(item.rel)
+                            if kept:
+                                bundle.add_alias(item.rel, kept)
+                                deduped += 1
+                            else:
+                                metrics.count("open")
+                                lang = not cut and reduce and reduce_lang(item.name)
+                                with metrics.phase("bundle"):
+                                    sizes = bundle.add(item.rel, item.path, lang,
+                                                       read_excerpt(item.path) if cut else None)
+                                if lang:
+                                    note_reduced(sizes)
+                                copied += 1
+                            tick()
+                            continue
+                        if mode == "flatten":
+                            kept = dupes.get(item.rel)
+                            if kept in kept_dest:
+                                dupe_map[kept_dest[kept]].append(item.rel)
+                                deduped += 1
+                                tick()
+                                continue
+                            dest = target / unique(item.name)
+                            out  = dest.name
+                            if dedupe:
+                                kept_dest[item.rel] = dest.name
+                                dupe_map[dest.name] = [item.rel]
+                        elif archive is not None:
+                            out = item.rel
+                        else:
+                            out  = item.rel
+                            dest = target / item.rel
+                            parent = str(dest.parent)
+                            if parent not in made_dirs:
+                                metrics.count("mkdir")
+                                with metrics.phase("mkdir"):
+                                    dest.parent.mkdir(parents=True, exist_ok=True)
+                                made_dirs.add(parent)
+                            if incremental:
+                                wanted.add(item.rel)
+                                same = up_to_date(item, dest, item.stat())
+                                if same:
+                                    manifest[item.rel] = same
+                                    unchanged += 1
+                                    if journal is not None:
+                                        journal.add(out, item)
+                                    tick()
+                                    continue
+
+                        if archive is not None:
+                            metrics.count("open")
+                            lang = not cut and reduce and reduce_lang(item.name)
+                            with metrics.phase("archive"):
+                                sizes = archive.add(out, item.path, lang,
+                                                    read_excerpt(item.path) if cut else None)
+                            if lang:
+                                note_reduced(sizes)
+                            copied += 1
+                            tick()
+                            continue
+
+                        if journal is not None and journal.finished(out, item, dest):
+                            record(item, file_hash(item.path) if hash_files else None, out)
+                            resumed += 1
+                            tick()
+                            continue
+
+                        if pool is not None:
+                            inflight.append((pool.submit(do_copy, item, dest, cut), item, out))
+                            while inflight and (len(inflight) >= max_inflight
+                                                or inflight[0][0].done()):
+                                settle(*inflight.popleft())
+                            continue
+                        record(item, do_copy(item, dest, cut), out)
+                        copied += 1
+                except Exception as e:
+                    metrics.error(e)
+                    log(f"Error {item.name}: {e}", "WARN")
+                    skipped += 1
+                tick()
+
+            while inflight:
+                settle(*inflight.popleft())
+        finally:
+            walk.close()
+            if pool is not None:
+                pool.shutdown(wait=True)
+            if reducer is not None:
+                reducer.shutdown(wait=True)
+            if bundle is not None:
+                bundle.close()
+
+    cancelled = cancel_event is not None and cancel_event.is_set()
+    if journal is not None:
+        journal.close(complete=not cancelled)
+    if cancelled:
+        log(f"Cancelled — {walk.produced} items seen so far.", "WARN")
+    else:
+        log(f"Walk finished — {walk.produced} items found.", "INFO")
+    if resumed:
+        log(f"Resumed — {resumed} files already copied were kept", "INFO")
+    if ignored:
+        log(f"Ignore files — {ignored} files left out", "INFO")
+    if sniff_binary:
+        log(f"Binary content check — {binary} files rejected", "INFO")
+    if over_budget:
+        log(f"Left out {over_budget} files to stay within the token budget", "INFO")
+    if large:
+        log(f"Large files — {large} over {fmt_mb(max_file_size)} "
+            + ("skipped" if large_files == "skip" else "cut to head + tail excerpts"), "INFO")
+    if reduced[0]:
+        saved = reduced[1] - reduced[2]
+        log(f"Reduce — {reduced[0]} files, {fmt_mb(reduced[1])} → {fmt_mb(reduced[2])}  "
+            f"(saved {fmt_mb(saved)}, {saved / max(reduced[1], 1) * 100:.0f}%)", "INFO")
+    if bundle is not None:
+        log(f"Bundle: {bundle.path.name}  ({bundle.files} files, "
+            f"{round(bundle.written / 1048576, 1)} MB)", "INFO")
+    elif archive is None:
+        log(f"Copy strategy: {copier.summary()}", "INFO")
+
+    # dedupe map and manifest writes
+    removed = 0
+    with metrics.phase("finalize"):
+        if dedupe and bundle is None and not cancelled:
+            merged = {name: rels for name, rels in dupe_map.items() if len(rels) > 1}
+            try:
+                if archive is not None:
+                    archive.add_bytes(DEDUPE_MAP_NAME, json.dumps(
+                        merged, indent=1, ensure_ascii=False).encode("utf-8"))
+                else:
+                    with open(target / DEDUPE_MAP_NAME, "w", encoding="utf-8") as fh:
+                        json.dump(merged, fh, indent=1, ensure_ascii=False)
+            except OSError as e:
+                metrics.error(e)
+                log(f"Cannot write {DEDUPE_MAP_NAME}: {e}", "WARN")
+            log(f"De-duplicated {deduped} files into {len(merged)} kept copies "
+                f"— see {DEDUPE_MAP_NAME}", "INFO")
+
+        if incremental:
+            if cancelled:
+                prune = False           # files not reached yet are not "removed"
+            if prune:
+                removed = _prune_removed(target, old_manifest.keys() - wanted)
+            # keep tracking outputs we left in place (failed copies, or gone
+            # from the source without prune) so a later run still knows them
+            for rel in old_manifest.keys() - manifest.keys():
+                if rel in wanted or not prune:
+                    manifest[rel] = old_manifest[rel]
+            try:
+                save_manifest(target, manifest)
+            except OSError as e:
+                metrics.error(e)
+                log(f"Cannot write manifest: {e}", "WARN")
+            log(f"Incremental — {copied} copied, {unchanged} unchanged, {removed} removed", "INFO")
+
+        if archive is not None:
+            # a cancelled archive is incomplete and cannot be resumed — drop it
+            try:
+                archive.close(complete=not cancelled)
+            except OSError as e:
+                log(f"Cannot finish archive: {e}", "ERROR"); return False
+            if cancelled:
+                log(f"Archive {archive.path.name} discarded — the run did not finish.", "WARN")
+            else:
+                ratio = archive.size / archive.written * 100 if archive.written else 100
+                log(f"Archive: {archive.path.name}  ({archive.files} files, "
+                    f"{fmt_mb(archive.written)} in, {fmt_mb(archive.size)} out, {ratio:.0f}%"
+                    + (f", {archive.stored} stored as-is" if archive.stored else "") + ")", "INFO")
+    rss  = peak_rss()
+    peak = (f"Process peak memory {fmt_mb(rss)} "
+            f"(+{fmt_mb(max(0, rss - rss_start))} during this run)")
+    if mem.enabled:
+        log(f"tracemalloc — peak {fmt_mb(mem.peak)} traced", "INFO")
+        for site, size in mem.sites:
+            log(f"  {fmt_mb(size):>9}  {site}", "INFO")
+
+    if bundle is not None or archive is not None:
+        written = (bundle or archive).written
+    else:
+        written = sum(b for _, b in copier.used.values()) + reduced[2]
+    result  = {"copied": copied, "skipped": skipped, "peak_rss": rss,
+               "peak_rss_growth": max(0, rss - rss_start), "traced_peak": mem.peak,
+               "cancelled": cancelled, "resumed": resumed,
+               "unchanged": unchanged, "removed": removed, "deduped": deduped,
+               "over_budget": over_budget, "binary": binary, "ignored": ignored, "large": large,
+               "reduced": {"files": reduced[0], "bytes_in": reduced[1], "bytes_out": reduced[2],
+                           "bytes_saved": reduced[1] - reduced[2]},
+               "strategies": {k: {"files": n, "bytes": b} for k, (n, b) in copier.used.items()},
+               "metrics": metrics.report(copied, written)}
+    log(f"Timing — {fmt_metrics(result['metrics'])}", "INFO")
+    if report:
+        try:
+            log(f"Report: {save_report(target, dict(result, mode=mode, source=str(source)))}", "INFO")
+        except OSError as e:
+            log(f"Cannot write {REPORT_NAME}: {e}", "WARN")
+    if cancelled:
+        again = "Run again to rebuild it." if archive is not None else "Run again to resume."
+        log(f"Stopped — {copied} copied, {skipped} skipped.  {again}  {peak}.", "WARN")
+    else:
+        log(f"Done — {copied} copied, {skipped} skipped.  {peak}.", "DONE")
+    return result
 
-            # batch summary log (much faster than per-file)
-            if (idx - last_log) >= BATCH:
-                log(f"Progress  {idx+1}/{total}  —  copied {copied}, skipped {skipped}", "INFO")
-                last_log = idx
-                gc.collect()
 
-        except Exception as e:
-            log(f"Error {item.name}: {e}", "WARN")
-            skipped += 1
+# ══════════════════════════════════════════════════════════════════
+#  WATCH MODE  (keep a Clean / Flatten output in sync while editing)
+# ══════════════════════════════════════════════════════════════════
+WATCH_STATE = ".repoprep-watch.json"
+
+
+class FlatNames:
+    """Flatten output names that stay put while the tree changes.
+
+    A fresh tree gets exactly the names run_operation's ``unique()``
+    gives — walk order, ``stem__N`` for repeats — and after that a file
+    keeps its name for as long as it exists.  A new file takes its plain
+    name if that is free (so a moved file keeps ``utils.py``), otherwise
+    the next ``__N`` from ``name_cnt``; numbers are never handed out
+    twice, so no other output is ever renamed.
+    """
+
+    def __init__(self, names=None, name_cnt=None):
+        self.names    = dict(names or {})          # rel -> output name
+        self.name_cnt = dict(name_cnt or {})       # file name -> last __N
+        self._used    = set(self.names.values())
+
+    def get(self, rel: str) -> str:
+        out = self.names.get(rel)
+        if out is None:
+            fname = os.path.basename(rel)
+            if fname not in self._used:
+                self.name_cnt.setdefault(fname, 0)
+                out = fname
+            else:
+                stem, ext = Path(fname).stem, Path(fname).suffix
+                n = self.name_cnt.get(fname, 0)
+                while True:
+                    n += 1
+                    out = f"{stem}__{n}{ext}"
+                    if out not in self._used:
+                        break
+                self.name_cnt[fname] = n
+            self.names[rel] = out
+            self._used.add(out)
+        return out
+
+    def drop(self, rel: str):
+        self._used.discard(self.names.pop(rel, None))
+
+
+def _load_watch_state(target, mode) -> dict:
+    """rel -> [size, mtime_ns, output] plus flatten's name_cnt, from the
+    last watch session on *target*; empty if missing or another mode."""
+    try:
+        with open(Path(target) / WATCH_STATE, encoding="utf-8") as fh:
+            data = json.load(fh)
+        if data.get("version") == 1 and data.get("mode") == mode:
+            return data
+    except Exception:
+        pass
+    return {"files": {}, "name_cnt": {}}
 
-    log(f"Done — {copied} copied, {skipped} skipped.", "DONE")
-    return {"copied": copied, "skipped": skipped}
 
+def _save_watch_state(target, mode, files: dict, name_cnt: dict):
+    path = Path(target) / WATCH_STATE
+    tmp  = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump({"version": 1, "mode": mode, "files": files, "name_cnt": name_cnt},
+                  fh, separators=(",", ":"), ensure_ascii=False)
+    os.replace(tmp, path)
 
-# ══════════════════════════════════════════════════════════════════
-#  COLOUR PALETTE
-# ══════════════════════════════════════════════════════════════════
-C = {
-    "bg":        "#080812",
-    "surface":   "#0f0f1e",
-    "surface2":  "#171728",
-    "surface3":  "#1e1e36",
-    "border":    "#24244a",
-    "sel_bg":    "#1a1a40",
-    "sel_brd":   "#7c6dfa",
-    "accent":    "#7c6dfa",
-    "accent2":   "#fa6d8b",
-    "accent3":   "#38e5a0",
-    "text":      "#e4e4f4",
-    "muted":     "#50507a",
-    "warning":   "#f5a623",
-    "error":     "#fa6d6d",
-    "success":   "#38e5a0",
-    "copy_fg":   "#7ae89a",
-    "skip_fg":   "#2e2e56",
-    "warn_fg":   "#f5a623",
-    "done_fg":   "#38e5a0",
-    "info_fg":   "#7a9afa",
-    "scan_fg":   "#b090ff",
-    "footer_bg": "#05050e",
-    "title_bg":  "#06060e",
-}
 
-# ══════════════════════════════════════════════════════════════════
-#  ICON DRAWING
-# ══════════════════════════════════════════════════════════════════
-def _draw(canvas, name, s, col):
-    h = s // 2
-    if name == "folder":
-        canvas.create_polygon(2, h, 7, h, 9, h-3, s-2, h-3,
-                              s-2, s-3, 2, s-3, fill=col, outline="")
-    elif name == "scan":
-        canvas.create_oval(3, 3, s-6, s-6, outline=col, width=2)
-        canvas.create_line(s-6, s-6, s-2, s-2, fill=col, width=2.5)
-    elif name == "flatten":
-        for y in (3, 9, 15):
-            canvas.create_rectangle(2, y, s-2, y+4, fill=col, outline="")
-    elif name == "clean":
-        canvas.create_line(4, s-3, s-4, 4, fill=col, width=2)
-        canvas.create_polygon(3, s-2, 8, s-5, 6, s-8, fill=col, outline="")
-    elif name == "play":
-        canvas.create_polygon(4, 2, 4, s-2, s-2, h, fill=col, outline="")
-    elif name == "clear":
-        canvas.create_line(3, 3, s-3, s-3, fill=col, width=2.5)
-        canvas.create_line(s-3, 3, 3, s-3, fill=col, width=2.5)
-    elif name == "info":
-        canvas.create_oval(2, 2, s-2, s-2, outline=col, width=1.5)
-        canvas.create_text(h, h+1, text="i", fill=col, font=("Georgia", 8, "bold"))
-    elif name == "image":
-        canvas.create_rectangle(2, 3, s-2, s-3, fill="", outline=col, width=1.5)
-        canvas.create_oval(4, 5, 8, 9, fill=col, outline="")
-        canvas.create_polygon(2, s-3, 7, s-9, 11, s-6,
-                              s-4, s-11, s-2, s-3, fill=col, outline="")
-    elif name == "gear":
-        canvas.create_oval(h-3, h-3, h+3, h+3, outline=col, width=1.5)
-        for deg in range(0, 360, 45):
-            a = _math.radians(deg)
-            canvas.create_line(h+4*_math.cos(a), h+4*_math.sin(a),
-                               h+7*_math.cos(a), h+7*_math.sin(a), fill=col, width=2)
-    elif name == "hex":
-        pts = []
-        for i in range(6):
-            a = _math.radians(60*i - 30)
-            pts += [h + (h-2)*_math.cos(a), h + (h-2)*_math.sin(a)]
-        canvas.create_polygon(*pts, fill="", outline=col, width=1.8)
-    elif name == "globe":
-        canvas.create_oval(2, 2, s-2, s-2, outline=col, width=1.5)
-        canvas.create_line(h, 2, h, s-2, fill=col, width=1)
-        canvas.create_line(2, h, s-2, h, fill=col, width=1)
-        canvas.create_oval(5, 6, s-5, s//2+2, fill="", outline=col, width=1)
-
-
-def mkic(parent, name, size=16, color=None, bg=None):
-    col  = color or C["muted"]
-    bg_c = bg    or C["surface"]
-    c = tk.Canvas(parent, width=size, height=size, bg=bg_c, highlightthickness=0)
-    _draw(c, name, size, col)
-    return c
+class _Inotify:
+    """Linux inotify through libc, used only as a wake-up: any event in a
+    watched folder triggers a snapshot diff, which stays the single
+    source of truth.  Raises OSError where inotify is unavailable."""
 
+    # IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+    # | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+    MASK = 0x002 | 0x004 | 0x008 | 0x040 | 0x080 | 0x100 | 0x200 | 0x400
 
-# ══════════════════════════════════════════════════════════════════
-#  APPLICATION
-# ══════════════════════════════════════════════════════════════════
-class App(tk.Tk):
     def __init__(self):
-        super().__init__()
-        self._lang     = tk.StringVar(value="en")
-        self._source   = tk.StringVar()
-        self._target   = tk.StringVar()
-        self._mode     = tk.StringVar(value="flatten")
-        self._inc_img  = tk.BooleanVar(value=False)
-        self._scan_res = None
-        self._running  = False
-
-        self.geometry("1060x790")
-        self.minsize(920, 660)
-        self.configure(bg=C["bg"])
-        self._apply_icon()
-
-        self._widgets:   dict = {}
-        self._mode_rows: dict = {}
-        self._mode_inds: dict = {}
-
-        self._build()
-        self._lang.trace_add("write", lambda *_: self._refresh_lang())
-        self._mode.trace_add("write", lambda *_: self._highlight_mode())
-        self._refresh_lang()
-
-    def _apply_icon(self):
+        if not sys.platform.startswith("linux"):
+            raise OSError(errno.ENOSYS, "inotify is Linux only")
+        import ctypes
+        import select
+        self._select = select.select
+        libc = ctypes.CDLL(None, use_errno=True)
+        self._add = libc.inotify_add_watch
+        self._add.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self._fd  = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            e = ctypes.get_errno()
+            raise OSError(e, os.strerror(e))
+        self._errno = ctypes.get_errno
+
+    def watch(self, dirs):
+        """(Re-)add a watch on every folder; re-adding one is a no-op, and
+        the kernel drops watches of deleted folders by itself."""
+        for d in dirs:
+            if self._add(self._fd, os.fsencode(d), self.MASK) < 0:
+                e = self._errno()
+                if e == errno.ENOSPC:   # fs.inotify.max_user_watches reached
+                    raise OSError(e, "inotify watch limit reached")
+
+    def wait(self, timeout) -> bool:
+        """True if anything happened within *timeout* seconds."""
+        ready = self._select([self._fd], [], [], timeout)[0]
+        if not ready:
+            return False
         try:
-            icon_path = get_icon_path()
-            if icon_path and os.path.exists(icon_path):
-                self.iconbitmap(default=icon_path)
-                if sys.platform == "win32":
-                    ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(
-                        "lidprexlabs.repoprep.2.2")
-        except Exception:
+            while os.read(self._fd, 65536):
+                pass
+        except BlockingIOError:
             pass
+        return True
+
+    def close(self):
+        os.close(self._fd)
+
+
+def watch(source_dir, target_dir, mode="flatten", interval=1.0, debounce=0.5,
+          include_images=False, rules_file=None, gitignore=True, use_inotify=True,
+          workers=0, copy_mode="auto", walk_threads=0, log_cb=None, stop_event=None):
+    """Keep a Clean or Flatten output in sync with *source_dir* until
+    *stop_event* is set.
+
+    Each pass takes a snapshot of the clean files (same walk, skip rules
+    and ignore files as run_operation) and diffs it against what the
+    target holds: only added and modified files are copied and removed
+    ones deleted.  Polls every *interval* seconds, or sleeps on inotify
+    where available and *use_inotify* is set.  A change starts a
+    *debounce* wait that lasts until a snapshot comes back unchanged, so
+    a burst of saves (or a git checkout) is applied once.  Flatten names
+    come from FlatNames and the state is kept in WATCH_STATE in the
+    target, so a restarted watch only copies what changed meanwhile.
+    Returns totals: syncs, copied, removed, errors.
+    """
+    source = Path(source_dir)
+    target = Path(target_dir)
+    stop   = stop_event or threading.Event()
 
-    def t(self, key: str) -> str:
-        return LANGS.get(self._lang.get(), LANGS["en"]).get(key, key)
-
-    # ══════════════════════════════════════════════════════════════
-    #  LAYOUT
-    # ══════════════════════════════════════════════════════════════
-    def _build(self):
-        self._build_titlebar()
-
-        outer = tk.Frame(self, bg=C["bg"])
-        outer.pack(fill="both", expand=True, padx=18, pady=(10, 0))
-
-        left = tk.Frame(outer, bg=C["bg"])
-        left.pack(side="left", fill="both", expand=True)
-
-        right = tk.Frame(outer, bg=C["bg"], width=420)
-        right.pack(side="right", fill="both", expand=False, padx=(14, 0))
-        right.pack_propagate(False)
-
-        self._build_paths(left)
-        self._build_modes(left)
-        self._build_options(left)
-        self._build_actions(left)
-        self._build_log(right)
-
-        self._build_footer()
-
-    # ── Title bar ─────────────────────────────────────────────────
-    def _build_titlebar(self):
-        bar = tk.Frame(self, bg=C["title_bg"], height=56)
-        bar.pack(fill="x")
-        bar.pack_propagate(False)
-
-        # ── Left: logo + name + version
-        left_g = tk.Frame(bar, bg=C["title_bg"])
-        left_g.pack(side="left", padx=(16, 0))
-
-        hc = tk.Canvas(left_g, width=34, height=34, bg=C["title_bg"], highlightthickness=0)
-        hc.pack(side="left", padx=(0, 10), pady=11)
-        _draw(hc, "hex", 34, C["accent"])
-
-        tk.Label(left_g, text="RepoPrep Pro",
-                 font=("Helvetica", 15, "bold"),
-                 bg=C["title_bg"], fg=C["text"]).pack(side="left")
-        tk.Label(left_g, text=" v2.2.0",
-                 font=("Helvetica", 9), bg=C["title_bg"], fg=C["muted"]).pack(side="left", pady=18)
-
-        # ── Right group
-        right_g = tk.Frame(bar, bg=C["title_bg"])
-        right_g.pack(side="right", padx=14)
-
-        # Brand badge (clickable)
-        badge = tk.Frame(right_g, bg="#110c2a", padx=12, pady=6)
-        badge.pack(side="right", padx=(12, 0))
-        self._widgets["built_by_lbl"] = tk.Label(
-            badge, font=("Helvetica", 8), bg="#110c2a", fg=C["muted"])
-        self._widgets["built_by_lbl"].pack(side="left")
-        lx = tk.Label(badge, text=" Lidprex Labs",
-                      font=("Helvetica", 8, "bold"), bg="#110c2a", fg=C["accent"],
-                      cursor="hand2")
-        lx.pack(side="left")
-        lx.bind("<Button-1>", lambda e: webbrowser.open("https://lidprex-labs.onrender.com/"))
-        lx.bind("<Enter>",    lambda e: lx.configure(fg=C["accent2"]))
-        lx.bind("<Leave>",    lambda e: lx.configure(fg=C["accent"]))
-
-        # Language selector — clean OptionMenu, not a row of buttons
-        lang_g = tk.Frame(right_g, bg=C["title_bg"])
-        lang_g.pack(side="right")
-
-        mkic(lang_g, "globe", 15, C["muted"], C["title_bg"]).pack(side="left", padx=(0, 4))
-        self._widgets["lang_label"] = tk.Label(
-            lang_g, font=("Helvetica", 8), bg=C["title_bg"], fg=C["muted"])
-        self._widgets["lang_label"].pack(side="left", padx=(0, 5))
-
-        lang_codes = list(LANG_NAMES.keys())
-        self._lang_display = tk.StringVar(value=LANG_NAMES["en"])
-
-        om = tk.OptionMenu(lang_g, self._lang_display,
-                           *[LANG_NAMES[c] for c in lang_codes])
-        om.configure(
-            font=("Helvetica", 9), bg=C["surface2"], fg=C["text"],
-            activebackground=C["accent"], activeforeground="#fff",
-            relief="flat", bd=0, highlightthickness=0,
-            cursor="hand2", padx=10, pady=4,
-        )
-        om["menu"].configure(
-            bg=C["surface2"], fg=C["text"],
-            activebackground=C["accent"], activeforeground="#fff",
-            relief="flat", bd=0, font=("Helvetica", 9),
-        )
-        om.pack(side="left")
-        self._widgets["lang_om"] = om
-
-        def _on_lang_select(*_):
-            disp = self._lang_display.get()
-            for code, name in LANG_NAMES.items():
-                if name == disp:
-                    self._lang.set(code)
-                    break
-        self._lang_display.trace_add("write", _on_lang_select)
-
-    # ── Footer ────────────────────────────────────────────────────
-    def _build_footer(self):
-        foot = tk.Frame(self, bg=C["footer_bg"], height=36)
-        foot.pack(fill="x", side="bottom")
-        foot.pack_propagate(False)
-
-        # Tagline left
-        self._widgets["footer_tagline"] = tk.Label(
-            foot, font=("Helvetica", 8, "italic"),
-            bg=C["footer_bg"], fg=C["muted"])
-        self._widgets["footer_tagline"].pack(side="left", padx=16, pady=10)
-
-        # Links right
-        links = tk.Frame(foot, bg=C["footer_bg"])
-        links.pack(side="right", padx=16)
-
-        tk.Label(links, text="© 2026", font=("Helvetica", 8),
-                 bg=C["footer_bg"], fg=C["muted"]).pack(side="left", padx=(0, 8))
-
-        def _link(parent, text, url):
-            l = tk.Label(parent, text=text, font=("Helvetica", 8),
-                         bg=C["footer_bg"], fg=C["accent"], cursor="hand2")
-            l.pack(side="left", padx=(0, 10))
-            l.bind("<Button-1>", lambda e: webbrowser.open(url))
-            l.bind("<Enter>",    lambda e: l.configure(fg="#fff"))
-            l.bind("<Leave>",    lambda e: l.configure(fg=C["accent"]))
-
-        _link(links, "Lidprex Labs", "https://lidprex-labs.onrender.com/")
-        tk.Label(links, text="·", bg=C["footer_bg"], fg=C["muted"],
-                 font=("Helvetica", 8)).pack(side="left", padx=(0, 10))
-        _link(links, "Lidprex", "https://lidprex.onrender.com/")
-
-    # ── Card wrapper ─────────────────────────────────────────────
-    def _card(self, parent, key, icon_name, icon_color=None):
-        frame = tk.Frame(parent, bg=C["surface"],
-                         highlightbackground=C["border"], highlightthickness=1)
-        frame.pack(fill="x", pady=(0, 10))
-
-        hdr = tk.Frame(frame, bg=C["surface2"], height=34)
-        hdr.pack(fill="x")
-        hdr.pack_propagate(False)
-
-        mkic(hdr, icon_name, 16, icon_color or C["accent"], C["surface2"]) \
-            .pack(side="left", padx=(12, 6), pady=9)
-        lbl = tk.Label(hdr, font=("Helvetica", 9, "bold"),
-                       bg=C["surface2"], fg=C["text"])
-        lbl.pack(side="left")
-        self._widgets[key] = lbl
-
-        body = tk.Frame(frame, bg=C["surface"], padx=14, pady=12)
-        body.pack(fill="x")
-        return body
-
-    # ── Paths ─────────────────────────────────────────────────────
-    def _build_paths(self, parent):
-        c = self._card(parent, "paths_title", "folder")
-
-        for lbl_key, browse_key, var, cmd_name in [
-            ("source_label", "browse_src", self._source, "src"),
-            ("target_label", "browse_tgt", self._target, "tgt"),
-        ]:
-            self._widgets[lbl_key] = tk.Label(
-                c, font=("Helvetica", 8), bg=C["surface"], fg=C["muted"])
-            self._widgets[lbl_key].pack(anchor="w")
-
-            row = tk.Frame(c, bg=C["surface"])
-            row.pack(fill="x", pady=(2, 10))
-
-            ew = tk.Frame(row, bg=C["bg"],
-                          highlightbackground=C["border"], highlightthickness=1)
-            ew.pack(side="left", fill="x", expand=True)
-            tk.Entry(ew, textvariable=var, bg=C["bg"], fg=C["text"],
-                     relief="flat", insertbackground=C["accent"],
-                     font=("Courier", 9), bd=0) \
-                .pack(fill="x", ipady=8, ipadx=8)
-
-            cmd = self._pick_source if cmd_name == "src" else self._pick_target
-            self._widgets[browse_key] = tk.Button(
-                row, font=("Helvetica", 9), bg=C["surface2"], fg=C["text"],
-                relief="flat", cursor="hand2", padx=14, pady=5,
-                activebackground=C["accent"], activeforeground="#fff",
-                command=cmd)
-            self._widgets[browse_key].pack(side="right", padx=(8, 0))
-
-    # ── Modes ─────────────────────────────────────────────────────
-    def _build_modes(self, parent):
-        c = self._card(parent, "modes_title", "gear")
-
-        defs = [
-            ("flatten", "flatten", C["accent"],  "mode_flatten", "mode_flatten_d"),
-            ("clean",   "clean",   C["accent2"], "mode_clean",   "mode_clean_d"),
-            ("scan",    "scan",    C["accent3"], "mode_scan",    "mode_scan_d"),
-        ]
-
-        for val, ic_name, ic_col, lbl_key, desc_key in defs:
-            row = tk.Frame(c, bg=C["surface2"],
-                           highlightbackground=C["border"], highlightthickness=1,
-                           padx=12, pady=10, cursor="hand2")
-            row.pack(fill="x", pady=4)
-            self._mode_rows[val] = row
-
-            def _click(e, v=val): self._mode.set(v)
-            row.bind("<Button-1>", _click)
-
-            ic_c = mkic(row, ic_name, 18, ic_col, C["surface2"])
-            ic_c.pack(side="left", anchor="n", pady=2, padx=(0, 10))
-            ic_c.bind("<Button-1>", _click)
-
-            inner = tk.Frame(row, bg=C["surface2"])
-            inner.pack(side="left", fill="x", expand=True)
-            inner.bind("<Button-1>", _click)
-
-            top = tk.Frame(inner, bg=C["surface2"])
-            top.pack(fill="x")
-            top.bind("<Button-1>", _click)
-
-            ind = tk.Label(top, text="○", font=("Helvetica", 12),
-                           bg=C["surface2"], fg=C["muted"], cursor="hand2")
-            ind.pack(side="left", padx=(0, 6))
-            ind.bind("<Button-1>", _click)
-            self._mode_inds[val] = ind
-
-            title_lbl = tk.Label(top, font=("Helvetica", 10, "bold"),
-                                 bg=C["surface2"], fg=C["text"],
-                                 cursor="hand2", anchor="w")
-            title_lbl.pack(side="left", fill="x")
-            title_lbl.bind("<Button-1>", _click)
-            self._widgets[lbl_key] = title_lbl
-
-            desc_lbl = tk.Label(inner, font=("Helvetica", 8),
-                                bg=C["surface2"], fg=C["muted"],
-                                justify="left", wraplength=460, anchor="w")
-            desc_lbl.pack(anchor="w", pady=(3, 0))
-            desc_lbl.bind("<Button-1>", _click)
-            self._widgets[desc_key] = desc_lbl
-
-    def _highlight_mode(self):
-        cur = self._mode.get()
-        ic_colors = {"flatten": C["accent"], "clean": C["accent2"], "scan": C["accent3"]}
-
-        for val, row in self._mode_rows.items():
-            sel = (val == cur)
-            bg  = C["sel_bg"]  if sel else C["surface2"]
-            brd = C["sel_brd"] if sel else C["border"]
-            row.configure(bg=bg, highlightbackground=brd)
-
-            def _repaint(w, b):
-                try:    w.configure(bg=b)
-                except: pass
-                for ch in w.winfo_children():
-                    _repaint(ch, b)
-
-            for ch in row.winfo_children():
-                _repaint(ch, bg)
-
-            ind = self._mode_inds.get(val)
-            if ind:
-                ind.configure(
-                    text="●" if sel else "○",
-                    fg=ic_colors[val] if sel else C["muted"], bg=bg)
-
-    # ── Options ───────────────────────────────────────────────────
-    def _build_options(self, parent):
-        c = self._card(parent, "options_title", "image", C["warning"])
-
-        row = tk.Frame(c, bg=C["surface"])
-        row.pack(fill="x")
-        mkic(row, "image", 16, C["warning"], C["surface"]).pack(side="left", padx=(0, 8))
-        self._widgets["opt_images_cb"] = tk.Checkbutton(
-            row, variable=self._inc_img, font=("Helvetica", 9),
-            bg=C["surface"], fg=C["text"], activebackground=C["surface"],
-            selectcolor=C["surface3"], cursor="hand2")
-        self._widgets["opt_images_cb"].pack(side="left")
-
-        self._widgets["opt_images_hint"] = tk.Label(
-            c, font=("Helvetica", 8), bg=C["surface"], fg=C["muted"],
-            justify="left", wraplength=500)
-        self._widgets["opt_images_hint"].pack(anchor="w", pady=(5, 0))
-
-    # ── Actions ───────────────────────────────────────────────────
-    def _build_actions(self, parent):
-        c = self._card(parent, "actions_title", "play", C["success"])
-
-        btn_row = tk.Frame(c, bg=C["surface"])
-        btn_row.pack(fill="x")
-
-        self._widgets["btn_run"] = tk.Button(
-            btn_row, font=("Helvetica", 11, "bold"),
-            bg=C["accent"], fg="#fff", relief="flat", cursor="hand2",
-            activebackground="#9a8cff", activeforeground="#fff",
-            command=self._on_run)
-        self._widgets["btn_run"].pack(
-            side="left", fill="x", expand=True, ipady=9, padx=(0, 8))
-
-        self._widgets["btn_scan"] = tk.Button(
-            btn_row, font=("Helvetica", 10, "bold"),
-            bg=C["surface2"], fg=C["text"], relief="flat", cursor="hand2",
-            activebackground=C["accent"], activeforeground="#fff",
-            command=self._on_scan)
-        self._widgets["btn_scan"].pack(
-            side="left", fill="x", expand=True, ipady=9, padx=(0, 8))
-
-        self._widgets["btn_clear"] = tk.Button(
-            btn_row, font=("Helvetica", 9),
-            bg=C["surface2"], fg=C["muted"], relief="flat", cursor="hand2",
-            activebackground=C["surface3"], activeforeground=C["text"],
-            command=self._clear_log, padx=16)
-        self._widgets["btn_clear"].pack(side="left", ipady=9)
-
-        self._stats_var = tk.StringVar()
-        self._widgets["stats_lbl"] = tk.Label(
-            c, textvariable=self._stats_var,
-            font=("Helvetica", 8), bg=C["surface"], fg=C["muted"],
-            anchor="w", wraplength=580, justify="left")
-        self._widgets["stats_lbl"].pack(anchor="w", pady=(10, 0))
-
-        sty = ttk.Style()
-        sty.theme_use("default")
-        sty.configure("LP.Horizontal.TProgressbar",
-                      troughcolor=C["surface2"], background=C["accent"], thickness=5)
-        self._progress = ttk.Progressbar(
-            c, style="LP.Horizontal.TProgressbar",
-            mode="determinate", maximum=100)
-        self._progress.pack(fill="x", pady=(8, 0))
-
-    # ── Log ───────────────────────────────────────────────────────
-    def _build_log(self, parent):
-        hdr = tk.Frame(parent, bg=C["surface2"],
-                       highlightbackground=C["border"], highlightthickness=1, height=36)
-        hdr.pack(fill="x")
-        hdr.pack_propagate(False)
-
-        mkic(hdr, "info", 16, C["accent2"], C["surface2"]).pack(side="left", padx=(12, 6), pady=10)
-        self._widgets["log_title"] = tk.Label(
-            hdr, font=("Helvetica", 9, "bold"), bg=C["surface2"], fg=C["text"])
-        self._widgets["log_title"].pack(side="left")
-
-        self._widgets["btn_open"] = tk.Button(
-            hdr, font=("Helvetica", 8), bg=C["surface2"], fg=C["muted"],
-            relief="flat", cursor="hand2",
-            activebackground=C["surface3"], activeforeground=C["accent"],
-            command=self._open_output)
-        self._widgets["btn_open"].pack(side="right", padx=10)
-
-        wrap = tk.Frame(parent, bg=C["surface"],
-                        highlightbackground=C["border"], highlightthickness=1)
-        wrap.pack(fill="both", expand=True)
-
-        self._log_txt = tk.Text(
-            wrap, bg="#040410", fg="#a0a0c8",
-            font=("Courier", 8), relief="flat", state="disabled",
-            wrap="word", insertbackground=C["accent"],
-            selectbackground=C["accent"], padx=10, pady=8)
-        self._log_txt.pack(side="left", fill="both", expand=True)
-
-        sb = tk.Scrollbar(wrap, command=self._log_txt.yview,
-                          bg=C["surface"], troughcolor=C["bg"],
-                          activebackground=C["accent"], relief="flat")
-        sb.pack(side="right", fill="y")
-        self._log_txt.configure(yscrollcommand=sb.set)
-
-        for tag, col in [
-            ("INFO",  C["info_fg"]), ("COPY",  C["copy_fg"]),
-            ("SKIP",  C["skip_fg"]), ("WARN",  C["warn_fg"]),
-            ("ERROR", C["error"]),   ("DONE",  C["done_fg"]),
-            ("SCAN",  C["scan_fg"]),
-        ]:
-            self._log_txt.tag_config(tag, foreground=col)
-
-    # ══════════════════════════════════════════════════════════════
-    #  LANGUAGE REFRESH
-    # ══════════════════════════════════════════════════════════════
-    def _refresh_lang(self):
-        self.title(self.t("app_title"))
-
-        map_ = {
-            "lang_label":      "lang_label",
-            "built_by_lbl":    "built_by",
-            "paths_title":     "paths_title",
-            "source_label":    "source_label",
-            "target_label":    "target_label",
-            "browse_src":      "browse",
-            "browse_tgt":      "browse",
-            "modes_title":     "modes_title",
-            "mode_flatten":    "mode_flatten",
-            "mode_flatten_d":  "mode_flatten_d",
-            "mode_clean":      "mode_clean",
-            "mode_clean_d":    "mode_clean_d",
-            "mode_scan":       "mode_scan",
-            "mode_scan_d":     "mode_scan_d",
-            "options_title":   "options_title",
-            "opt_images_cb":   "opt_images",
-            "opt_images_hint": "opt_images_hint",
-            "actions_title":   "actions_title",
-            "btn_run":         "btn_run",
-            "btn_scan":        "btn_scan",
-            "btn_clear":       "btn_clear",
-            "btn_open":        "btn_open",
-            "log_title":       "log_title",
-            "footer_tagline":  "footer_tagline",
-        }
-        for wkey, tkey in map_.items():
-            w = self._widgets.get(wkey)
-            if w:
-                try:    w.configure(text=self.t(tkey))
-                except: pass
-
-        if not self._scan_res:
-            self._stats_var.set(self.t("stats_default"))
-
-        self._highlight_mode()
-
-    # ══════════════════════════════════════════════════════════════
-    #  PICKING
-    # ══════════════════════════════════════════════════════════════
-    def _pick_source(self):
-        p = filedialog.askdirectory(title=self.t("source_label"))
-        if not p: return
-        self._source.set(p)
-        if not self._target.get():
-            self._target.set(
-                os.path.join(str(Path(p).parent), f"{Path(p).name}_prepared"))
-        self._do_scan_async(p)
-
-    def _pick_target(self):
-        p = filedialog.askdirectory(title=self.t("target_label"))
-        if p: self._target.set(p)
-
-    # ══════════════════════════════════════════════════════════════
-    #  SCAN
-    # ══════════════════════════════════════════════════════════════
-    def _on_scan(self):
-        src = self._source.get()
-        if not src:
-            messagebox.showwarning("", self.t("warn_no_src")); return
-        self._do_scan_async(src)
-
-    def _do_scan_async(self, path):
-        def worker():
-            res = scan_project(path, self._inc_img.get())
-            self.after(0, lambda: self._show_scan(res))
-        threading.Thread(target=worker, daemon=True).start()
-
-    def _show_scan(self, s):
-        self._scan_res = s
-        tm = round(s["total_size"]  / 1048576, 1)
-        cm = round(s["clean_size"]  / 1048576, 1)
-        sv = round(sum(s["skippable"].values()) / 1048576, 1)
-
-        self._stats_var.set(self.t("stats_fmt").format(
-            type=s["project_type"],
-            tf=s["total_files"], tm=tm,
-            cf=s["clean_files"], cm=cm,
-            sd=s["skipped_dirs"], sf=s["skipped_files"], sv=sv))
-        self._widgets["stats_lbl"].configure(fg=C["success"])
-
-        self._log("─" * 52, "INFO")
-        self._log(f"{self.t('scan_type')} : {s['project_type']}", "SCAN")
-        self._log(f"{self.t('scan_total')} : {s['total_files']} files  ({tm} MB)", "SCAN")
-        self._log(f"{self.t('scan_after')} : {s['clean_files']} files  ({cm} MB)", "SCAN")
-        self._log(f"{self.t('scan_dirs')} : {s['skipped_dirs']}   "
-                  f"{self.t('scan_files_s')}: {s['skipped_files']}", "SCAN")
-        for d, sz in sorted(s["skippable"].items(), key=lambda x: -x[1])[:6]:
-            self._log(f"  skip  {d}/  ({round(sz/1048576,1)} MB)", "SKIP")
-
-    # ══════════════════════════════════════════════════════════════
-    #  RUN
-    # ══════════════════════════════════════════════════════════════
-    def _on_run(self):
-        mode = self._mode.get()
-        if mode == "scan":
-            self._on_scan(); return
-
-        src = self._source.get()
-        tgt = self._target.get()
-
-        if not src:
-            messagebox.showwarning("", self.t("warn_no_src")); return
-        if not Path(src).exists():
-            messagebox.showerror("", self.t("err_no_src").format(src)); return
-        if not tgt:
-            messagebox.showwarning("", self.t("warn_no_tgt")); return
-
-        t = Path(tgt)
-        if t.exists() and t != Path(src):
+    def log(msg, level="INFO"):
+        if log_cb:
+            log_cb(f"[{datetime.now().strftime('%H:%M:%S')}]  {msg}", level)
+
+    if mode not in ("clean", "flatten"):
+        log(f"Watch mode keeps a Clean or Flatten output in sync — not {mode!r}.", "ERROR")
+        return False
+    if not source.is_dir():
+        log("Source folder not found.", "ERROR"); return False
+    try:
+        rules  = SkipRules.load(source, include_images, rules_file)
+        copier = Copier(copy_mode)
+        target.mkdir(parents=True, exist_ok=True)
+    except (OSError, ValueError) as e:
+        log(f"Cannot start watching: {e}", "ERROR"); return False
+    if workers <= 0:
+        workers = default_workers(source, target)
+
+    state = _load_watch_state(target, mode)
+    have  = state["files"]                      # rel -> [size, mtime_ns, output]
+    names = FlatNames({r: v[2] for r, v in have.items()}, state["name_cnt"])
+    # an output deleted behind our back is copied again
+    for rel, rec in list(have.items()):
+        if not (target / rec[2]).exists():
+            rec[0] = -1
+    dirs: list = []
+
+    def listdir(abs_dir, rel_dir):
+        dirs.append(abs_dir)
+        return _scandir(abs_dir, rel_dir)
+
+    def snapshot() -> dict:
+        """rel -> (size, mtime_ns) of every file a run would keep, in walk order."""
+        dirs.clear()
+        snap = {}
+        for item, skip in _filter_stage(list_tree(source, rules, listdir, gitignore,
+                                                  threads=walk_threads), rules):
+            if skip:
+                continue
             try:
-                if any(t.iterdir()):
-                    if not messagebox.askyesno("", self.t("confirm_overwrite").format(tgt)):
-                        return
-            except Exception:
-                pass
+                st = item.stat()
+            except OSError:
+                continue
+            snap[item.rel] = (st.st_size, st.st_mtime_ns)
+        return snap
+
+    totals = {"syncs": 0, "copied": 0, "removed": 0, "errors": 0}
+
+    def copy_one(job):
+        src, dest = job
+        try:
+            os.unlink(dest)         # never write through a hard link
+        except FileNotFoundError:
+            pass
+        copier(src, dest)
+
+    def sync(snap):
+        t0    = _perf()
+        first = not totals["syncs"]
+        # deletes first: pruning emptied folders must not race new copies
+        gone    = [rel for rel in have if rel not in snap]
+        removed = _prune_removed(target, [have.pop(rel)[2] for rel in gone])
+        if mode == "flatten":
+            for rel in gone:
+                names.drop(rel)
+
+        jobs = []
+        made: set = set()
+        for rel, (size, mtime) in snap.items():
+            rec = have.get(rel)
+            if rec and rec[0] == size and rec[1] == mtime:
+                continue
+            out  = names.get(rel) if mode == "flatten" else rel
+            dest = target / out
+            if mode == "clean" and str(dest.parent) not in made:
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                made.add(str(dest.parent))
+            jobs.append((rel, out, size, mtime, (os.path.join(source, rel), dest)))
+
+        done = []
+        pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 and len(jobs) > 1 else None
+        try:
+            futs = [pool.submit(copy_one, j[4]) if pool else None for j in jobs]
+            for (rel, out, size, mtime, job), fut in zip(jobs, futs):
+                try:
+                    fut.result() if fut else copy_one(job)
+                except OSError as e:
+                    # left out of the state, so the next change retries it
+                    totals["errors"] += 1
+                    log(f"Error {rel}: {e}", "WARN")
+                    continue
+                have[rel] = [size, mtime, out]
+                done.append((rel, out))
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True)
+        try:
+            _save_watch_state(target, mode, have, names.name_cnt)
+        except OSError as e:
+            log(f"Cannot write {WATCH_STATE}: {e}", "WARN")
+        totals["syncs"]   += 1
+        totals["copied"]  += len(done)
+        totals["removed"] += removed
+        if done or removed or first:
+            for rel, out in done[:5]:
+                log(f"Synced  {rel}" + (f"  →  {out}" if out != rel else ""), "INFO")
+            if len(done) > 5:
+                log(f"  … and {len(done) - 5} more", "INFO")
+            log(f"Sync — {len(done)} copied, {removed} removed  "
+                f"({_perf() - t0:.2f} s)", "DONE")
+
+    notify = None
+    if use_inotify:
+        try:
+            notify = _Inotify()
+        except OSError:
+            notify = None
+    log(f"Watching {source} → {target}  ({mode}, "
+        + ("inotify" if notify else f"polling every {interval:g} s") + ")", "INFO")
 
-        self._running = True
-        self._widgets["btn_run"].configure(state="disabled", text=self.t("running"))
-        self._progress["value"] = 0
-        self._log("─" * 52, "INFO")
-        self._log(f"Mode   : {mode.upper()}", "INFO")
-        self._log(f"Source : {src}",          "INFO")
-        self._log(f"Output : {tgt}",          "INFO")
-
-        def worker():
-            result = run_operation(
-                src, tgt, mode=mode,
-                include_images=self._inc_img.get(),
-                log_cb=lambda msg, lv="INFO":
-                    self.after(0, lambda m=msg, l=lv: self._log(m, l)),
-                progress_cb=lambda pct:
-                    self.after(0, lambda p=pct: self._set_progress(p)),
-            )
-            self.after(0, lambda: self._on_done(result, tgt))
-
-        threading.Thread(target=worker, daemon=True).start()
-
-    def _set_progress(self, pct):
-        self._progress["value"] = pct
-
-    def _on_done(self, result, tgt):
-        self._running = False
-        self._widgets["btn_run"].configure(state="normal", text=self.t("btn_run"))
-        self._progress["value"] = 100 if result else 0
-        if result and isinstance(result, dict):
-            if messagebox.askyesno(
-                    self.t("done_title"),
-                    self.t("done_msg").format(result["copied"], result["skipped"])):
-                self._open_folder(tgt)
+    try:
+        last = snapshot()
+        taken = _perf()
+        sync(last)
+        while not stop.is_set():
+            if notify is not None:
+                try:
+                    notify.watch(dirs)
+                except OSError as e:
+                    log(f"{e} — falling back to polling every {interval:g} s", "WARN")
+                    notify.close()
+                    notify = None
+                    continue
+                # wake every interval to check *stop*; a periodic snapshot
+                # still runs in case an event was lost
+                if not notify.wait(interval) and _perf() - taken < 30:
+                    continue
+            else:
+                stop.wait(interval)
+            if stop.is_set():
+                break
+            snap  = snapshot()
+            taken = _perf()
+            if snap == last:
+                continue
+            # debounce: wait until the tree holds still for one period
+            while not stop.wait(debounce):
+                later = snapshot()
+                if later == snap:
+                    break
+                snap = later
+            if stop.is_set():
+                break
+            last = snap
+            sync(snap)
+    finally:
+        if notify is not None:
+            notify.close()
+    log(f"Stopped watching — {totals['syncs']} syncs, {totals['copied']} copied, "
+        f"{totals['removed']} removed.", "DONE")
+    return totals
+
+
+# ══════════════════════════════════════════════════════════════════
+#  COMMAND LINE  (never imports tkinter — safe in headless CI)
+# ══════════════════════════════════════════════════════════════════
+def _print_scan(s, out=sys.stdout):
+    mb = lambda n: round(n / 1048576, 1)
+    print(f"Project type : {s['project_type']}", file=out)
+    print(f"Total        : {s['total_files']} files  ({mb(s['total_size'])} MB)", file=out)
+    print(f"After clean  : {s['clean_files']} files  ({mb(s['clean_size'])} MB, "
+          f"~{fmt_tokens(s['clean_tokens'])} tokens)", file=out)
+    print(f"Skipped      : {s['skipped_dirs']} dirs, {s['skipped_files']} files", file=out)
+    print(f"Timing       : {fmt_metrics(s['metrics'])}", file=out)
+    if s.get("binary_files"):
+        print(f"Binary       : {s['binary_files']} files", file=out)
+    if s.get("ignored_files"):
+        print(f"Ignored      : {s['ignored_files']} files", file=out)
+    if s.get("large_files"):
+        print(f"Large files  : {len(s['large_files'])} over the size limit", file=out)
+        for rel, sz in sorted(s["large_files"].items(), key=lambda x: -x[1])[:6]:
+            print(f"  large {rel}  ({mb(sz)} MB)", file=out)
+    for d, sz in sorted(s["skippable"].items(), key=lambda x: -x[1])[:6]:
+        print(f"  skip  {d}/  ({mb(sz)} MB)", file=out)
+
+
+def _common_args(p):
+    p.add_argument("src", help="project folder")
+    p.add_argument("--images", action="store_true", help="keep image files")
+    p.add_argument("--sniff", action="store_true", help="drop binaries by content")
+    p.add_argument("--rules", metavar="FILE", help="rules file (default: SRC/.repoprep.json)")
+    p.add_argument("--no-gitignore", dest="gitignore", action="store_false",
+                   help="do not honour .gitignore / .repoprepignore")
+    p.add_argument("--git-index", action="store_true",
+                   help="list a git checkout from .git/index instead of walking it")
+    p.add_argument("--untracked", action="store_true",
+                   help="with --git-index, also take untracked files that are not ignored")
+    p.add_argument("--walk-threads", type=int, default=0, metavar="N",
+                   help="list folders on N threads (network mounts, cold caches)")
+    p.add_argument("--max-size", type=parse_size, default=0, metavar="SIZE",
+                   help="size limit per file, e.g. 500k or 20M (0 = none)")
+    p.add_argument("--large", choices=LARGE_POLICIES, default="truncate",
+                   help="files over --max-size: keep head + tail excerpts, or skip them")
+    p.add_argument("--json", action="store_true", help="print the result as JSON")
+
+
+def cli(argv=None) -> int:
+    """``python main.py scan|clean|flatten|bundle|watch ...`` — no arguments
+    starts the GUI.  Logs go to stderr, results (or JSON) to stdout."""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        return _run_gui()
+    import argparse
+
+    ap  = argparse.ArgumentParser(prog="main.py", description="RepoPrep Pro — headless mode")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("scan", help="count what a run would keep and skip")
+    _common_args(p)
+    p.add_argument("--index", action="store_true", help="use the persistent scan index")
+    p.add_argument("--rescan", action="store_true", help="refresh the scan index")
+    p.add_argument("--sample-tokens", action="store_true", help="estimate tokens from content")
+    for mode in ("clean", "flatten", "bundle"):
+        p = sub.add_parser(mode, help=f"{mode} SRC into DST")
+        _common_args(p)
+        p.add_argument("dst", help="output folder")
+        p.add_argument("-j", "--workers", type=int, default=0, help="copy threads (0 = auto)")
+        p.add_argument("--copy-mode", choices=COPY_MODES, default="auto")
+        p.add_argument("--budget", type=int, default=0, metavar="TOKENS", help="token budget")
+        p.add_argument("--sample-tokens", action="store_true", help="estimate tokens from content")
+        p.add_argument("-q", "--quiet", action="store_true", help="no log output")
+        p.add_argument("--gc", choices=GcPolicy.MODES, default="relaxed",
+                       help="garbage-collector policy during the run")
+        p.add_argument("--trace-memory", action="store_true",
+                       help="report tracemalloc peak and top allocation sites")
+        p.add_argument("--report", action="store_true",
+                       help=f"write per-phase timings to DST/{REPORT_NAME}")
+        if mode == "clean":
+            p.add_argument("--incremental", action="store_true", help="copy only changed files")
+            p.add_argument("--prune", action="store_true", help="with --incremental, delete removed files")
+            p.add_argument("--hash", action="store_true", help="compare content when mtimes differ")
         else:
-            messagebox.showerror(self.t("fail_title"), self.t("fail_msg"))
-
-    # ══════════════════════════════════════════════════════════════
-    #  LOG HELPERS
-    # ══════════════════════════════════════════════════════════════
-    def _log(self, msg, level="INFO"):
-        self._log_txt.configure(state="normal")
-        self._log_txt.insert("end", msg + "\n", level)
-        self._log_txt.see("end")
-        self._log_txt.configure(state="disabled")
-
-    def _clear_log(self):
-        self._log_txt.configure(state="normal")
-        self._log_txt.delete("1.0", "end")
-        self._log_txt.configure(state="disabled")
-        self._progress["value"] = 0
-
-    def _open_output(self):
-        tgt = self._target.get()
-        if tgt and Path(tgt).exists():
-            self._open_folder(tgt)
+            p.add_argument("--dedupe", action="store_true", help="merge identical files")
+        p.add_argument("--strip", action="store_true",
+                       help="drop comments, docstrings and blank lines from source files")
+        if mode != "bundle":
+            p.add_argument("--archive", choices=list(ARCHIVE_FORMATS),
+                           help="write one archive into DST instead of a folder tree")
+            p.add_argument("--level", type=int, choices=range(10), metavar="0-9",
+                           help="archive compression level (default 6)")
+        if mode == "bundle":
+            p.add_argument("--format", choices=sorted(BUNDLE_FORMATS), default="md")
+    p = sub.add_parser("watch", help="keep DST in sync with SRC until Ctrl+C")
+    p.add_argument("src", help="project folder")
+    p.add_argument("dst", help="output folder")
+    p.add_argument("--mode", choices=("flatten", "clean"), default="flatten")
+    p.add_argument("--images", action="store_true", help="keep image files")
+    p.add_argument("--rules", metavar="FILE", help="rules file (default: SRC/.repoprep.json)")
+    p.add_argument("--no-gitignore", dest="gitignore", action="store_false",
+                   help="do not honour .gitignore / .repoprepignore")
+    p.add_argument("--interval", type=float, default=1.0, metavar="SEC", help="poll interval")
+    p.add_argument("--debounce", type=float, default=0.5, metavar="SEC",
+                   help="quiet time before a burst of changes is applied")
+    p.add_argument("--no-inotify", dest="inotify", action="store_false",
+                   help="always poll, even where inotify is available")
+    p.add_argument("-j", "--workers", type=int, default=0, help="copy threads (0 = auto)")
+    p.add_argument("--copy-mode", choices=COPY_MODES, default="auto")
+    p.add_argument("--walk-threads", type=int, default=0, metavar="N",
+                   help="list folders on N threads (network mounts, cold caches)")
+    p.add_argument("-q", "--quiet", action="store_true", help="no log output")
+    a = ap.parse_args(argv)
+
+    if not os.path.isdir(a.src):
+        print(f"error: source folder not found: {a.src}", file=sys.stderr)
+        return 1
+    if a.cmd == "watch":
+        return _watch_cli(a)
+    common = dict(include_images=a.images, sniff_binary=a.sniff, rules_file=a.rules,
+                  gitignore=a.gitignore, git_index=a.git_index, untracked=a.untracked,
+                  sample_tokens=a.sample_tokens, walk_threads=a.walk_threads,
+                  max_file_size=a.max_size, large_files=a.large)
+
+    if a.cmd == "scan":
+        s = scan_project(a.src, use_index=a.index, rescan=a.rescan, **common)
+        if a.json:
+            json.dump(s, sys.stdout, indent=1, ensure_ascii=False)
+            print()
         else:
-            messagebox.showinfo("", self.t("no_output"))
+            _print_scan(s)
+        return 0
 
-    @staticmethod
-    def _open_folder(path):
-        if sys.platform == "win32":
-            os.startfile(path)
-        elif sys.platform == "darwin":
-            os.system(f'open "{path}"')
-        else:
-            os.system(f'xdg-open "{path}"')
+    def log(msg, level="INFO"):
+        if not a.quiet or level in ("ERROR", "WARN"):
+            print(msg, file=sys.stderr)
+
+    # first Ctrl+C stops cleanly (the journal lets a re-run resume),
+    # a second one kills the process as usual
+    import signal
+    cancel = threading.Event()
+
+    def on_sigint(signum, frame):
+        cancel.set()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        print("Stopping after the copies in flight — Ctrl+C again to abort.", file=sys.stderr)
+    signal.signal(signal.SIGINT, on_sigint)
+
+    res = run_operation(
+        a.src, a.dst, a.cmd, log_cb=log, workers=a.workers, copy_mode=a.copy_mode,
+        cancel_event=cancel,
+        incremental=getattr(a, "incremental", False), prune=getattr(a, "prune", False),
+        hash_files=getattr(a, "hash", False), dedupe=getattr(a, "dedupe", False),
+        bundle_format=getattr(a, "format", "md"), token_budget=a.budget,
+        gc_mode=a.gc, trace_memory=a.trace_memory, report=a.report,
+        archive=getattr(a, "archive", None), compress_level=getattr(a, "level", None),
+        reduce=a.strip, **common)
+    if res is False:
+        return 1
+    if a.json:
+        json.dump(res, sys.stdout, indent=1)
+        print()
+    return 130 if res["cancelled"] else 0
+
+
+def _watch_cli(a) -> int:
+    import signal
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+
+    def log(msg, level="INFO"):
+        if not a.quiet or level in ("ERROR", "WARN"):
+            print(msg, file=sys.stderr)
+
+    res = watch(a.src, a.dst, a.mode, a.interval, a.debounce, include_images=a.images,
+                rules_file=a.rules, gitignore=a.gitignore, use_inotify=a.inotify,
+                workers=a.workers, copy_mode=a.copy_mode, walk_threads=a.walk_threads,
+                log_cb=log, stop_event=stop)
+    return 1 if res is False else 0
+
+
+def _run_gui() -> int:
+    # gui.py imports the core as ``main`` — hand it this instance rather
+    # than a second copy when started as a script
+    sys.modules.setdefault("main", sys.modules[__name__])
+    import gui
+    gui.run()
+    return 0
 
 
 # ══════════════════════════════════════════════════════════════════
 #  ENTRY POINT
 # ══════════════════════════════════════════════════════════════════
 if __name__ == "__main__":
-    app = App()
-    app.update_idletasks()
-    w, h = 1060, 790
-    sw, sh = app.winfo_screenwidth(), app.winfo_screenheight()
-    app.geometry(f"{w}x{h}+{(sw-w)//2}+{(sh-h)//2}")
-    app.mainloop()
\ No newline at end of file
+    if getattr(sys, "frozen", False):
+        # the --strip process pool (spawn) re-launches the frozen executable
+        import multiprocessing
+        multiprocessing.freeze_support()
+    sys.exit(cli())
@@ -0,0 +1,59 @@
+"""Regression tests for the --strip lexers: raw / verbatim strings must
+survive intact, and whatever follows them must not be cut as a comment.
+
+    python -m unittest discover tests      (or: python -m pytest tests)
+"""
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from main import reduce_lang, reduce_text   # noqa: E402
+
+
+def strip(name, text):
+    return reduce_text(text, reduce_lang(name))
+
+
+class RawStringTests(unittest.TestCase):
+
+    def test_csharp_verbatim(self):
+        self.assertEqual(
+            strip("a.cs", 'var p = @"C:\\dir\\"; var u = "http://x.com"; // c\n'),
+            'var p = @"C:\\dir\\"; var u = "http://x.com";\n')
+        self.assertEqual(
+            strip("a.cs", 'var q = $@"{a}\\"; var s = @"say ""hi"" // no";\n'),
+            'var q = $@"{a}\\"; var s = @"say ""hi"" // no";\n')
+
+    def test_rust_raw(self):
+        self.assertEqual(
+            strip("a.rs", 'let p = r"C:\\dir\\"; let u = "http://x.com"; // c\n'),
+            'let p = r"C:\\dir\\"; let u = "http://x.com";\n')
+        self.assertEqual(
+            strip("a.rs", 'let p = br##"a"#b // x"##; fn f<\'a>(x: &\'a str) {} // c\n'),
+            'let p = br##"a"#b // x"##; fn f<\'a>(x: &\'a str) {}\n')
+
+    def test_rust_nested_comment_left_alone(self):
+        src = "/* a /* b */ c */\nfn main() {}\n"
+        self.assertEqual(strip("a.rs", src), src)
+
+    def test_swift_raw(self):
+        self.assertEqual(strip("a.swift", 'let s = #"a " // b"# // c\n'),
+                         'let s = #"a " // b"#\n')
+        self.assertEqual(
+            strip("a.swift", 'let m = #"""\nq "# // no\n"""# // c\n#if DEBUG // c\n#endif\n'),
+            'let m = #"""\nq "# // no\n"""#\n#if DEBUG\n#endif\n')
+
+    def test_cpp_raw(self):
+        self.assertEqual(
+            strip("a.cc", 'auto s = R"(C:\\dir\\)"; auto u = "http://x.com"; // c\n'),
+            'auto s = R"(C:\\dir\\)"; auto u = "http://x.com";\n')
+
+    def test_objc_escapes_unchanged(self):
+        self.assertEqual(strip("a.m", 'NSString *s = @"a\\"b // x"; // c\n'),
+                         'NSString *s = @"a\\"b // x";\n')
+
+
+if __name__ == "__main__":
+    unittest.main()